@@ -0,0 +1,25 @@
+"""
+Revision ID: 0b7e4d2a9c18
+Revises: f19d6b3e8c42
+Create Date: 2026-10-18 17:34:50.128843
+"""
+revision = '0b7e4d2a9c18'
+down_revision = 'f19d6b3e8c42'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    # Sketches are hashed in Python, so existing appointments are backfilled with
+    # python -m app.services.stats rebuild
+    op.create_table('doctor_daily_patient_sketches',
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('sketch', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['doctor_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('doctor_id', 'day')
+    )
+
+def downgrade():
+    op.drop_table('doctor_daily_patient_sketches')
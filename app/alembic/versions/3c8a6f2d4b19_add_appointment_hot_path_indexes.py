@@ -0,0 +1,36 @@
+"""
+Revision ID: 3c8a6f2d4b19
+Revises: 9d4e2a7c1f08
+Create Date: 2026-10-18 11:26:05.114730
+"""
+revision = '3c8a6f2d4b19'
+down_revision = '9d4e2a7c1f08'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    # Built concurrently so the live tables stay writable during the migration
+    with op.get_context().autocommit_block():
+        op.create_index('ix_appointments_doctor_id_appointment_datetime', 'appointments', ['doctor_id', 'appointment_datetime'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_appointments_patient_id_appointment_datetime', 'appointments', ['patient_id', 'appointment_datetime'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_appointments_active_doctor_datetime', 'appointments', ['doctor_id', 'appointment_datetime'], unique=False, postgresql_where=sa.text("status IN ('pending', 'confirmed')"), postgresql_concurrently=True)
+        op.create_index('ix_users_role_is_active_specialization', 'users', ['role', 'is_active', 'specialization'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_users_division_id'), 'users', ['division_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_users_district_id'), 'users', ['district_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_users_thana_id'), 'users', ['thana_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_districts_division_id'), 'districts', ['division_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_thanas_district_id'), 'thanas', ['district_id'], unique=False, postgresql_concurrently=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_thanas_district_id'), table_name='thanas', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_districts_division_id'), table_name='districts', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_users_thana_id'), table_name='users', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_users_district_id'), table_name='users', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_users_division_id'), table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_users_role_is_active_specialization', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_appointments_active_doctor_datetime', table_name='appointments', postgresql_concurrently=True)
+        op.drop_index('ix_appointments_patient_id_appointment_datetime', table_name='appointments', postgresql_concurrently=True)
+        op.drop_index('ix_appointments_doctor_id_appointment_datetime', table_name='appointments', postgresql_concurrently=True)
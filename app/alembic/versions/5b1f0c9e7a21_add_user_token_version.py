@@ -0,0 +1,17 @@
+"""
+Revision ID: 5b1f0c9e7a21
+Revises: 202d008d8350
+Create Date: 2026-10-18 09:12:41.308112
+"""
+revision = '5b1f0c9e7a21'
+down_revision = '202d008d8350'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+def downgrade():
+    op.drop_column('users', 'token_version')
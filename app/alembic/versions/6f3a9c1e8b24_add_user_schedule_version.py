@@ -0,0 +1,24 @@
+"""
+Revision ID: 6f3a9c1e8b24
+Revises: d47b2f9e6a15
+Create Date: 2026-10-18 22:16:05.731482
+"""
+revision = '6f3a9c1e8b24'
+down_revision = 'd47b2f9e6a15'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.add_column('users', sa.Column('schedule_version', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('has_weekly_schedule', sa.Boolean(), server_default=sa.false(), nullable=False))
+    # Doctors whose legacy timeslots were converted to interval rows are already on the interval table
+    op.execute("""
+        UPDATE users SET has_weekly_schedule = true
+        WHERE EXISTS (SELECT 1 FROM doctor_schedule_intervals i WHERE i.doctor_id = users.id)
+    """)
+
+def downgrade():
+    op.drop_column('users', 'has_weekly_schedule')
+    op.drop_column('users', 'schedule_version')
@@ -0,0 +1,30 @@
+"""
+Revision ID: 7e2b9d3f5a64
+Revises: 3c8a6f2d4b19
+Create Date: 2026-10-18 12:41:52.930417
+"""
+revision = '7e2b9d3f5a64'
+down_revision = '3c8a6f2d4b19'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    # timestamptz + interval is only STABLE; an hour offset is timezone independent, so this is safe to mark IMMUTABLE
+    op.execute("""
+        CREATE OR REPLACE FUNCTION appointment_slot(ts timestamptz) RETURNS tstzrange
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE
+        AS $$ SELECT tstzrange(ts, ts + interval '60 minutes') $$
+    """)
+    # Existing overlapping pending/confirmed bookings must be resolved before this runs
+    op.execute("""
+        ALTER TABLE appointments ADD CONSTRAINT ex_appointments_doctor_slot
+        EXCLUDE USING gist (doctor_id WITH =, appointment_slot(appointment_datetime) WITH &&)
+        WHERE (status IN ('pending', 'confirmed'))
+    """)
+
+def downgrade():
+    op.execute("ALTER TABLE appointments DROP CONSTRAINT IF EXISTS ex_appointments_doctor_slot")
+    op.execute("DROP FUNCTION IF EXISTS appointment_slot(timestamptz)")
@@ -0,0 +1,68 @@
+"""
+Revision ID: a41c7e5b2d93
+Revises: 7e2b9d3f5a64
+Create Date: 2026-10-18 13:58:20.447615
+"""
+revision = 'a41c7e5b2d93'
+down_revision = '7e2b9d3f5a64'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+import re
+
+TIMESLOT_REGEX = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$')
+
+def upgrade():
+    op.create_table('doctor_schedule_intervals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('weekday', sa.Integer(), nullable=False),
+    sa.Column('start_minute', sa.Integer(), nullable=False),
+    sa.Column('end_minute', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['doctor_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_doctor_schedule_intervals_id'), 'doctor_schedule_intervals', ['id'], unique=False)
+    op.create_index('ix_doctor_schedule_intervals_doctor_id_weekday', 'doctor_schedule_intervals', ['doctor_id', 'weekday'], unique=False)
+    op.create_table('doctor_schedule_exceptions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('start_minute', sa.Integer(), nullable=True),
+    sa.Column('end_minute', sa.Integer(), nullable=True),
+    sa.Column('reason', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_doctor_schedule_exceptions_id'), 'doctor_schedule_exceptions', ['id'], unique=False)
+    op.create_index('ix_doctor_schedule_exceptions_doctor_id_date', 'doctor_schedule_exceptions', ['doctor_id', 'date'], unique=False)
+
+    # Backfill: the legacy comma-separated timeslots applied to every weekday
+    bind = op.get_bind()
+    doctors = bind.execute(sa.text(
+        "SELECT id, available_timeslots FROM users WHERE role = 'doctor' AND available_timeslots IS NOT NULL"
+    )).fetchall()
+    intervals = sa.table('doctor_schedule_intervals',
+        sa.column('doctor_id', sa.Integer), sa.column('weekday', sa.Integer),
+        sa.column('start_minute', sa.Integer), sa.column('end_minute', sa.Integer))
+    rows = []
+    for doctor_id, timeslots in doctors:
+        for timeslot in timeslots.split(','):
+            match = TIMESLOT_REGEX.match(timeslot)
+            if not match:
+                continue
+            start_h, start_m, end_h, end_m = (int(g) for g in match.groups())
+            for weekday in range(7):
+                rows.append({'doctor_id': doctor_id, 'weekday': weekday,
+                             'start_minute': start_h * 60 + start_m, 'end_minute': end_h * 60 + end_m})
+    if rows:
+        op.bulk_insert(intervals, rows)
+
+def downgrade():
+    op.drop_index('ix_doctor_schedule_exceptions_doctor_id_date', table_name='doctor_schedule_exceptions')
+    op.drop_index(op.f('ix_doctor_schedule_exceptions_id'), table_name='doctor_schedule_exceptions')
+    op.drop_table('doctor_schedule_exceptions')
+    op.drop_index('ix_doctor_schedule_intervals_doctor_id_weekday', table_name='doctor_schedule_intervals')
+    op.drop_index(op.f('ix_doctor_schedule_intervals_id'), table_name='doctor_schedule_intervals')
+    op.drop_table('doctor_schedule_intervals')
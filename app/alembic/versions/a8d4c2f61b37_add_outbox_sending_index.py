@@ -0,0 +1,20 @@
+"""
+Revision ID: a8d4c2f61b37
+Revises: 6f3a9c1e8b24
+Create Date: 2026-10-18 23:05:42.186305
+"""
+revision = 'a8d4c2f61b37'
+down_revision = '6f3a9c1e8b24'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.create_index(
+        'ix_notification_outbox_sending_claimed_at', 'notification_outbox', ['claimed_at'],
+        unique=False, postgresql_where=sa.text("status = 'sending'")
+    )
+
+def downgrade():
+    op.drop_index('ix_notification_outbox_sending_claimed_at', table_name='notification_outbox')
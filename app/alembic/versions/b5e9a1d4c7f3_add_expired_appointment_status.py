@@ -0,0 +1,30 @@
+"""
+Revision ID: b5e9a1d4c7f3
+Revises: 8a3f7c2e5b61
+Create Date: 2026-10-18 20:02:39.684125
+"""
+revision = 'b5e9a1d4c7f3'
+down_revision = '8a3f7c2e5b61'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    # ADD VALUE and CONCURRENTLY both have to run outside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE appointmentstatus ADD VALUE IF NOT EXISTS 'expired'")
+        op.create_index('ix_appointments_pending_appointment_datetime', 'appointments', ['appointment_datetime'], unique=False, postgresql_where=sa.text("status = 'pending'"), postgresql_concurrently=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_appointments_pending_appointment_datetime', table_name='appointments', postgresql_concurrently=True)
+    # Postgres cannot drop an enum value; fold expired rows into cancelled instead
+    op.execute("UPDATE appointments SET status = 'cancelled' WHERE status = 'expired'")
+    op.execute("""
+        INSERT INTO doctor_daily_stats (doctor_id, day, status, appointment_count, revenue)
+        SELECT doctor_id, day, 'cancelled', appointment_count, 0 FROM doctor_daily_stats WHERE status = 'expired'
+        ON CONFLICT (doctor_id, day, status) DO UPDATE
+        SET appointment_count = doctor_daily_stats.appointment_count + excluded.appointment_count
+    """)
+    op.execute("DELETE FROM doctor_daily_stats WHERE status = 'expired'")
@@ -0,0 +1,26 @@
+"""
+Revision ID: c3e7b1f95d28
+Revises: a8d4c2f61b37
+Create Date: 2026-10-18 23:48:19.604127
+"""
+revision = 'c3e7b1f95d28'
+down_revision = 'a8d4c2f61b37'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    # Only the newest running row per job can still be live; older ones were orphaned
+    op.execute("""
+        UPDATE job_runs SET status = 'failed', error = 'Superseded by a later run', finished_at = now()
+        WHERE status = 'running'
+          AND id NOT IN (SELECT max(id) FROM job_runs WHERE status = 'running' GROUP BY job_name)
+    """)
+    op.create_index(
+        'uq_job_runs_running_job_name', 'job_runs', ['job_name'],
+        unique=True, postgresql_where=sa.text("status = 'running'")
+    )
+
+def downgrade():
+    op.drop_index('uq_job_runs_running_job_name', table_name='job_runs')
@@ -0,0 +1,36 @@
+"""
+Revision ID: c62f1d8e4a57
+Revises: a41c7e5b2d93
+Create Date: 2026-10-18 15:20:33.871204
+"""
+revision = 'c62f1d8e4a57'
+down_revision = 'a41c7e5b2d93'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+def upgrade():
+    op.create_table('doctor_daily_stats',
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', postgresql.ENUM('pending', 'confirmed', 'cancelled', 'completed', name='appointmentstatus', create_type=False), nullable=False),
+    sa.Column('appointment_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['doctor_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('doctor_id', 'day', 'status')
+    )
+    op.create_index(op.f('ix_doctor_daily_stats_day'), 'doctor_daily_stats', ['day'], unique=False)
+    # Backfill from existing appointments; later changes are applied by the appointment service
+    op.execute("""
+        INSERT INTO doctor_daily_stats (doctor_id, day, status, appointment_count, revenue)
+        SELECT a.doctor_id, date(a.appointment_datetime), a.status, count(*),
+               CASE WHEN a.status = 'completed' THEN count(*) * coalesce(max(u.consultation_fee), 0) ELSE 0 END
+        FROM appointments a JOIN users u ON u.id = a.doctor_id
+        GROUP BY a.doctor_id, date(a.appointment_datetime), a.status
+    """)
+
+def downgrade():
+    op.drop_index(op.f('ix_doctor_daily_stats_day'), table_name='doctor_daily_stats')
+    op.drop_table('doctor_daily_stats')
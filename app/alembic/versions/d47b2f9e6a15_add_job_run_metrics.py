@@ -0,0 +1,21 @@
+"""
+Revision ID: d47b2f9e6a15
+Revises: b5e9a1d4c7f3
+Create Date: 2026-10-18 20:44:13.275906
+"""
+revision = 'd47b2f9e6a15'
+down_revision = 'b5e9a1d4c7f3'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.add_column('job_runs', sa.Column('duration_ms', sa.Float(), nullable=True))
+    op.add_column('job_runs', sa.Column('query_count', sa.Integer(), nullable=True))
+    op.add_column('job_runs', sa.Column('rows_processed', sa.Integer(), nullable=True))
+
+def downgrade():
+    op.drop_column('job_runs', 'rows_processed')
+    op.drop_column('job_runs', 'query_count')
+    op.drop_column('job_runs', 'duration_ms')
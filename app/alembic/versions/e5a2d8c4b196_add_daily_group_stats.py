@@ -0,0 +1,49 @@
+"""
+Revision ID: e5a2d8c4b196
+Revises: c3e7b1f95d28
+Create Date: 2026-10-18 23:41:07.512938
+"""
+revision = 'e5a2d8c4b196'
+down_revision = 'c3e7b1f95d28'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+STATUS = postgresql.ENUM('pending', 'confirmed', 'cancelled', 'completed', 'expired', name='appointmentstatus', create_type=False)
+
+def upgrade():
+    op.create_table('daily_specialization_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', STATUS, nullable=False),
+    sa.Column('specialization', sa.String(), nullable=False),
+    sa.Column('appointment_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status', 'specialization')
+    )
+    op.create_table('daily_division_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', STATUS, nullable=False),
+    sa.Column('division_id', sa.Integer(), nullable=False),
+    sa.Column('appointment_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status', 'division_id')
+    )
+    # Backfill from the per-doctor rollup; later changes are applied with the same deltas
+    op.execute("""
+        INSERT INTO daily_specialization_stats (day, status, specialization, appointment_count, revenue)
+        SELECT s.day, s.status, coalesce(u.specialization, ''), sum(s.appointment_count), sum(s.revenue)
+        FROM doctor_daily_stats s JOIN users u ON u.id = s.doctor_id
+        GROUP BY s.day, s.status, coalesce(u.specialization, '')
+    """)
+    op.execute("""
+        INSERT INTO daily_division_stats (day, status, division_id, appointment_count, revenue)
+        SELECT s.day, s.status, coalesce(u.division_id, 0), sum(s.appointment_count), sum(s.revenue)
+        FROM doctor_daily_stats s JOIN users u ON u.id = s.doctor_id
+        GROUP BY s.day, s.status, coalesce(u.division_id, 0)
+    """)
+
+def downgrade():
+    op.drop_table('daily_division_stats')
+    op.drop_table('daily_specialization_stats')
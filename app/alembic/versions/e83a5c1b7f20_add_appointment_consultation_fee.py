@@ -0,0 +1,22 @@
+"""
+Revision ID: e83a5c1b7f20
+Revises: c62f1d8e4a57
+Create Date: 2026-10-18 16:05:12.447390
+"""
+revision = 'e83a5c1b7f20'
+down_revision = 'c62f1d8e4a57'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.add_column('appointments', sa.Column('consultation_fee', sa.Float(), nullable=True))
+    # Existing rows take the doctor's current fee, which is what reports used until now
+    op.execute("""
+        UPDATE appointments a SET consultation_fee = u.consultation_fee
+        FROM users u WHERE u.id = a.doctor_id
+    """)
+
+def downgrade():
+    op.drop_column('appointments', 'consultation_fee')
@@ -0,0 +1,23 @@
+"""
+Revision ID: f19d6b3e8c42
+Revises: e83a5c1b7f20
+Create Date: 2026-10-18 16:48:27.902615
+"""
+revision = 'f19d6b3e8c42'
+down_revision = 'e83a5c1b7f20'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.create_table('monthly_reports',
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('report', sa.JSON(), nullable=False),
+    sa.Column('generated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('year', 'month')
+    )
+
+def downgrade():
+    op.drop_table('monthly_reports')
@@ -0,0 +1,17 @@
+"""
+Revision ID: f7c3a9e2d514
+Revises: e5a2d8c4b196
+Create Date: 2026-10-19 00:18:52.340716
+"""
+revision = 'f7c3a9e2d514'
+down_revision = 'e5a2d8c4b196'
+branch_labels = None
+depends_on = None
+from alembic import op
+import sqlalchemy as sa
+
+def upgrade():
+    op.add_column('job_runs', sa.Column('heartbeat_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+
+def downgrade():
+    op.drop_column('job_runs', 'heartbeat_at')
@@ -1,3 +1,4 @@
+from fastapi import HTTPException
 from fastapi.responses import JSONResponse
 from typing import Any, Optional, Callable
 from functools import wraps
@@ -35,6 +36,9 @@ def envelope_endpoint(func: Callable):
         try:
             result = await func(*args, **kwargs)
             return api_response(data=result)
+        except HTTPException as e:
+            # Deliberate client errors (400, 403, 404, 409) keep their status; only failures are 500
+            return api_response(success=False, error=str(e), status_code=e.status_code)
         except Exception as e:
             return api_response(success=False, error=str(e), status_code=500)
     return wrapper 
\ No newline at end of file
@@ -3,14 +3,35 @@ from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
 from sqlalchemy.future import select  # type: ignore
 from sqlalchemy import and_, or_  # type: ignore
 from app.db.session import get_db
-from app.api.deps import get_current_user
+from app.api.deps import get_current_principal
 from app.models.user import User, UserRole
+from app.schemas.user import TokenPrincipal
 from app.models.appointment import Appointment, AppointmentStatus
 from app.schemas.appointment import AppointmentStatusUpdate
-from app.services.appointment import update_appointment_status
+from app.services.appointment import update_appointment_status, SlotUnavailableError
+from app.services.user import invalidate_principal, principal_cache, token_state_cache
+from app.core.security import password_pool
+from app.services.token import revocation_set
+from app.services.schedule import invalidate_schedule, schedule_cache
+from app.services.availability import slot_cache
+from app.services.stats import get_status_totals, count_unique_patients
+from app.services.reports import get_monthly_report
+from app.services.dashboard import dashboard_cache
+from app.services.outbox import outbox_counts
+from app.services.jobs import job_stats, recent_job_runs
+from app.core.scheduler import JOBS, run_job_now
+from app.services.analytics import (
+    get_appointment_timeseries,
+    bucket_count,
+    GRANULARITIES,
+    GROUP_BY_DIMENSIONS,
+    MAX_TIMESERIES_BUCKETS,
+    MAX_TIMESERIES_GROUPS
+)
 from typing import Optional, List
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from app.api._response import envelope_endpoint
+from app.core.pagination import fetch_keyset_page
 
 router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
 
@@ -25,8 +46,9 @@ async def list_all_appointments(
     search: Optional[str] = Query(None),
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     if current_user.role != UserRole.admin:
         raise HTTPException(status_code=403, detail="Admins only.")
@@ -49,10 +71,14 @@ async def list_all_appointments(
                 Appointment.symptoms.ilike(f"%{search}%")
             )
         )
-    query = query.offset(skip).limit(limit)
+    from app.schemas.appointment import AppointmentRead
+    order_columns = [Appointment.appointment_datetime, Appointment.id]
+    if cursor is not None:
+        appointments, next_cursor = await fetch_keyset_page(db, query, order_columns, cursor, limit)
+        return {"items": [AppointmentRead.from_orm(a) for a in appointments], "next_cursor": next_cursor}
+    query = query.order_by(*order_columns).offset(skip).limit(limit)
     result = await db.execute(query)
     appointments = result.scalars().all()
-    from app.schemas.appointment import AppointmentRead
     appointments = [AppointmentRead.from_orm(a) for a in appointments]
     return appointments
 
@@ -62,12 +88,15 @@ async def admin_update_appointment_status(
     appointment_id: int,
     status_update: AppointmentStatusUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     if current_user.role != UserRole.admin:
         raise HTTPException(status_code=403, detail="Admins only.")
     
-    updated = await update_appointment_status(db, appointment_id, status_update.status)
+    try:
+        updated = await update_appointment_status(db, appointment_id, status_update.status)
+    except SlotUnavailableError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
     if not updated:
         raise HTTPException(status_code=404, detail="Appointment not found.")
     return updated
@@ -82,7 +111,7 @@ async def list_all_doctors(
     skip: int = 0,
     limit: int = 10,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     if current_user.role != UserRole.admin:
         raise HTTPException(status_code=403, detail="Admins only.")
@@ -96,7 +125,7 @@ async def list_all_doctors(
         query = query.where(User.district_id == district_id)
     if search:
         query = query.where(User.full_name.ilike(f"%{search}%"))
-    query = query.offset(skip).limit(limit)
+    query = query.order_by(User.id).offset(skip).limit(limit)
     result = await db.execute(query)
     doctors = result.scalars().all()
     from app.schemas.user import UserRead
@@ -111,8 +140,9 @@ async def list_all_patients(
     search: Optional[str] = Query(None),
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     if current_user.role != UserRole.admin:
         raise HTTPException(status_code=403, detail="Admins only.")
@@ -124,10 +154,13 @@ async def list_all_patients(
         query = query.where(User.district_id == district_id)
     if search:
         query = query.where(User.full_name.ilike(f"%{search}%"))
-    query = query.offset(skip).limit(limit)
+    from app.schemas.user import UserRead
+    if cursor is not None:
+        patients, next_cursor = await fetch_keyset_page(db, query, [User.id], cursor, limit)
+        return {"items": [UserRead.from_orm(p) for p in patients], "next_cursor": next_cursor}
+    query = query.order_by(User.id).offset(skip).limit(limit)
     result = await db.execute(query)
     patients = result.scalars().all()
-    from app.schemas.user import UserRead
     patients = [UserRead.from_orm(p) for p in patients]
     return patients
 
@@ -137,7 +170,7 @@ async def update_doctor_status(
     doctor_id: int,
     is_active: bool,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     if current_user.role != UserRole.admin:
         raise HTTPException(status_code=403, detail="Admins only.")
@@ -147,77 +180,94 @@ async def update_doctor_status(
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor not found.")
     
+    if doctor.is_active and not is_active:
+        # Invalidate every token already issued to the doctor
+        doctor.token_version = (doctor.token_version or 0) + 1
     doctor.is_active = is_active
     db.add(doctor)
     await db.commit()
     await db.refresh(doctor)
+    invalidate_principal(doctor)
+    invalidate_schedule(doctor.id)
     from app.schemas.user import UserRead
     return UserRead.from_orm(doctor)
 
+@router.get("/metrics")
+@envelope_endpoint
+async def get_metrics(
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_principal)
+):
+    """In-process cache, pool and job counters for this worker, plus outbox backlog and recent job runs"""
+    if current_user.role != UserRole.admin:
+        raise HTTPException(status_code=403, detail="Admins only.")
+    return {
+        "principal_cache": principal_cache.stats(),
+        "token_state_cache": token_state_cache.stats(),
+        "password_pool": password_pool.stats(),
+        "revocation_set": revocation_set.stats(),
+        "schedule_cache": schedule_cache.stats(),
+        "slot_cache": slot_cache.stats(),
+        "dashboard_cache": dashboard_cache.stats(),
+        "notification_outbox": await outbox_counts(db),
+        "jobs": job_stats,
+        "job_runs": await recent_job_runs(db)
+    }
+
+@router.post("/jobs/{job_name}/run")
+@envelope_endpoint
+async def run_job(
+    job_name: str,
+    current_user: TokenPrincipal = Depends(get_current_principal)
+):
+    """Run a scheduled job now and return its metrics; the run is recorded in job_runs"""
+    if current_user.role != UserRole.admin:
+        raise HTTPException(status_code=403, detail="Admins only.")
+    if job_name not in JOBS:
+        raise HTTPException(status_code=404, detail=f"Unknown job. Available: {', '.join(JOBS)}.")
+    
+    metrics = await run_job_now(job_name)
+    if metrics is None:
+        raise HTTPException(status_code=409, detail="This job is already running.")
+    return {"job_name": job_name, **metrics}
+
+@router.get("/analytics/timeseries")
+@envelope_endpoint
+async def appointment_timeseries(
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    granularity: str = Query("day"),
+    group_by: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=MAX_TIMESERIES_GROUPS),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_principal)
+):
+    if current_user.role != UserRole.admin:
+        raise HTTPException(status_code=403, detail="Admins only.")
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(GRANULARITIES)}.")
+    if group_by is not None and group_by not in GROUP_BY_DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(GROUP_BY_DIMENSIONS)}.")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date.")
+    if bucket_count(start_date, end_date, granularity) > MAX_TIMESERIES_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Range exceeds {MAX_TIMESERIES_BUCKETS} {granularity} buckets.")
+    
+    return await get_appointment_timeseries(db, start_date, end_date, granularity, group_by, limit)
+
 @router.get("/reports/monthly")
 @envelope_endpoint
 async def generate_monthly_report(
     year: int = Query(...),
-    month: int = Query(...),
+    month: int = Query(..., ge=1, le=12),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     if current_user.role != UserRole.admin:
         raise HTTPException(status_code=403, detail="Admins only.")
     
-    # Calculate date range for the specified month
-    start_date = datetime(year, month, 1)
-    if month == 12:
-        end_date = datetime(year + 1, 1, 1) - timedelta(seconds=1)
-    else:
-        end_date = datetime(year, month + 1, 1) - timedelta(seconds=1)
-    
-    # Get all doctors
-    doctors_result = await db.execute(select(User).where(User.role == UserRole.doctor))
-    doctors = doctors_result.scalars().all()
-    
-    report_data = []
-    total_appointments = 0
-    total_earnings = 0
-    total_patients = set()
-    
-    for doctor in doctors:
-        # Get appointments for this doctor in the specified month
-        appointments_result = await db.execute(
-            select(Appointment).where(
-                Appointment.doctor_id == doctor.id,
-                Appointment.appointment_datetime.between(start_date, end_date),
-                Appointment.status == AppointmentStatus.completed
-            )
-        )
-        appointments = appointments_result.scalars().all()
-        
-        doctor_appointments = len(appointments)
-        doctor_earnings = sum([doctor.consultation_fee or 0 for _ in appointments])
-        doctor_patients = len(set([appt.patient_id for appt in appointments]))
-        
-        total_appointments += doctor_appointments
-        total_earnings += doctor_earnings
-        total_patients.update([appt.patient_id for appt in appointments])
-        
-        report_data.append({
-            "doctor_id": doctor.id,
-            "doctor_name": doctor.full_name,
-            "specialization": doctor.specialization,
-            "total_appointments": doctor_appointments,
-            "total_earnings": doctor_earnings,
-            "total_patients": doctor_patients,
-            "consultation_fee": doctor.consultation_fee
-        })
-    
-    return {
-        "period": f"{year}-{month:02d}",
-        "total_doctors": len(doctors),
-        "total_appointments": total_appointments,
-        "total_earnings": total_earnings,
-        "total_unique_patients": len(total_patients),
-        "doctor_reports": report_data
-    }
+    # Finished months come from the stored snapshot; the current month is computed live
+    return await get_monthly_report(db, year, month)
 
 @router.get("/reports/doctor/{doctor_id}")
 @envelope_endpoint
@@ -225,8 +275,9 @@ async def generate_doctor_report(
     doctor_id: int,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
+    approximate: bool = Query(False),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     if current_user.role != UserRole.admin:
         raise HTTPException(status_code=403, detail="Admins only.")
@@ -237,23 +288,15 @@ async def generate_doctor_report(
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor not found.")
     
-    # Build query
-    query = select(Appointment).where(Appointment.doctor_id == doctor_id)
-    if start_date:
-        query = query.where(Appointment.appointment_datetime >= start_date)
-    if end_date:
-        query = query.where(Appointment.appointment_datetime <= end_date)
-    
-    appointments_result = await db.execute(query)
-    appointments = appointments_result.scalars().all()
-    
-    # Calculate statistics
-    total_appointments = len(appointments)
-    completed_appointments = len([a for a in appointments if a.status == AppointmentStatus.completed])
-    pending_appointments = len([a for a in appointments if a.status == AppointmentStatus.pending])
-    cancelled_appointments = len([a for a in appointments if a.status == AppointmentStatus.cancelled])
-    total_earnings = sum([doctor.consultation_fee or 0 for a in appointments if a.status == AppointmentStatus.completed])
-    unique_patients = len(set([a.patient_id for a in appointments]))
+    # Calculate statistics from the daily rollup
+    totals = await get_status_totals(db, doctor_id, start_date, end_date)
+    unique_patients = await count_unique_patients(db, doctor_id, start_date, end_date, approximate)
+    total_appointments = sum(entry["count"] for entry in totals.values())
+    completed_appointments = totals[AppointmentStatus.completed]["count"]
+    pending_appointments = totals[AppointmentStatus.pending]["count"]
+    cancelled_appointments = totals[AppointmentStatus.cancelled]["count"]
+    expired_appointments = totals[AppointmentStatus.expired]["count"]
+    total_earnings = totals[AppointmentStatus.completed]["revenue"]
     
     # Convert datetimes to ISO format for JSON serialization
     period = {
@@ -270,6 +313,7 @@ async def generate_doctor_report(
         "completed_appointments": completed_appointments,
         "pending_appointments": pending_appointments,
         "cancelled_appointments": cancelled_appointments,
+        "expired_appointments": expired_appointments,
         "total_earnings": total_earnings,
         "unique_patients": unique_patients,
         "period": period
@@ -1,18 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
 from app.db.session import get_db
-from app.api.deps import get_current_user
+from app.api.deps import get_current_principal
 from app.schemas.appointment import AppointmentCreate, AppointmentRead, AppointmentStatusUpdate
 from app.services.appointment import (
-    create_appointment, 
+    reserve_appointment, 
     get_appointments_with_filters, 
-    is_doctor_available, 
     update_appointment_status, 
     get_appointment_by_id,
     cancel_appointment,
-    get_appointment_statistics
+    get_appointment_statistics,
+    SlotUnavailableError
 )
 from app.models.user import User, UserRole
+from app.schemas.user import TokenPrincipal
 from app.models.appointment import AppointmentStatus
 from datetime import datetime, time
 from typing import Optional
@@ -28,7 +29,7 @@ BUSINESS_HOURS_END = time(18, 0)
 async def book_appointment(
     appointment_in: AppointmentCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     # Only patients can book
     if current_user.role != UserRole.patient:
@@ -43,12 +44,10 @@ async def book_appointment(
     if not (BUSINESS_HOURS_START <= appt_time <= BUSINESS_HOURS_END):
         raise HTTPException(status_code=400, detail="Appointment must be within business hours (08:00-18:00).")
     
-    # Validate doctor availability (enhanced check)
-    available = await is_doctor_available(db, appointment_in.doctor_id, appointment_in.appointment_datetime)
-    if not available:
+    # Schedule check, conflict check and insert run in a single transaction
+    appointment = await reserve_appointment(db, current_user.id, appointment_in)
+    if appointment is None:
         raise HTTPException(status_code=400, detail="Doctor is not available at this time.")
-    
-    appointment = await create_appointment(db, current_user.id, appointment_in)
     return AppointmentRead.from_orm(appointment)
 
 @router.get("/", response_model=dict)
@@ -62,8 +61,10 @@ async def list_appointments(
     search: Optional[str] = Query(None),
     skip: int = 0,
     limit: int = 10,
+    count: str = Query("exact", pattern="^(exact|estimate|auto|none)$"),
+    cursor: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     """Get appointments with enhanced filtering and pagination"""
     result = await get_appointments_with_filters(
@@ -77,7 +78,9 @@ async def list_appointments(
         end_date=end_date,
         search=search,
         skip=skip,
-        limit=limit
+        limit=limit,
+        count_mode=count,
+        cursor=cursor
     )
     # Convert ORM objects to Pydantic models
     result["appointments"] = [AppointmentRead.from_orm(a) for a in result["appointments"]]
@@ -89,7 +92,7 @@ async def update_status(
     appointment_id: int,
     status_update: AppointmentStatusUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     # Only doctors can update status
     if current_user.role != UserRole.doctor:
@@ -99,7 +102,10 @@ async def update_status(
     if not appointment or appointment.doctor_id != current_user.id:
         raise HTTPException(status_code=404, detail="Appointment not found.")
     
-    updated = await update_appointment_status(db, appointment_id, status_update.status)
+    try:
+        updated = await update_appointment_status(db, appointment_id, status_update.status)
+    except SlotUnavailableError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
     from app.schemas.appointment import AppointmentRead
     return AppointmentRead.from_orm(updated)
 
@@ -108,7 +114,7 @@ async def update_status(
 async def cancel_appointment_endpoint(
     appointment_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     """Cancel an appointment"""
     cancelled = await cancel_appointment(db, appointment_id, current_user.id, current_user.role.value)
@@ -122,7 +128,7 @@ async def get_statistics(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     """Get appointment statistics for the current user"""
     stats = await get_appointment_statistics(
@@ -139,7 +145,7 @@ async def get_statistics(
 async def get_appointment(
     appointment_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     """Get specific appointment details"""
     appointment = await get_appointment_by_id(db, appointment_id)
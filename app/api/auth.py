@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
 from app.schemas.user import UserCreate, UserRead, UserLogin
-from app.services.user import create_user, authenticate_user, get_user_by_email, get_user_by_mobile
+from app.services.user import create_user, authenticate_user, get_user_by_email, get_user_by_mobile, build_token_claims
 from app.db.session import get_db
-from app.core.security import create_access_token
+from app.core.security import create_access_token, decode_access_token, PasswordPoolBusy
+from app.services.token import revoke_token
+from app.api.deps import oauth2_scheme
 from fastapi.security import OAuth2PasswordRequestForm
 from app.models.user import UserRole
 from app.core.validators import validate_password, validate_mobile, validate_image, validate_timeslots
@@ -12,6 +14,8 @@ import shutil
 
 router = APIRouter(prefix="/api/v1/auth", tags=["auth"])
 
+AUTH_BUSY = "Authentication service busy, please retry."
+
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), '../static/uploads/profile_images')
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
@@ -86,18 +90,28 @@ async def register(
         profile_image=image_path,
         **doctor_fields
     )
-    user = await create_user(db, user_in)
+    try:
+        user = await create_user(db, user_in)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=AUTH_BUSY)
     return user
 
 @router.post("/login")
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
-    user = await authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=AUTH_BUSY)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data=build_token_claims(user))
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/logout")
-async def logout():
-    # Stateless JWT: client just deletes token
+async def logout(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    payload = decode_access_token(token)
+    if payload is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+    # Tokens issued before jti was added cannot be revoked; the client just deletes them
+    await revoke_token(db, payload)
     return {"message": "Successfully logged out."} 
\ No newline at end of file
@@ -3,10 +3,13 @@ from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
 from sqlalchemy.future import select  # type: ignore
 from sqlalchemy import func  # type: ignore
 from app.db.session import get_db
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_current_principal
 from app.models.user import User, UserRole
+from app.schemas.user import TokenPrincipal
 from app.models.appointment import Appointment, AppointmentStatus
 from app.api._response import envelope_endpoint
+from app.services.dashboard import get_admin_dashboard_stats, cached_dashboard
+from app.services.stats import get_status_totals, count_unique_patients, get_patient_status_counts
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -18,104 +21,56 @@ async def admin_dashboard(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     db: AsyncSession = Depends(get_db), 
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     if current_user.role != UserRole.admin:
         raise HTTPException(status_code=403, detail="Admins only.")
     
-    # Base queries
-    users_query = select(User)
-    appointments_query = select(Appointment)
-    
-    # Apply date filters if provided
-    if start_date:
-        appointments_query = appointments_query.where(Appointment.appointment_datetime >= start_date)
-    if end_date:
-        appointments_query = appointments_query.where(Appointment.appointment_datetime <= end_date)
-    
-    # Get counts
-    total_users = (await db.execute(users_query)).scalars().all()
-    total_appointments = (await db.execute(appointments_query)).scalars().all()
-    
-    # Filter by role
-    total_doctors = [u for u in total_users if u.role == UserRole.doctor and u.is_active]
-    total_patients = [u for u in total_users if u.role == UserRole.patient]
-    
-    # Appointment statistics
-    completed_appointments = [a for a in total_appointments if a.status == AppointmentStatus.completed]
-    pending_appointments = [a for a in total_appointments if a.status == AppointmentStatus.pending]
-    cancelled_appointments = [a for a in total_appointments if a.status == AppointmentStatus.cancelled]
-    
-    # Calculate total earnings
-    total_earnings = 0
-    for appt in completed_appointments:
-        doctor_result = await db.execute(select(User).where(User.id == appt.doctor_id))
-        doctor = doctor_result.scalar_one_or_none()
-        if doctor and doctor.consultation_fee:
-            total_earnings += doctor.consultation_fee
-    
-    return {
-        "total_users": len(total_users),
-        "total_doctors": len(total_doctors),
-        "total_patients": len(total_patients),
-        "total_appointments": len(total_appointments),
-        "completed_appointments": len(completed_appointments),
-        "pending_appointments": len(pending_appointments),
-        "cancelled_appointments": len(cancelled_appointments),
-        "total_earnings": total_earnings,
-        "period": {
+    async def compute():
+        stats = await get_admin_dashboard_stats(db, start_date, end_date)
+        stats["period"] = {
             "start_date": start_date,
             "end_date": end_date
         }
-    }
+        return stats
+    
+    return await cached_dashboard("admin", current_user.id, start_date, end_date, compute)
 
 @router.get("/doctor")
 @envelope_endpoint
 async def doctor_dashboard(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
+    approximate: bool = Query(False),
     db: AsyncSession = Depends(get_db), 
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != UserRole.doctor:
         raise HTTPException(status_code=403, detail="Doctors only.")
     
-    # Build query for doctor's appointments
-    query = select(Appointment).where(Appointment.doctor_id == current_user.id)
-    
-    if start_date:
-        query = query.where(Appointment.appointment_datetime >= start_date)
-    if end_date:
-        query = query.where(Appointment.appointment_datetime <= end_date)
-    
-    appointments = (await db.execute(query)).scalars().all()
-    
-    # Calculate statistics
-    completed = [a for a in appointments if a.status == AppointmentStatus.completed]
-    pending = [a for a in appointments if a.status == AppointmentStatus.pending]
-    confirmed = [a for a in appointments if a.status == AppointmentStatus.confirmed]
-    cancelled = [a for a in appointments if a.status == AppointmentStatus.cancelled]
-    
-    # Calculate earnings
-    total_earnings = len(completed) * (current_user.consultation_fee or 0)
-    
-    # Get unique patients
-    unique_patients = len(set([a.patient_id for a in appointments]))
-    
-    return {
-        "total_appointments": len(appointments),
-        "completed_appointments": len(completed),
-        "pending_appointments": len(pending),
-        "confirmed_appointments": len(confirmed),
-        "cancelled_appointments": len(cancelled),
-        "total_earnings": total_earnings,
-        "unique_patients": unique_patients,
-        "consultation_fee": current_user.consultation_fee,
-        "period": {
-            "start_date": start_date,
-            "end_date": end_date
+    async def compute():
+        # Per-day rollup rows plus raw counts for partial edge days
+        totals = await get_status_totals(db, current_user.id, start_date, end_date)
+        unique_patients = await count_unique_patients(db, current_user.id, start_date, end_date, approximate)
+        
+        return {
+            "total_appointments": sum(entry["count"] for entry in totals.values()),
+            "completed_appointments": totals[AppointmentStatus.completed]["count"],
+            "pending_appointments": totals[AppointmentStatus.pending]["count"],
+            "confirmed_appointments": totals[AppointmentStatus.confirmed]["count"],
+            "cancelled_appointments": totals[AppointmentStatus.cancelled]["count"],
+            "expired_appointments": totals[AppointmentStatus.expired]["count"],
+            "total_earnings": totals[AppointmentStatus.completed]["revenue"],
+            "unique_patients": unique_patients,
+            "consultation_fee": current_user.consultation_fee,
+            "period": {
+                "start_date": start_date,
+                "end_date": end_date
+            }
         }
-    }
+    
+    endpoint = "doctor_approximate" if approximate else "doctor"
+    return await cached_dashboard(endpoint, current_user.id, start_date, end_date, compute)
 
 @router.get("/patient")
 @envelope_endpoint
@@ -123,39 +78,26 @@ async def patient_dashboard(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     db: AsyncSession = Depends(get_db), 
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     if current_user.role != UserRole.patient:
         raise HTTPException(status_code=403, detail="Patients only.")
     
-    # Build query for patient's appointments
-    query = select(Appointment).where(Appointment.patient_id == current_user.id)
-    
-    if start_date:
-        query = query.where(Appointment.appointment_datetime >= start_date)
-    if end_date:
-        query = query.where(Appointment.appointment_datetime <= end_date)
-    
-    appointments = (await db.execute(query)).scalars().all()
-    
-    # Calculate statistics
-    completed = [a for a in appointments if a.status == AppointmentStatus.completed]
-    pending = [a for a in appointments if a.status == AppointmentStatus.pending]
-    confirmed = [a for a in appointments if a.status == AppointmentStatus.confirmed]
-    cancelled = [a for a in appointments if a.status == AppointmentStatus.cancelled]
-    
-    # Get unique doctors
-    unique_doctors = len(set([a.doctor_id for a in appointments]))
-    
-    return {
-        "total_appointments": len(appointments),
-        "completed_appointments": len(completed),
-        "pending_appointments": len(pending),
-        "confirmed_appointments": len(confirmed),
-        "cancelled_appointments": len(cancelled),
-        "unique_doctors": unique_doctors,
-        "period": {
-            "start_date": start_date,
-            "end_date": end_date
+    async def compute():
+        counts = await get_patient_status_counts(db, current_user.id, start_date, end_date)
+        
+        return {
+            "total_appointments": sum(counts[status.value] for status in AppointmentStatus),
+            "completed_appointments": counts["completed"],
+            "pending_appointments": counts["pending"],
+            "confirmed_appointments": counts["confirmed"],
+            "cancelled_appointments": counts["cancelled"],
+            "expired_appointments": counts["expired"],
+            "unique_doctors": counts["unique_doctors"],
+            "period": {
+                "start_date": start_date,
+                "end_date": end_date
+            }
         }
-    } 
\ No newline at end of file
+    
+    return await cached_dashboard("patient", current_user.id, start_date, end_date, compute) 
\ No newline at end of file
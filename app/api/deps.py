@@ -4,22 +4,55 @@ from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
 from app.core.security import decode_access_token
 from app.db.session import get_db
-from app.services.user import get_user_by_email
-from app.models.user import User
+from app.services.user import get_principal_by_email, get_token_state
+from app.services.token import is_token_revoked
+from app.models.user import User, UserRole
+from app.schemas.user import TokenPrincipal
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
+    credentials_exception = _credentials_exception()
     payload = decode_access_token(token)
     if payload is None or "sub" not in payload:
         raise credentials_exception
+    if await is_token_revoked(db, payload):
+        raise credentials_exception
     email: str = payload["sub"]
-    user = await get_user_by_email(db, email=email)
+    user = await get_principal_by_email(db, email=email)
     if user is None:
         raise credentials_exception
-    return user 
\ No newline at end of file
+    if "ver" in payload and payload["ver"] != (user.token_version or 0):
+        raise credentials_exception
+    return user
+
+async def get_current_principal(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> TokenPrincipal:
+    """Authorize from token claims alone; only a cached (is_active, token_version) check touches the DB"""
+    credentials_exception = _credentials_exception()
+    payload = decode_access_token(token)
+    if payload is None or "sub" not in payload:
+        raise credentials_exception
+    if await is_token_revoked(db, payload):
+        raise credentials_exception
+    if "uid" not in payload or "role" not in payload:
+        # Token issued before claims were added: fall back to the full lookup
+        user = await get_current_user(token, db)
+        return TokenPrincipal(id=user.id, email=user.email, role=user.role, is_active=bool(user.is_active))
+    state = await get_token_state(db, payload["uid"])
+    if state is None:
+        raise credentials_exception
+    is_active, token_version = state
+    if not is_active or payload.get("ver", 0) != token_version:
+        raise credentials_exception
+    try:
+        role = UserRole(payload["role"])
+    except ValueError:
+        raise credentials_exception
+    return TokenPrincipal(id=payload["uid"], email=payload["sub"], role=role, is_active=is_active)
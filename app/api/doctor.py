@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
 from sqlalchemy.future import select  # type: ignore
 from app.db.session import get_db
 from app.models.user import User, UserRole
+from app.schemas.user import TokenPrincipal
 from app.services.doctor import (
     get_doctor_schedule, 
     update_doctor_schedule, 
@@ -10,15 +11,20 @@ from app.services.doctor import (
     get_doctor_appointments,
     get_doctor_statistics
 )
-from app.api.deps import get_current_user
-from app.schemas.user import DoctorScheduleUpdate, UserRead
-from typing import Optional, List
+from app.api.deps import get_current_principal
+from app.schemas.user import DoctorScheduleUpdate, UserRead, UserPage, ScheduleExceptionCreate
+from app.schemas.appointment import AvailabilityBatchRequest
+from app.services.schedule import add_schedule_exception, delete_schedule_exception
+from app.core.validators import parse_timeslot
+from app.services.availability import get_free_slots, find_earliest_slots, check_availability_batch, MAX_SLOT_RANGE_DAYS, MAX_SEARCH_RANGE_DAYS
+from typing import Optional, List, Union
 from datetime import datetime
 from app.api._response import envelope_endpoint
+from app.core.pagination import fetch_keyset_page
 
 router = APIRouter(prefix="/api/v1/doctors", tags=["doctors"])
 
-@router.get("/", response_model=list[UserRead])
+@router.get("/", response_model=Union[List[UserRead], UserPage])
 @envelope_endpoint
 async def list_doctors(
     specialization: Optional[str] = Query(None),
@@ -29,6 +35,7 @@ async def list_doctors(
     search: Optional[str] = Query(None),
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db)
 ):
     query = select(User).where(User.role == UserRole.doctor, User.is_active == True)
@@ -47,11 +54,47 @@ async def list_doctors(
             query = query.where(User.available_timeslots.isnot(None))
         else:
             query = query.where(User.available_timeslots.is_(None))
-    query = query.offset(skip).limit(limit)
+    if cursor is not None:
+        doctors, next_cursor = await fetch_keyset_page(db, query, [User.id], cursor, limit)
+        return {"items": [UserRead.from_orm(doc) for doc in doctors], "next_cursor": next_cursor}
+    query = query.order_by(User.id).offset(skip).limit(limit)
     result = await db.execute(query)
     doctors = result.scalars().all()
     return [UserRead.from_orm(doc) for doc in doctors]
 
+@router.get("/search/earliest")
+@envelope_endpoint
+async def search_earliest_available(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    specialization: Optional[str] = Query(None),
+    division_id: Optional[int] = Query(None),
+    district_id: Optional[int] = Query(None),
+    thana_id: Optional[int] = Query(None),
+    slot_minutes: int = Query(60, ge=5, le=240),
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """Earliest free (doctor, slot) pairs matching specialization and location"""
+    if (start.tzinfo is None) != (end.tzinfo is None):
+        raise HTTPException(status_code=400, detail="'from' and 'to' must both include or both omit a timezone.")
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'.")
+    if (end.date() - start.date()).days >= MAX_SEARCH_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range must be at most {MAX_SEARCH_RANGE_DAYS} days.")
+    results = await find_earliest_slots(
+        db,
+        start,
+        end,
+        specialization=specialization,
+        division_id=division_id,
+        district_id=district_id,
+        thana_id=thana_id,
+        slot_minutes=slot_minutes,
+        limit=limit
+    )
+    return {"results": results, "count": len(results)}
+
 @router.get("/{doctor_id}/schedule")
 @envelope_endpoint
 async def get_schedule(
@@ -68,7 +111,7 @@ async def get_schedule(
 async def update_schedule(
     schedule_update: DoctorScheduleUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     if current_user.role != UserRole.doctor:
         raise HTTPException(status_code=403, detail="Doctors only.")
@@ -77,13 +120,51 @@ async def update_schedule(
         current_user.id, 
         schedule_update.available_timeslots, 
         schedule_update.consultation_fee, 
-        schedule_update.specialization
+        schedule_update.specialization,
+        schedule_update.weekly_overrides()
     )
     if not updated_doctor:
         raise HTTPException(status_code=404, detail="Doctor not found.")
     from app.schemas.user import UserRead
     return UserRead.from_orm(updated_doctor)
 
+@router.post("/schedule/exceptions")
+@envelope_endpoint
+async def create_schedule_exception(
+    exception_in: ScheduleExceptionCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_principal)
+):
+    """Mark leave or a holiday on a specific date"""
+    if current_user.role != UserRole.doctor:
+        raise HTTPException(status_code=403, detail="Doctors only.")
+    start_minute = end_minute = None
+    if exception_in.timeslot:
+        start_minute, end_minute = parse_timeslot(exception_in.timeslot)
+    exception = await add_schedule_exception(
+        db, current_user.id, exception_in.date, start_minute, end_minute, exception_in.reason
+    )
+    return {
+        "id": exception.id,
+        "date": exception.date.isoformat(),
+        "start_minute": exception.start_minute,
+        "end_minute": exception.end_minute,
+        "reason": exception.reason
+    }
+
+@router.delete("/schedule/exceptions/{exception_id}")
+@envelope_endpoint
+async def remove_schedule_exception(
+    exception_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_principal)
+):
+    if current_user.role != UserRole.doctor:
+        raise HTTPException(status_code=403, detail="Doctors only.")
+    if not await delete_schedule_exception(db, current_user.id, exception_id):
+        raise HTTPException(status_code=404, detail="Schedule exception not found.")
+    return {"message": "Schedule exception removed successfully"}
+
 @router.get("/{doctor_id}/availability")
 @envelope_endpoint
 async def check_availability(
@@ -98,6 +179,53 @@ async def check_availability(
         "is_available": is_available
     }
 
+@router.get("/{doctor_id}/slots")
+@envelope_endpoint
+async def get_slots(
+    doctor_id: int,
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    slot_minutes: int = Query(60, ge=5, le=240),
+    db: AsyncSession = Depends(get_db)
+):
+    """Every bookable slot for a doctor in a date range"""
+    if (start.tzinfo is None) != (end.tzinfo is None):
+        raise HTTPException(status_code=400, detail="'from' and 'to' must both include or both omit a timezone.")
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'.")
+    if (end.date() - start.date()).days >= MAX_SLOT_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range must be at most {MAX_SLOT_RANGE_DAYS} days.")
+    slots = await get_free_slots(db, doctor_id, start, end, slot_minutes)
+    if slots is None:
+        raise HTTPException(status_code=404, detail="Doctor not found.")
+    return {
+        "doctor_id": doctor_id,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "slot_minutes": slot_minutes,
+        "slots": [slot.isoformat() for slot in slots]
+    }
+
+@router.post("/availability/batch")
+@envelope_endpoint
+async def check_availability_batch_endpoint(
+    request: AvailabilityBatchRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Check many (doctor_id, appointment_datetime) pairs at once"""
+    pairs = [(item.doctor_id, item.appointment_datetime) for item in request.items]
+    available = await check_availability_batch(db, pairs)
+    return {
+        "results": [
+            {
+                "doctor_id": doctor_id,
+                "appointment_datetime": appointment_datetime.isoformat(),
+                "is_available": is_available
+            }
+            for (doctor_id, appointment_datetime), is_available in zip(pairs, available)
+        ]
+    }
+
 @router.get("/appointments")
 @envelope_endpoint
 async def get_my_appointments(
@@ -107,7 +235,7 @@ async def get_my_appointments(
     skip: int = 0,
     limit: int = 10,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     if current_user.role != UserRole.doctor:
         raise HTTPException(status_code=403, detail="Doctors only.")
@@ -141,12 +269,13 @@ async def get_my_appointments(
 async def get_my_statistics(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
+    approximate: bool = Query(False),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     if current_user.role != UserRole.doctor:
         raise HTTPException(status_code=403, detail="Doctors only.")
-    stats = await get_doctor_statistics(db, current_user.id, start_date, end_date)
+    stats = await get_doctor_statistics(db, current_user.id, start_date, end_date, approximate)
     return stats
 
 @router.get("/{doctor_id}/appointments")
@@ -159,7 +288,7 @@ async def get_doctor_appointments_admin(
     skip: int = 0,
     limit: int = 10,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     if current_user.role != UserRole.admin:
         raise HTTPException(status_code=403, detail="Admins only.")
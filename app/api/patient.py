@@ -3,9 +3,11 @@ from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
 from sqlalchemy.future import select  # type: ignore
 from app.db.session import get_db
 from app.models.user import User, UserRole
-from app.api.deps import get_current_user
+from app.schemas.user import TokenPrincipal, UserRead
+from app.api.deps import get_current_principal
 from typing import Optional
 from app.api._response import envelope_endpoint
+from app.core.pagination import fetch_keyset_page
 
 router = APIRouter(prefix="/api/v1/patients", tags=["patients"])
 
@@ -15,14 +17,18 @@ async def list_patients(
     search: Optional[str] = Query(None),
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_principal)
 ):
     if current_user.role != UserRole.admin:
         raise HTTPException(status_code=403, detail="Admins only.")
     query = select(User).where(User.role == UserRole.patient)
     if search:
         query = query.where(User.full_name.ilike(f"%{search}%"))
-    query = query.offset(skip).limit(limit)
+    if cursor is not None:
+        patients, next_cursor = await fetch_keyset_page(db, query, [User.id], cursor, limit)
+        return {"items": [UserRead.from_orm(p) for p in patients], "next_cursor": next_cursor}
+    query = query.order_by(User.id).offset(skip).limit(limit)
     result = await db.execute(query)
-    return result.scalars().all() 
\ No newline at end of file
+    return [UserRead.from_orm(p) for p in result.scalars().all()] 
\ No newline at end of file
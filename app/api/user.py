@@ -4,10 +4,12 @@ from app.api.deps import get_current_user
 from app.schemas.user import UserRead
 from app.models.user import User, UserRole
 from app.db.session import get_db
-from app.core.validators import validate_mobile, validate_image
+from app.core.validators import validate_mobile, validate_image, validate_timeslots
 import os
 import shutil
 from app.api._response import envelope_endpoint
+from app.services.user import invalidate_principal
+from app.services.schedule import replace_weekly_intervals, invalidate_schedule
 
 router = APIRouter(prefix="/api/v1/user", tags=["user"])
 
@@ -64,7 +66,9 @@ async def update_profile(
             current_user.consultation_fee = consultation_fee
             updated = True
         if available_timeslots is not None:
+            validate_timeslots([ts.strip() for ts in available_timeslots.split(',')])
             current_user.available_timeslots = available_timeslots
+            await replace_weekly_intervals(db, current_user.id, available_timeslots)
             updated = True
         if specialization is not None:
             current_user.specialization = specialization
@@ -82,4 +86,6 @@ async def update_profile(
         db.add(current_user)
         await db.commit()
         await db.refresh(current_user)
+        invalidate_principal(current_user)
+        invalidate_schedule(current_user.id)
     return UserRead.from_orm(current_user) 
\ No newline at end of file
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+_MISSING = object()
+
+class _LeaderCancelled(Exception):
+    """Set on a shared computation whose leader was cancelled; waiters retry rather than fail"""
+
+class TTLCache:
+    """Bounded in-process cache with per-entry TTL and LRU eviction"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self._discard(key)
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            self._discard(evicted)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+        self._discard(key)
+
+    def _discard(self, key: Hashable):
+        """Called once ``key`` has left the cache by expiry, eviction or invalidation"""
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class ResponseCache(TTLCache):
+    """
+    TTLCache whose misses are computed once however many callers ask concurrently.
+    ``group`` maps a key to the group it is invalidated with; by default each key is its own.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 5.0,
+        group: Callable[[Hashable], Hashable] = lambda key: key
+    ):
+        super().__init__(maxsize, ttl)
+        self.group = group
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # Cached and in-flight keys per group, so invalidating a group touches only its keys
+        self._groups: Dict[Hashable, Set[Hashable]] = {}
+        # Computations whose key was invalidated while they ran; their results are not stored
+        self._stale: Set[asyncio.Future] = set()
+        self.coalesced = 0
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except _LeaderCancelled:
+                # The leader's request went away; the first waiter to get here computes instead
+                continue
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting; mark failures as retrieved so they are not logged twice
+        future.add_done_callback(lambda f: f.exception())
+        self._inflight[key] = future
+        self._groups.setdefault(self.group(key), set()).add(key)
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            # Never cancel the shared future: waiters would raise CancelledError for a request
+            # that is not theirs
+            future.set_exception(_LeaderCancelled())
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            stale = future in self._stale
+            self._stale.discard(future)
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+                self._discard(key)
+        if not stale:
+            self.set(key, value)
+        future.set_result(value)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._groups.setdefault(self.group(key), set()).add(key)
+        super().set(key, value, ttl)
+
+    def clear(self):
+        super().clear()
+        self._groups.clear()
+        for key in self._inflight:
+            self._groups.setdefault(self.group(key), set()).add(key)
+
+    def _discard(self, key: Hashable):
+        if key in self._data or key in self._inflight:
+            return
+        group = self.group(key)
+        keys = self._groups.get(group)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._groups[group]
+
+    def invalidate_groups(self, *groups: Hashable):
+        """Drop the cached entries of the given groups and keep their in-flight results from being stored"""
+        for group in groups:
+            for key in self._groups.pop(group, ()):
+                self._data.pop(key, None)
+                pending = self._inflight.pop(key, None)
+                if pending is not None:
+                    self._stale.add(pending)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["inflight"] = len(self._inflight)
+        stats["coalesced"] = self.coalesced
+        return stats
@@ -0,0 +1,81 @@
+"""
+Pluggable notification senders, selected with the NOTIFICATION_SENDER setting.
+
+A message is a dict with "kind", "to_email", "to_mobile", "subject" and "body". A
+sender raises on failure; callers decide whether to retry.
+"""
+import asyncio
+import json
+import logging
+import smtplib
+import urllib.request
+from email.message import EmailMessage
+from app.core.config import settings
+from typing import Any, Dict, List
+
+class NotificationSender:
+    name = "base"
+
+    async def send(self, message: Dict[str, Any]):
+        raise NotImplementedError
+
+class LogSender(NotificationSender):
+    """Local stub: logs every message and keeps the most recent ones for inspection in tests"""
+    name = "log"
+
+    def __init__(self, keep: int = 1000):
+        self.keep = keep
+        self.sent: List[Dict[str, Any]] = []
+
+    async def send(self, message: Dict[str, Any]):
+        logging.info(f"Notification [{message.get('kind')}] to {message.get('to_email')}: {message.get('subject')}")
+        self.sent.append(message)
+        del self.sent[:-self.keep]
+
+class SMTPSender(NotificationSender):
+    name = "smtp"
+
+    def _send_blocking(self, message: Dict[str, Any]):
+        email = EmailMessage()
+        email["From"] = settings.SMTP_FROM
+        email["To"] = message["to_email"]
+        email["Subject"] = message["subject"]
+        email.set_content(message["body"])
+        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.NOTIFICATION_TIMEOUT_SECONDS) as smtp:
+            if settings.SMTP_USERNAME:
+                smtp.starttls()
+                smtp.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+            smtp.send_message(email)
+
+    async def send(self, message: Dict[str, Any]):
+        await asyncio.to_thread(self._send_blocking, message)
+
+class WebhookSender(NotificationSender):
+    """POSTs the message as JSON, e.g. to an SMS gateway or a notification service"""
+    name = "webhook"
+
+    def _send_blocking(self, message: Dict[str, Any]):
+        request = urllib.request.Request(
+            settings.NOTIFICATION_WEBHOOK_URL,
+            data=json.dumps(message, default=str).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=settings.NOTIFICATION_TIMEOUT_SECONDS) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"Webhook returned HTTP {response.status}")
+
+    async def send(self, message: Dict[str, Any]):
+        await asyncio.to_thread(self._send_blocking, message)
+
+SENDERS = {sender.name: sender for sender in (LogSender, SMTPSender, WebhookSender)}
+
+_sender = None
+
+def get_sender() -> NotificationSender:
+    global _sender
+    if _sender is None:
+        if settings.NOTIFICATION_SENDER not in SENDERS:
+            raise ValueError(f"Unknown NOTIFICATION_SENDER: {settings.NOTIFICATION_SENDER}")
+        _sender = SENDERS[settings.NOTIFICATION_SENDER]()
+    return _sender
@@ -0,0 +1,67 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import BigInteger, Integer, tuple_  # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from typing import Any, List, Optional, Sequence, Tuple
+
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _matches(value: Any, column) -> bool:
+    """Whether a decoded cursor value can be compared with ``column`` in SQL"""
+    try:
+        expected = column.type.python_type
+    except NotImplementedError:
+        return True
+    if isinstance(value, bool) or expected is bool:
+        return isinstance(value, bool) and expected is bool
+    if expected is float:
+        return isinstance(value, (int, float))
+    if not isinstance(value, expected):
+        return False
+    if isinstance(column.type, Integer):
+        # Out of range values would fail in the database rather than here
+        bits = 63 if isinstance(column.type, BigInteger) else 31
+        return -2 ** bits <= value < 2 ** bits
+    return True
+
+def decode_cursor(cursor: Optional[str], columns: Sequence[Any]) -> Optional[List[Any]]:
+    """Decode an opaque cursor into one value per sort column; an empty cursor means the first page"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = [datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in json.loads(raw)]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if len(values) != len(columns) or not all(_matches(value, column) for value, column in zip(values, columns)):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return values
+
+async def fetch_keyset_page(
+    db: AsyncSession,
+    query,
+    columns: Sequence[Any],
+    cursor: Optional[str],
+    limit: int
+) -> Tuple[list, Optional[str]]:
+    """Fetch one page ordered by ``columns`` (the last must be unique) and the cursor for the next one"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_cursor(cursor, columns)
+    if after is not None:
+        query = query.where(tuple_(*columns) > tuple_(*after))
+    query = query.order_by(*columns).limit(limit + 1)
+    result = await db.execute(query)
+    items = list(result.scalars().all())
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+    return items, next_cursor
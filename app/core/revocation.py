@@ -0,0 +1,61 @@
+import heapq
+import time
+from typing import Dict, List, Optional, Union
+
+class RevocationSet:
+    """Revoked token ids grouped into expiry buckets.
+
+    Each entry lives only until the token it revokes would have expired, so
+    the set is bounded by the number of live tokens no matter how many
+    logouts arrive. Whole buckets are dropped at once as their time passes.
+    """
+
+    def __init__(self, bucket_seconds: int = 60):
+        self.bucket_seconds = bucket_seconds
+        self._expiry: Dict[Union[int, str], int] = {}
+        self._buckets: Dict[int, List[Union[int, str]]] = {}
+        self._heap: List[int] = []
+
+    @staticmethod
+    def _key(jti: str) -> Union[int, str]:
+        # uuid4 hex ids are stored as a single int instead of a 32-char string
+        try:
+            return int(jti, 16)
+        except ValueError:
+            return jti
+
+    def add(self, jti: str, expires_at: float):
+        if expires_at <= time.time():
+            return
+        key = self._key(jti)
+        if key in self._expiry:
+            return
+        bucket = int(expires_at // self.bucket_seconds) + 1
+        self._expiry[key] = bucket
+        if bucket not in self._buckets:
+            self._buckets[bucket] = []
+            heapq.heappush(self._heap, bucket)
+        self._buckets[bucket].append(key)
+
+    def _purge(self):
+        current = int(time.time() // self.bucket_seconds)
+        while self._heap and self._heap[0] <= current:
+            for key in self._buckets.pop(heapq.heappop(self._heap)):
+                self._expiry.pop(key, None)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            return False
+        self._purge()
+        return self._key(jti) in self._expiry
+
+    def __len__(self) -> int:
+        self._purge()
+        return len(self._expiry)
+
+    def stats(self):
+        return {
+            "size": len(self),
+            "buckets": len(self._buckets),
+            "bucket_seconds": self.bucket_seconds
+        }
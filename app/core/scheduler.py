@@ -1,57 +1,228 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 from app.db.session import AsyncSessionLocal
-from app.models.appointment import Appointment, AppointmentStatus
-from app.models.user import User, UserRole
+from app.core.config import settings
+from app.services.token import purge_expired_revocations
+from app.services.reports import generate_and_store_monthly_report
+from app.services.reminders import enqueue_reminders
+from app.services.outbox import drain_outbox
+from app.services.appointment import expire_stale_appointments
+from app.core.notifications import get_sender
+from app.services.jobs import (
+    HOLDER_ID,
+    is_leader,
+    renew_lease,
+    release_lease,
+    start_job_run,
+    finish_job_run,
+    record_skipped_run,
+    fail_orphaned_job_runs,
+    keep_job_run_alive,
+    run_instrumented
+)
 from datetime import datetime, timedelta
+from functools import wraps
+from typing import Any, Dict, Optional
+import asyncio
 import logging
+import uuid
 
 scheduler = AsyncIOScheduler()
 
+# Cron jobs only the leader runs, by name, with their triggers for catching up after a takeover
+leader_jobs: Dict[str, Any] = {}
+
+def firing_key(name: str, fire_time: datetime) -> str:
+    """run_key of a scheduled firing; every process derives the same key for the same minute"""
+    return f"{name}:{fire_time:%Y-%m-%dT%H:%M}"
+
+async def execute_job(job, run_key: str) -> Optional[Dict[str, Any]]:
+    """Run an instrumented job and record it in job_runs; None if run_key was taken or the job is running"""
+    name = job.__name__
+    async with AsyncSessionLocal() as db:
+        run_id = await start_job_run(db, name, run_key)
+    if run_id is None:
+        return None
+    # Started before run_instrumented so the heartbeat's queries are not counted as the job's
+    heartbeat = asyncio.create_task(keep_job_run_alive(run_id))
+    try:
+        metrics = await run_instrumented(name, job)
+    finally:
+        heartbeat.cancel()
+    async with AsyncSessionLocal() as db:
+        await finish_job_run(db, run_id, metrics)
+    logging.info(
+        f"Job {name}: duration_ms={metrics['duration_ms']} queries={metrics['query_count']} "
+        f"rows={metrics['rows_processed']} error={metrics['error']}"
+    )
+    return metrics
+
+def latest_firing(trigger, since: datetime, until: datetime) -> Optional[datetime]:
+    """The last time ``trigger`` fired in [since, until], if any"""
+    latest = None
+    fire_time = trigger.get_next_fire_time(None, since)
+    while fire_time is not None and fire_time <= until:
+        latest = fire_time
+        fire_time = trigger.get_next_fire_time(fire_time, fire_time)
+    return latest
+
+async def execute_firing(job, fire_time: datetime) -> Optional[Dict[str, Any]]:
+    """
+    Run one scheduled firing of a job. A firing some process already took is left alone; one
+    that finds another run of the job in progress is recorded as skipped instead of vanishing.
+    """
+    name = job.__name__
+    run_key = firing_key(name, fire_time)
+    metrics = await execute_job(job, run_key)
+    if metrics is None:
+        async with AsyncSessionLocal() as db:
+            if await record_skipped_run(db, name, run_key):
+                logging.warning(f"Skipped firing of {name} scheduled for {fire_time}: another run was in progress")
+    return metrics
+
+def scheduled_firing(trigger, now: datetime) -> Optional[datetime]:
+    """The firing a call at ``now`` belongs to: the trigger's latest fire time at or before it"""
+    return latest_firing(trigger, now - timedelta(seconds=settings.SCHEDULER_CATCHUP_SECONDS), now)
+
+def leader_only(job):
+    """Run the job only in the lease holder, once per firing, and record it in job_runs"""
+    @wraps(job)
+    async def run():
+        if not is_leader():
+            return
+        # APScheduler does not pass the scheduled time. Keying on it rather than on the clock
+        # keeps a late call on the same run_key as the old leader's on-time run of the firing
+        fire_time = scheduled_firing(leader_jobs[job.__name__][1], datetime.now().astimezone())
+        if fire_time is not None:
+            await execute_firing(job, fire_time)
+    return run
+
+def schedule_leader_job(job, **cron):
+    """Add a leader_only cron job and remember its trigger for catch_up_missed_firings"""
+    # A late call still runs its firing once rather than being dropped as a misfire
+    scheduled = scheduler.add_job(
+        leader_only(job), 'cron', misfire_grace_time=settings.SCHEDULER_CATCHUP_SECONDS, coalesce=True, **cron
+    )
+    leader_jobs[job.__name__] = (job, scheduled.trigger)
+
+async def catch_up_missed_firings():
+    """
+    Run on taking over leadership. Firings that fell between the old leader's death and the
+    takeover were skipped by every process. For each leader job, look up the run_key of its
+    latest firing within SCHEDULER_CATCHUP_SECONDS in job_runs and run it if nobody recorded it.
+    """
+    async with AsyncSessionLocal() as db:
+        orphaned = await fail_orphaned_job_runs(db)
+    if orphaned:
+        logging.warning(f"Marked {orphaned} job runs whose process died as failed")
+    now = datetime.now().astimezone()
+    since = now - timedelta(seconds=settings.SCHEDULER_CATCHUP_SECONDS)
+    for name, (job, trigger) in leader_jobs.items():
+        fire_time = latest_firing(trigger, since, now)
+        if fire_time is None or not is_leader():
+            continue
+        if await execute_firing(job, fire_time) is not None:
+            logging.info(f"Caught up missed firing of {name} scheduled for {fire_time}")
+
+def instrumented(job):
+    """Collect in-process metrics for a frequent job without writing a job_runs row per firing"""
+    @wraps(job)
+    async def run():
+        await run_instrumented(job.__name__, job)
+    return run
+
+async def renew_scheduler_lease():
+    try:
+        async with AsyncSessionLocal() as db:
+            was_leader = is_leader()
+            leader = await renew_lease(db)
+        if leader != was_leader:
+            logging.info(f"Scheduler leadership {'acquired' if leader else 'lost'} by {HOLDER_ID}")
+        if leader and not was_leader:
+            # Separately, so a long catch-up run does not hold up lease renewals
+            scheduler.add_job(catch_up_missed_firings)
+    except Exception:
+        # The local lease lapses on its own if renewals keep failing
+        logging.exception("Scheduler lease renewal failed")
+
 async def send_appointment_reminders():
     async with AsyncSessionLocal() as db:
-        now = datetime.now()
-        reminder_time = now + timedelta(days=1)
-        result = await db.execute(
-            select(Appointment).where(
-                Appointment.appointment_datetime.between(reminder_time.replace(hour=0, minute=0, second=0, microsecond=0),
-                                                        reminder_time.replace(hour=23, minute=59, second=59, microsecond=999999)),
-                Appointment.status == AppointmentStatus.confirmed
-            )
+        tomorrow = datetime.now() + timedelta(days=1)
+        queued = await enqueue_reminders(
+            db,
+            tomorrow.replace(hour=0, minute=0, second=0, microsecond=0),
+            tomorrow.replace(hour=23, minute=59, second=59, microsecond=999999)
         )
-        appointments = result.scalars().all()
-        for appt in appointments:
-            # Here you would send an email/SMS reminder
-            logging.info(f"Reminder: Appointment for patient {appt.patient_id} with doctor {appt.doctor_id} at {appt.appointment_datetime}")
+        logging.info(f"Queued {queued} appointment reminders")
+        return queued
+
+async def drain_notification_outbox():
+    async with AsyncSessionLocal() as db:
+        totals = await drain_outbox(db, get_sender())
+        if totals["batches"]:
+            logging.info(
+                f"Notification outbox: batches={totals['batches']} sent={totals['sent']} "
+                f"failed={totals['failed']} seconds={totals['seconds']}"
+            )
+        return totals["sent"] + totals["failed"] + totals["stale"]
 
 async def generate_monthly_report():
     async with AsyncSessionLocal() as db:
-        now = datetime.now()
-        first_day = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        last_month = first_day - timedelta(days=1)
-        start = last_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        end = last_month.replace(hour=23, minute=59, second=59, microsecond=999999)
-        result = await db.execute(
-            select(User).where(User.role == UserRole.doctor)
+        last_month = datetime.now().replace(day=1) - timedelta(days=1)
+        report = await generate_and_store_monthly_report(db, last_month.year, last_month.month)
+        logging.info(
+            f"Monthly Report {report['period']}: Doctors={report['total_doctors']}, "
+            f"Appointments={report['total_appointments']}, Earnings={report['total_earnings']}, "
+            f"Patients={report['total_unique_patients']}"
         )
-        doctors = result.scalars().all()
-        for doctor in doctors:
-            appt_result = await db.execute(
-                select(Appointment).where(
-                    Appointment.doctor_id == doctor.id,
-                    Appointment.appointment_datetime.between(start, end),
-                    Appointment.status == AppointmentStatus.completed
-                )
-            )
-            appointments = appt_result.scalars().all()
-            total_appointments = len(appointments)
-            total_earnings = sum([doctor.consultation_fee or 0 for _ in appointments])
-            total_patients = len(set([appt.patient_id for appt in appointments]))
-            # Here you would generate and send/store the report
-            logging.info(f"Monthly Report for Dr.{doctor.full_name}: Visits={total_patients}, Appointments={total_appointments}, Earnings={total_earnings}")
+        return len(report["doctor_reports"])
+
+async def expire_pending_appointments():
+    async with AsyncSessionLocal() as db:
+        expired = await expire_stale_appointments(db)
+        logging.info(f"Expired {expired} stale pending appointments")
+        return expired
+
+async def purge_revoked_tokens():
+    async with AsyncSessionLocal() as db:
+        purged = await purge_expired_revocations(db)
+        logging.info(f"Purged {purged} expired token revocations")
+        return purged
+
+JOBS = {
+    job.__name__: job
+    for job in (
+        send_appointment_reminders,
+        drain_notification_outbox,
+        generate_monthly_report,
+        expire_pending_appointments,
+        purge_revoked_tokens
+    )
+}
+
+async def run_job_now(name: str) -> Optional[Dict[str, Any]]:
+    """
+    Run a job immediately in this process, regardless of leadership, e.g. to benchmark it;
+    None if a run of it, scheduled or manual, is still in progress in any process
+    """
+    return await execute_job(JOBS[name], f"{name}:manual:{uuid.uuid4().hex}")
 
 def start_scheduler():
-    scheduler.add_job(send_appointment_reminders, 'cron', hour=8, minute=0)
-    scheduler.add_job(generate_monthly_report, 'cron', day=1, hour=2, minute=0)
-    scheduler.start() 
\ No newline at end of file
+    # Every worker competes for the lease; only the holder runs the cron jobs
+    scheduler.add_job(
+        renew_scheduler_lease, 'interval', seconds=settings.SCHEDULER_LEASE_RENEW_SECONDS,
+        next_run_time=datetime.now(), max_instances=1, coalesce=True
+    )
+    schedule_leader_job(send_appointment_reminders, hour=8, minute=0)
+    schedule_leader_job(generate_monthly_report, day=1, hour=2, minute=0)
+    schedule_leader_job(purge_revoked_tokens, hour=3, minute=0)
+    schedule_leader_job(expire_pending_appointments, minute=f"*/{settings.EXPIRY_INTERVAL_MINUTES}")
+    # Every worker drains; SKIP LOCKED keeps them off each other's rows
+    scheduler.add_job(instrumented(drain_notification_outbox), 'interval', seconds=settings.OUTBOX_POLL_SECONDS, max_instances=1, coalesce=True)
+    scheduler.start()
+
+async def stop_scheduler():
+    scheduler.shutdown(wait=False)
+    if is_leader():
+        async with AsyncSessionLocal() as db:
+            await release_lease(db)
@@ -1,7 +1,10 @@
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from jose import jwt, JWTError
-from typing import Optional
+from typing import Optional, Callable, Any
 from app.core.config import settings
+import asyncio
+import uuid
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
@@ -11,6 +14,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -19,4 +23,42 @@ def decode_access_token(token: str):
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
     except JWTError:
-        return None 
\ No newline at end of file
+        return None
+
+class PasswordPoolBusy(Exception):
+    """Every worker and queue slot of the password pool is taken"""
+
+class PasswordWorkPool:
+    """Bounded thread pool for bcrypt work so hashing never blocks the event loop"""
+
+    def __init__(self, max_workers: int, queue_limit: int):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password")
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        # Shed load instead of queueing without bound during a login storm
+        if self._in_flight >= self.max_workers + self.queue_limit:
+            self.rejected += 1
+            raise PasswordPoolBusy()
+        self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._in_flight -= 1
+            self.completed += 1
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self._in_flight,
+            "queued": max(0, self._in_flight - self.max_workers),
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+password_pool = PasswordWorkPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_LIMIT)
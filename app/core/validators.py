@@ -1,12 +1,30 @@
 import re
 from fastapi import HTTPException, UploadFile
 from datetime import datetime
-from typing import List
+from typing import List, Tuple
 
 PASSWORD_REGEX = re.compile(r'^(?=.*[A-Z])(?=.*\d)(?=.*[^A-Za-z0-9]).{8,}$')
 MOBILE_REGEX = re.compile(r'^\+88\d{11}$')
 ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/png"]
 MAX_IMAGE_SIZE_MB = 5
+TIMESLOT_REGEX = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$')
+BUSINESS_START_MINUTE = 8 * 60
+BUSINESS_END_MINUTE = 18 * 60
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+def parse_timeslot(timeslot: str) -> Tuple[int, int]:
+    """Parse 'HH:MM-HH:MM' into (start, end) minutes from midnight; raises ValueError"""
+    match = TIMESLOT_REGEX.match(timeslot) if isinstance(timeslot, str) else None
+    if not match:
+        raise ValueError("Timeslots must be in format 'HH:MM-HH:MM'.")
+    start_h, start_m, end_h, end_m = (int(g) for g in match.groups())
+    if start_h > 23 or end_h > 23 or start_m > 59 or end_m > 59:
+        raise ValueError("Timeslots must be in format 'HH:MM-HH:MM'.")
+    return start_h * 60 + start_m, end_h * 60 + end_m
+
+def parse_timeslots(timeslots: str) -> List[Tuple[int, int]]:
+    """Parse a comma-separated timeslot string, skipping blank entries"""
+    return [parse_timeslot(ts) for ts in timeslots.split(',') if ts.strip()]
 
 def validate_password(password: str):
     if not PASSWORD_REGEX.match(password):
@@ -31,26 +49,17 @@ def validate_timeslots(timeslots: List[str]):
         raise HTTPException(status_code=400, detail="At least one timeslot must be provided.")
     
     for timeslot in timeslots:
-        if not isinstance(timeslot, str) or '-' not in timeslot:
-            raise HTTPException(status_code=400, detail="Timeslots must be in format 'HH:MM-HH:MM'.")
-        
         try:
-            start_str, end_str = timeslot.split('-')
-            start_time = datetime.strptime(start_str.strip(), '%H:%M').time()
-            end_time = datetime.strptime(end_str.strip(), '%H:%M').time()
-            
-            if start_time >= end_time:
-                raise HTTPException(status_code=400, detail="Start time must be before end time.")
-            
-            # Validate business hours (8 AM to 6 PM)
-            business_start = datetime.strptime('08:00', '%H:%M').time()
-            business_end = datetime.strptime('18:00', '%H:%M').time()
-            
-            if start_time < business_start or end_time > business_end:
-                raise HTTPException(status_code=400, detail="Timeslots must be within business hours (08:00-18:00).")
-                
+            start_minute, end_minute = parse_timeslot(timeslot)
         except ValueError:
             raise HTTPException(status_code=400, detail="Timeslots must be in format 'HH:MM-HH:MM'.")
+        
+        if start_minute >= end_minute:
+            raise HTTPException(status_code=400, detail="Start time must be before end time.")
+        
+        # Validate business hours (8 AM to 6 PM)
+        if start_minute < BUSINESS_START_MINUTE or end_minute > BUSINESS_END_MINUTE:
+            raise HTTPException(status_code=400, detail="Timeslots must be within business hours (08:00-18:00).")
 
 def validate_appointment_time(appointment_datetime: datetime):
     """Validate appointment time is in the future and within business hours"""
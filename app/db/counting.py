@@ -0,0 +1,25 @@
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from sqlalchemy import func, select  # type: ignore
+from app.db.explain import explain_plan
+from typing import Optional, Tuple
+
+COUNT_MODES = ("exact", "estimate", "auto", "none")
+# In auto mode, planner estimates above this are returned as-is instead of counted
+AUTO_EXACT_THRESHOLD = 10000
+
+async def estimate_rows(db: AsyncSession, query) -> int:
+    """Planner row estimate for a query, from EXPLAIN without executing it"""
+    plan = await explain_plan(db, query)
+    return int(plan["Plan Rows"])
+
+async def count_rows(db: AsyncSession, query, mode: str = "exact") -> Tuple[Optional[int], bool]:
+    """Return (total, is_estimate) for a select without materializing its rows"""
+    if mode == "none":
+        return None, False
+    if mode in ("estimate", "auto"):
+        estimate = await estimate_rows(db, query)
+        if mode == "estimate" or estimate > AUTO_EXACT_THRESHOLD:
+            return estimate, True
+    count_query = select(func.count()).select_from(query.order_by(None).subquery())
+    result = await db.execute(count_query)
+    return result.scalar_one(), False
@@ -2,7 +2,13 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # type: ig
 from sqlalchemy.orm import sessionmaker  # type: ignore
 from app.core.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=settings.DEBUG, future=True)
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=settings.DEBUG,
+    future=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW
+)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
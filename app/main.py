@@ -11,7 +11,7 @@ from app.api.patient import router as patient_router
 from app.api.admin import router as admin_router
 from app.db.session import AsyncSessionLocal
 from app.core.address_loader import load_addresses_if_empty
-from app.core.scheduler import start_scheduler
+from app.core.scheduler import start_scheduler, stop_scheduler
 import asyncio
 
 app = FastAPI(title="Appion Appointment Booking System")
@@ -36,6 +36,10 @@ def startup_event():
     asyncio.create_task(load())
     start_scheduler()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_scheduler()
+
 app.include_router(auth_router)
 app.include_router(user_router)
 app.include_router(address_router)
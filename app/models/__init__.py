@@ -1,3 +1,9 @@
 from .user import User
 from .address import Division, District, Thana
-from .appointment import Appointment 
\ No newline at end of file
+from .appointment import Appointment
+from .token import RevokedToken
+from .schedule import DoctorScheduleInterval, DoctorScheduleException
+from .statistics import DoctorDailyStat, DoctorDailyPatientSketch, DailySpecializationStat, DailyDivisionStat
+from .report import MonthlyReport
+from .outbox import OutboxMessage
+from .job import SchedulerLease, JobRun 
\ No newline at end of file
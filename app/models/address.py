@@ -12,7 +12,7 @@ class District(Base):
     __tablename__ = "districts"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    division_id = Column(Integer, ForeignKey("divisions.id"), nullable=False)
+    division_id = Column(Integer, ForeignKey("divisions.id"), nullable=False, index=True)
     division = relationship("Division", back_populates="districts")
     thanas = relationship("Thana", back_populates="district")
 
@@ -20,5 +20,5 @@ class Thana(Base):
     __tablename__ = "thanas"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    district_id = Column(Integer, ForeignKey("districts.id"), nullable=False)
+    district_id = Column(Integer, ForeignKey("districts.id"), nullable=False, index=True)
     district = relationship("District", back_populates="thanas") 
\ No newline at end of file
@@ -1,14 +1,21 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Text  # type: ignore
+from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Text, Index, Float, text  # type: ignore
 from sqlalchemy.orm import relationship  # type: ignore
 from sqlalchemy.sql import func  # type: ignore
 from app.db.base import Base
+from datetime import timedelta
 import enum
 
+# Each booking blocks the doctor for this long; enforced by the
+# ex_appointments_doctor_slot exclusion constraint on pending/confirmed rows
+APPOINTMENT_DURATION = timedelta(minutes=60)
+
 class AppointmentStatus(str, enum.Enum):
     pending = "pending"
     confirmed = "confirmed"
     cancelled = "cancelled"
     completed = "completed"
+    # Set by the expiry job on pending appointments whose time passed unconfirmed
+    expired = "expired"
 
 class Appointment(Base):
     __tablename__ = "appointments"
@@ -20,8 +27,28 @@ class Appointment(Base):
     notes = Column(Text, nullable=True)
     symptoms = Column(String, nullable=True)
     status = Column(Enum(AppointmentStatus), default=AppointmentStatus.pending, nullable=False)
+    # Doctor's fee at booking time, so later fee changes leave past revenue alone
+    consultation_fee = Column(Float, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     patient = relationship("User", foreign_keys=[patient_id])
-    doctor = relationship("User", foreign_keys=[doctor_id]) 
\ No newline at end of file
+    doctor = relationship("User", foreign_keys=[doctor_id])
+
+    __table_args__ = (
+        Index("ix_appointments_doctor_id_appointment_datetime", "doctor_id", "appointment_datetime"),
+        Index("ix_appointments_patient_id_appointment_datetime", "patient_id", "appointment_datetime"),
+        # Availability checks only look at pending/confirmed rows
+        Index(
+            "ix_appointments_active_doctor_datetime",
+            "doctor_id",
+            "appointment_datetime",
+            postgresql_where=text("status IN ('pending', 'confirmed')")
+        ),
+        # The expiry job scans pending rows by time
+        Index(
+            "ix_appointments_pending_appointment_datetime",
+            "appointment_datetime",
+            postgresql_where=text("status = 'pending'")
+        ),
+    ) 
\ No newline at end of file
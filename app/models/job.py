@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Index, text  # type: ignore
+from sqlalchemy.sql import func  # type: ignore
+from app.db.base import Base
+
+class SchedulerLease(Base):
+    """Time-limited leadership lease; only the holder runs scheduled jobs"""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+class JobRun(Base):
+    """
+    One execution of a scheduled job; run_key makes each firing run once across processes,
+    and at most one run per job is "running" at a time, scheduled or manual
+    """
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String, nullable=False, index=True)
+    run_key = Column(String, unique=True, nullable=False)
+    holder = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="running", server_default="running")
+    error = Column(Text, nullable=True)
+    duration_ms = Column(Float, nullable=True)
+    query_count = Column(Integer, nullable=True)
+    rows_processed = Column(Integer, nullable=True)
+    started_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    # Refreshed by the running process; a stale heartbeat means the process died
+    heartbeat_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index(
+            "uq_job_runs_running_job_name",
+            "job_name",
+            unique=True,
+            postgresql_where=text("status = 'running'")
+        ),
+    )
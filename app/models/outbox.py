@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index, text  # type: ignore
+from sqlalchemy.sql import func  # type: ignore
+from app.db.base import Base
+
+# pending -> sending (claimed) -> sent, or back to pending with backoff, or failed after the last attempt
+OUTBOX_STATUSES = ("pending", "sending", "sent", "failed")
+
+class OutboxMessage(Base):
+    """Notification written in the same transaction as the change it reports"""
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # e.g. "appointment_confirmed:42"; unique, so each event is enqueued at most once
+    idempotency_key = Column(String, unique=True, nullable=False)
+    event = Column(String, nullable=False)
+    appointment_id = Column(Integer, ForeignKey("appointments.id", ondelete="CASCADE"), nullable=True)
+    status = Column(String, nullable=False, default="pending", server_default="pending")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # The drain only scans messages that are due
+        Index("ix_notification_outbox_pending_next_attempt_at", "next_attempt_at", postgresql_where=text("status = 'pending'")),
+        # The stale-claim sweep only scans messages that are being sent
+        Index("ix_notification_outbox_sending_claimed_at", "claimed_at", postgresql_where=text("status = 'sending'")),
+    )
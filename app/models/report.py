@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, DateTime, JSON  # type: ignore
+from sqlalchemy.sql import func  # type: ignore
+from app.db.base import Base
+
+class MonthlyReport(Base):
+    """Stored monthly report payload, written by the scheduler once the month is over"""
+    __tablename__ = "monthly_reports"
+
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    report = Column(JSON, nullable=False)
+    generated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
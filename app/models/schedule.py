@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index  # type: ignore
+from app.db.base import Base
+
+class DoctorScheduleInterval(Base):
+    """Weekly working interval; minutes are offsets from midnight and weekday 0 is Monday"""
+    __tablename__ = "doctor_schedule_intervals"
+
+    id = Column(Integer, primary_key=True, index=True)
+    doctor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    weekday = Column(Integer, nullable=False)
+    start_minute = Column(Integer, nullable=False)
+    end_minute = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_doctor_schedule_intervals_doctor_id_weekday", "doctor_id", "weekday"),
+    )
+
+class DoctorScheduleException(Base):
+    """Leave or holiday on a specific date; null minutes close the whole day"""
+    __tablename__ = "doctor_schedule_exceptions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    doctor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    date = Column(Date, nullable=False)
+    start_minute = Column(Integer, nullable=True)
+    end_minute = Column(Integer, nullable=True)
+    reason = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_doctor_schedule_exceptions_doctor_id_date", "doctor_id", "date"),
+    )
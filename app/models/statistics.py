@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, Date, Enum, ForeignKey, Float, LargeBinary  # type: ignore
+from app.db.base import Base
+from app.models.appointment import AppointmentStatus
+
+class DoctorDailyStat(Base):
+    """Appointment counts and revenue per (doctor, day, status), kept in step with appointment writes"""
+    __tablename__ = "doctor_daily_stats"
+
+    doctor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    status = Column(Enum(AppointmentStatus), primary_key=True)
+    appointment_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+class DoctorDailyPatientSketch(Base):
+    """HyperLogLog sketch (app.core.hll) of the patients a doctor had appointments with on a day"""
+    __tablename__ = "doctor_daily_patient_sketches"
+
+    doctor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    sketch = Column(LargeBinary, nullable=False)
+
+class DailySpecializationStat(Base):
+    """Appointment counts and revenue per (day, status, doctor specialization); '' stands for no specialization"""
+    __tablename__ = "daily_specialization_stats"
+
+    day = Column(Date, primary_key=True)
+    status = Column(Enum(AppointmentStatus), primary_key=True)
+    specialization = Column(String, primary_key=True)
+    appointment_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+class DailyDivisionStat(Base):
+    """Appointment counts and revenue per (day, status, doctor division); 0 stands for no division"""
+    __tablename__ = "daily_division_stats"
+
+    day = Column(Date, primary_key=True)
+    status = Column(Enum(AppointmentStatus), primary_key=True)
+    division_id = Column(Integer, primary_key=True)
+    appointment_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, ForeignKey, Float  # type: ignore
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, ForeignKey, Float, Index  # type: ignore
 from sqlalchemy.sql import func  # type: ignore
 from sqlalchemy.orm import relationship  # type: ignore
 from app.db.base import Base
@@ -20,10 +20,11 @@ class User(Base):
     profile_image = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped to invalidate issued tokens
     role = Column(Enum(UserRole), nullable=False, default=UserRole.patient)
-    division_id = Column(Integer, ForeignKey("divisions.id"), nullable=True)
-    district_id = Column(Integer, ForeignKey("districts.id"), nullable=True)
-    thana_id = Column(Integer, ForeignKey("thanas.id"), nullable=True)
+    division_id = Column(Integer, ForeignKey("divisions.id"), nullable=True, index=True)
+    district_id = Column(Integer, ForeignKey("districts.id"), nullable=True, index=True)
+    thana_id = Column(Integer, ForeignKey("thanas.id"), nullable=True, index=True)
     division = relationship("Division")
     district = relationship("District")
     thana = relationship("Thana")
@@ -32,6 +33,14 @@ class User(Base):
     experience_years = Column(Integer, nullable=True)
     consultation_fee = Column(Float, nullable=True)
     available_timeslots = Column(String, nullable=True)  # Store as JSON string or comma-separated
+    # Bumped on every schedule change so cached compiled schedules can be checked for staleness
+    schedule_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # The interval table is authoritative once set, so no interval rows means closed
+    has_weekly_schedule = Column(Boolean, nullable=False, default=False, server_default="false")
     specialization = Column(String, nullable=True)  # Doctor specialization
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now()) 
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_users_role_is_active_specialization", "role", "is_active", "specialization"),
+    )
\ No newline at end of file
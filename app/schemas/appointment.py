@@ -1,5 +1,5 @@
 from pydantic import BaseModel, validator
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 from app.models.appointment import AppointmentStatus
 
@@ -16,6 +16,7 @@ class AppointmentRead(AppointmentBase):
     id: int
     patient_id: int
     status: AppointmentStatus
+    consultation_fee: Optional[float] = None
     created_at: Optional[datetime]
     updated_at: Optional[datetime]
 
@@ -23,4 +24,21 @@ class AppointmentRead(AppointmentBase):
         from_attributes = True
 
 class AppointmentStatusUpdate(BaseModel):
-    status: AppointmentStatus 
\ No newline at end of file
+    status: AppointmentStatus
+
+MAX_BATCH_AVAILABILITY_ITEMS = 5000
+
+class AvailabilityCheckItem(BaseModel):
+    doctor_id: int
+    appointment_datetime: datetime
+
+class AvailabilityBatchRequest(BaseModel):
+    items: List[AvailabilityCheckItem]
+
+    @validator('items')
+    def validate_items(cls, v):
+        if not v:
+            raise ValueError('At least one item must be provided')
+        if len(v) > MAX_BATCH_AVAILABILITY_ITEMS:
+            raise ValueError(f'At most {MAX_BATCH_AVAILABILITY_ITEMS} items can be checked at once')
+        return v
@@ -4,9 +4,10 @@ try:
     from pydantic import model_validator  # v2
 except ImportError:
     model_validator = None
-from typing import Optional
-from datetime import datetime
+from typing import Optional, Dict, List
+from datetime import datetime, date
 from app.models.user import UserRole
+from app.core.validators import parse_timeslot, parse_timeslots, WEEKDAYS
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -70,6 +71,17 @@ class UserRead(UserBase):
 
     model_config = ConfigDict(from_attributes=True, use_enum_values=True)
 
+class UserPage(BaseModel):
+    items: List[UserRead]
+    next_cursor: Optional[str] = None
+
+class TokenPrincipal(BaseModel):
+    """Authenticated caller resolved from access token claims"""
+    id: int
+    email: EmailStr
+    role: UserRole
+    is_active: bool
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
@@ -78,19 +90,50 @@ class DoctorScheduleUpdate(BaseModel):
     available_timeslots: str  # Accept as comma-separated string
     consultation_fee: Optional[float] = None
     specialization: Optional[str] = None
+    # Per-weekday overrides, e.g. {"friday": "", "saturday": "09:00-12:00"}
+    weekly_timeslots: Optional[Dict[str, str]] = None
 
     @validator('available_timeslots')
     def validate_timeslots(cls, v):
         if not v:
             raise ValueError('At least one timeslot must be provided')
-        timeslots = [ts.strip() for ts in v.split(',')]
-        for timeslot in timeslots:
-            if not isinstance(timeslot, str) or '-' not in timeslot:
-                raise ValueError('Timeslots must be in format "HH:MM-HH:MM"')
+        try:
+            parse_timeslots(v)
+        except ValueError:
+            raise ValueError('Timeslots must be in format "HH:MM-HH:MM"')
+        return v
+
+    @validator('weekly_timeslots')
+    def validate_weekly_timeslots(cls, v):
+        if v is None:
+            return v
+        for day, timeslots in v.items():
+            if day.lower() not in WEEKDAYS:
+                raise ValueError(f'Unknown weekday "{day}"')
             try:
-                start, end = timeslot.split('-')
-                datetime.strptime(start.strip(), '%H:%M')
-                datetime.strptime(end.strip(), '%H:%M')
-            except:
+                parse_timeslots(timeslots or '')
+            except ValueError:
                 raise ValueError('Timeslots must be in format "HH:MM-HH:MM"')
-        return v 
\ No newline at end of file
+        return v
+
+    def weekly_overrides(self) -> Optional[Dict[int, str]]:
+        if self.weekly_timeslots is None:
+            return None
+        return {WEEKDAYS.index(day.lower()): timeslots for day, timeslots in self.weekly_timeslots.items()}
+
+class ScheduleExceptionCreate(BaseModel):
+    date: date
+    timeslot: Optional[str] = None  # 'HH:MM-HH:MM' to close part of the day; omit to close all of it
+    reason: Optional[str] = None
+
+    @validator('timeslot')
+    def validate_timeslot(cls, v):
+        if v is None:
+            return v
+        try:
+            start, end = parse_timeslot(v)
+        except ValueError:
+            raise ValueError('Timeslot must be in format "HH:MM-HH:MM"')
+        if start >= end:
+            raise ValueError('Start time must be before end time')
+        return v
@@ -0,0 +1,111 @@
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from sqlalchemy.future import select  # type: ignore
+from sqlalchemy import Date, cast, func, literal_column  # type: ignore
+from app.models.appointment import AppointmentStatus
+from app.models.statistics import DailySpecializationStat, DailyDivisionStat
+from app.models.address import Division
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+GRANULARITIES = ("day", "week", "month")
+GROUP_BY_DIMENSIONS = ("specialization", "division")
+MAX_TIMESERIES_BUCKETS = 400
+MAX_TIMESERIES_GROUPS = 100
+
+def bucket_count(start: date, end: date, granularity: str) -> int:
+    """Upper bound on the number of buckets a range produces"""
+    if granularity == "day":
+        return (end - start).days + 1
+    if granularity == "week":
+        return (end - start).days // 7 + 2
+    return (end.year - start.year) * 12 + end.month - start.month + 1
+
+def bucket_starts(start: date, end: date, granularity: str) -> List[date]:
+    """First day of every bucket overlapping [start, end], as date_trunc labels them"""
+    if granularity == "week":
+        current = start - timedelta(days=start.weekday())
+    elif granularity == "month":
+        current = start.replace(day=1)
+    else:
+        current = start
+    buckets = []
+    while current <= end:
+        buckets.append(current)
+        if granularity == "month":
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=7 if granularity == "week" else 1)
+    return buckets
+
+async def get_appointment_timeseries(
+    db: AsyncSession,
+    start: date,
+    end: date,
+    granularity: str = "day",
+    group_by: Optional[str] = None,
+    limit: int = 20
+) -> Dict[str, Any]:
+    """
+    Bookings, completions and cancellations per bucket, optionally per group, from the
+    specialization and division rollups. Every bucket in the range is present; empty ones are zero.
+    """
+    if granularity not in GRANULARITIES or (group_by is not None and group_by not in GROUP_BY_DIMENSIONS):
+        raise ValueError("Unsupported granularity or group_by")
+    # A day holds one row per status and group, not per doctor; the ungrouped series sums divisions,
+    # which are a fixed handful where specializations are free text
+    table = DailySpecializationStat if group_by == "specialization" else DailyDivisionStat
+    # date_trunc's unit is inlined: a bound parameter would differ between SELECT and GROUP BY
+    bucket = cast(func.date_trunc(literal_column(f"'{granularity}'"), table.day), Date).label("bucket")
+    query = select(
+        bucket,
+        func.sum(table.appointment_count).label("bookings"),
+        func.sum(table.appointment_count).filter(table.status == AppointmentStatus.completed).label("completed"),
+        func.sum(table.appointment_count).filter(table.status == AppointmentStatus.cancelled).label("cancelled"),
+        func.sum(table.revenue).label("revenue")
+    ).where(table.day >= start, table.day <= end)
+    keys: List[Any] = []
+    if group_by == "specialization":
+        keys = [table.specialization.label("key")]
+    elif group_by == "division":
+        keys = [table.division_id.label("key"), Division.name.label("label")]
+        query = query.outerjoin(Division, Division.id == table.division_id)
+    query = query.add_columns(*keys).group_by(bucket, *[column.element for column in keys])
+    rows = (await db.execute(query)).all()
+
+    series: Dict[Any, Dict[str, Any]] = {}
+    if group_by is None:
+        series[None] = {"key": None, "label": None, "total_bookings": 0, "points": {}}
+    for row in rows:
+        # '' and 0 are the rollups' stand-ins for doctors without a specialization or division
+        key = (row.key or None) if group_by else None
+        entry = series.setdefault(key, {
+            "key": key,
+            "label": row.label if group_by == "division" else key,
+            "total_bookings": 0,
+            "points": {}
+        })
+        entry["total_bookings"] += row.bookings or 0
+        entry["points"][row.bucket] = {
+            "bucket": row.bucket.isoformat(),
+            "bookings": row.bookings or 0,
+            "completed": row.completed or 0,
+            "cancelled": row.cancelled or 0,
+            "revenue": row.revenue or 0
+        }
+    buckets = bucket_starts(start, end, granularity)
+    for entry in series.values():
+        points = entry["points"]
+        entry["points"] = [
+            points.get(day) or {"bucket": day.isoformat(), "bookings": 0, "completed": 0, "cancelled": 0, "revenue": 0}
+            for day in buckets
+        ]
+    # Busiest groups first, capped server-side
+    ordered = sorted(series.values(), key=lambda entry: entry["total_bookings"], reverse=True)
+    return {
+        "granularity": granularity,
+        "group_by": group_by,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "series": ordered[:limit],
+        "truncated": len(ordered) > limit
+    }
@@ -1,30 +1,92 @@
 from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
 from sqlalchemy.future import select  # type: ignore
-from sqlalchemy import and_  # type: ignore
+from sqlalchemy import and_, insert, literal, cast, func, update  # type: ignore
+from sqlalchemy.exc import IntegrityError  # type: ignore
+from sqlalchemy.orm import aliased  # type: ignore
 from app.models.appointment import Appointment, AppointmentStatus
 from app.models.user import User, UserRole
 from app.schemas.appointment import AppointmentCreate
 from datetime import datetime, timedelta
-from app.services.doctor import is_doctor_available_at_time
+from typing import Optional
+from app.services.doctor import is_doctor_available_at_time, conflicting_appointments
+from app.services.schedule import get_compiled_schedule
+from app.services.availability import invalidate_slots
+from app.services.dashboard import invalidate_dashboards
+from app.services.outbox import enqueue_appointment_event, status_event
+from app.services.stats import record_status_change, record_bulk_status_change, add_patient_to_sketch, get_status_totals, get_patient_status_counts
+from app.db.counting import count_rows
+from app.core.pagination import fetch_keyset_page
+from app.core.config import settings
 
-async def create_appointment(db: AsyncSession, patient_id: int, appointment_in: AppointmentCreate):
-    appointment = Appointment(
-        patient_id=patient_id,
-        doctor_id=appointment_in.doctor_id,
-        appointment_datetime=appointment_in.appointment_datetime,
-        notes=appointment_in.notes,
-        symptoms=appointment_in.symptoms,
-        status=AppointmentStatus.pending
-    )
-    db.add(appointment)
-    await db.commit()
-    await db.refresh(appointment)
+class SlotUnavailableError(Exception):
+    """The doctor's slot is held by another active appointment"""
+
+def _on_appointment_changed(appointment: Appointment):
+    """Invalidate derived caches after an appointment row is written"""
+    invalidate_slots(appointment.doctor_id, appointment.appointment_datetime)
+    invalidate_dashboards(appointment.doctor_id, appointment.patient_id)
+
+async def create_appointment(db: AsyncSession, patient_id: int, appointment_in: AppointmentCreate) -> Optional[Appointment]:
+    """Insert the appointment only if the doctor is active and the slot is free; None otherwise"""
+    table = Appointment.__table__
+    existing = aliased(Appointment)
+    values = {
+        "patient_id": patient_id,
+        "doctor_id": appointment_in.doctor_id,
+        "appointment_datetime": appointment_in.appointment_datetime,
+        "notes": appointment_in.notes,
+        "symptoms": appointment_in.symptoms,
+        "status": AppointmentStatus.pending,
+    }
+    # Explicit casts so the parameters are typed inside INSERT ... SELECT
+    columns = [cast(literal(value, table.c[name].type), table.c[name].type) for name, value in values.items()]
+    # Selecting from the doctor row checks it is an active doctor and snapshots the fee
+    source = select(*columns, User.consultation_fee).where(
+        User.id == appointment_in.doctor_id,
+        User.role == UserRole.doctor,
+        User.is_active == True,
+        ~conflicting_appointments(appointment_in.doctor_id, appointment_in.appointment_datetime, existing).exists()
+    ).with_for_update(of=User, key_share=True)
+    # Conflict check and insert share one statement. FOR NO KEY UPDATE on the doctor row queues a
+    # doctor's bookings behind each other: two overlapping inserts in flight at once would wait on
+    # each other inside the exclusion constraint and deadlock. A booking that waited finds the
+    # slot taken through the constraint.
+    stmt = insert(table).from_select([*values, "consultation_fee"], source).returning(*table.c)
+    try:
+        result = await db.execute(select(Appointment).from_statement(stmt))
+        appointment = result.scalars().first()
+        if appointment is not None:
+            await record_status_change(db, appointment.id, None, appointment.status)
+            await add_patient_to_sketch(db, appointment.id, appointment.patient_id)
+            await enqueue_appointment_event(db, appointment.id, "appointment_booked")
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return None
+    if appointment is not None:
+        _on_appointment_changed(appointment)
     return appointment
 
+async def reserve_appointment(db: AsyncSession, patient_id: int, appointment_in: AppointmentCreate) -> Optional[Appointment]:
+    """Book an appointment in one transaction; None when the doctor is not available"""
+    # Another worker may have changed the schedule since it was cached here
+    schedule = await get_compiled_schedule(db, appointment_in.doctor_id, verify=True)
+    if schedule is None or not schedule.is_active or not schedule.is_open(appointment_in.appointment_datetime):
+        return None
+    return await create_appointment(db, patient_id, appointment_in)
+
 async def get_appointment_by_id(db: AsyncSession, appointment_id: int):
     result = await db.execute(select(Appointment).where(Appointment.id == appointment_id))
     return result.scalars().first()
 
+async def _lock_appointment(db: AsyncSession, appointment_id: int):
+    """Load an appointment for a status change, locked so concurrent changes apply rollup deltas in turn"""
+    result = await db.execute(
+        select(Appointment).where(Appointment.id == appointment_id)
+        .with_for_update().execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
 async def get_appointments_for_user(db: AsyncSession, user_id: int, role: str):
     if role == 'doctor':
         result = await db.execute(select(Appointment).where(Appointment.doctor_id == user_id))
@@ -34,24 +96,64 @@ async def get_appointments_for_user(db: AsyncSession, user_id: int, role: str):
 
 async def is_doctor_available(db: AsyncSession, doctor_id: int, appointment_datetime: datetime) -> bool:
     """Enhanced availability check that considers doctor's schedule"""
-    # First check if doctor exists and is active
-    doctor_result = await db.execute(select(User).where(User.id == doctor_id, User.role == UserRole.doctor))
-    doctor = doctor_result.scalar_one_or_none()
-    if not doctor or not doctor.is_active:
-        return False
-    
-    # Use the enhanced availability check from doctor service
+    # The compiled schedule already carries the doctor's existence and active flag
     return await is_doctor_available_at_time(db, doctor_id, appointment_datetime)
 
 async def update_appointment_status(db: AsyncSession, appointment_id: int, status: AppointmentStatus):
-    appointment = await get_appointment_by_id(db, appointment_id)
+    """
+    Change an appointment's status; None if it does not exist. Raises SlotUnavailableError when
+    reactivating it would overlap a booking made after it was cancelled or expired.
+    """
+    appointment = await _lock_appointment(db, appointment_id)
     if appointment:
+        if appointment.status != status:
+            await enqueue_appointment_event(db, appointment.id, status_event(status))
+        await record_status_change(db, appointment.id, appointment.status, status)
         appointment.status = status
         db.add(appointment)
-        await db.commit()
+        try:
+            await db.commit()
+        except IntegrityError:
+            # ex_appointments_doctor_slot
+            await db.rollback()
+            raise SlotUnavailableError("The doctor already has an appointment at this time.")
         await db.refresh(appointment)
+        _on_appointment_changed(appointment)
     return appointment
 
+async def expire_stale_appointments(db: AsyncSession, batch_size: Optional[int] = None) -> int:
+    """
+    Move pending appointments whose time has passed to expired, one short transaction per
+    batch. Rows locked by a concurrent status change are skipped and picked up next run.
+    Returns the number of appointments expired.
+    """
+    batch_size = batch_size or settings.EXPIRY_BATCH_SIZE
+    expired_total = 0
+    while True:
+        stale = select(Appointment.id).where(
+            Appointment.status == AppointmentStatus.pending,
+            Appointment.appointment_datetime < func.now()
+        ).order_by(Appointment.appointment_datetime).limit(batch_size).with_for_update(skip_locked=True)
+        result = await db.execute(
+            update(Appointment)
+            .where(Appointment.id.in_(stale))
+            .values(status=AppointmentStatus.expired, updated_at=func.now())
+            .returning(Appointment.id, Appointment.doctor_id, Appointment.patient_id, Appointment.appointment_datetime)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        if not rows:
+            await db.rollback()
+            break
+        await record_bulk_status_change(db, [row.id for row in rows], AppointmentStatus.pending, AppointmentStatus.expired)
+        await db.commit()
+        for row in rows:
+            _on_appointment_changed(row)
+        expired_total += len(rows)
+        if len(rows) < batch_size:
+            break
+    return expired_total
+
 async def get_appointments_with_filters(
     db: AsyncSession,
     user_id: int,
@@ -63,7 +165,9 @@ async def get_appointments_with_filters(
     end_date: datetime = None,
     search: str = None,
     skip: int = 0,
-    limit: int = 10
+    limit: int = 10,
+    count_mode: str = "exact",
+    cursor: Optional[str] = None
 ):
     """Get appointments with comprehensive filtering"""
     if role == 'doctor':
@@ -92,25 +196,31 @@ async def get_appointments_with_filters(
             )
         )
     
-    # Get total count before pagination
-    count_result = await db.execute(query)
-    total_count = len(count_result.scalars().all())
+    # Count in the database instead of loading every row
+    total_count, total_is_estimate = await count_rows(db, query, count_mode)
     
-    # Apply pagination
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    appointments = result.scalars().all()
+    # A cursor (empty string for the first page) switches to keyset pagination
+    order_columns = [Appointment.appointment_datetime, Appointment.id]
+    next_cursor = None
+    if cursor is not None:
+        appointments, next_cursor = await fetch_keyset_page(db, query, order_columns, cursor, limit)
+    else:
+        query = query.order_by(*order_columns).offset(skip).limit(limit)
+        result = await db.execute(query)
+        appointments = result.scalars().all()
     
     return {
         "appointments": appointments,
         "total": total_count,
+        "total_is_estimate": total_is_estimate,
         "skip": skip,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": next_cursor
     }
 
 async def cancel_appointment(db: AsyncSession, appointment_id: int, user_id: int, role: str):
     """Cancel an appointment with proper authorization"""
-    appointment = await get_appointment_by_id(db, appointment_id)
+    appointment = await _lock_appointment(db, appointment_id)
     if not appointment:
         return None
     
@@ -125,10 +235,13 @@ async def cancel_appointment(db: AsyncSession, appointment_id: int, user_id: int
     if appointment.status not in [AppointmentStatus.pending, AppointmentStatus.confirmed]:
         return None
     
+    await record_status_change(db, appointment.id, appointment.status, AppointmentStatus.cancelled)
+    await enqueue_appointment_event(db, appointment.id, status_event(AppointmentStatus.cancelled))
     appointment.status = AppointmentStatus.cancelled
     db.add(appointment)
     await db.commit()
     await db.refresh(appointment)
+    _on_appointment_changed(appointment)
     return appointment
 
 async def get_appointment_statistics(
@@ -139,31 +252,18 @@ async def get_appointment_statistics(
     end_date: datetime = None
 ):
     """Get appointment statistics for a user"""
-    if role == 'doctor':
-        query = select(Appointment).where(Appointment.doctor_id == user_id)
-    elif role == 'patient':
-        query = select(Appointment).where(Appointment.patient_id == user_id)
-    else:  # admin
-        query = select(Appointment)
-    
-    if start_date:
-        query = query.where(Appointment.appointment_datetime >= start_date)
-    if end_date:
-        query = query.where(Appointment.appointment_datetime <= end_date)
-    
-    result = await db.execute(query)
-    appointments = result.scalars().all()
-    
-    total = len(appointments)
-    pending = len([a for a in appointments if a.status == AppointmentStatus.pending])
-    confirmed = len([a for a in appointments if a.status == AppointmentStatus.confirmed])
-    completed = len([a for a in appointments if a.status == AppointmentStatus.completed])
-    cancelled = len([a for a in appointments if a.status == AppointmentStatus.cancelled])
+    if role == 'patient':
+        counts = await get_patient_status_counts(db, user_id, start_date, end_date)
+    else:
+        # Doctors and admins read the daily rollup
+        totals = await get_status_totals(db, user_id if role == 'doctor' else None, start_date, end_date)
+        counts = {status.value: totals[status]["count"] for status in AppointmentStatus}
     
     return {
-        "total": total,
-        "pending": pending,
-        "confirmed": confirmed,
-        "completed": completed,
-        "cancelled": cancelled
-    } 
\ No newline at end of file
+        "total": sum(counts[status.value] for status in AppointmentStatus),
+        "pending": counts["pending"],
+        "confirmed": counts["confirmed"],
+        "completed": counts["completed"],
+        "cancelled": counts["cancelled"],
+        "expired": counts["expired"]
+    }
@@ -0,0 +1,318 @@
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from sqlalchemy.future import select  # type: ignore
+from sqlalchemy import DateTime, Integer, and_, cast, func  # type: ignore
+from sqlalchemy.dialects.postgresql import ARRAY  # type: ignore
+from app.models.appointment import Appointment, AppointmentStatus, APPOINTMENT_DURATION
+from app.models.user import User, UserRole
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.validators import BUSINESS_START_MINUTE, BUSINESS_END_MINUTE
+from app.services.schedule import CompiledSchedule, load_compiled_schedules
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Dict, List, Optional
+import math
+import time
+
+MAX_SLOT_RANGE_DAYS = 31
+MAX_SEARCH_RANGE_DAYS = 14
+# Doctors are searched in id-ordered pages of this size to bound memory per query
+SEARCH_DOCTOR_BATCH = 1000
+DURATION_SECONDS = APPOINTMENT_DURATION.total_seconds()
+
+# Free slot minutes keyed by (doctor_id, day) -> {(slot_minutes, tz key): [minutes], "schedule": source}.
+# Advisory only: bookings are invalidated in the worker that made them, so other workers can
+# advertise a just-taken slot until the entry expires. Booking it is still refused by the
+# exclusion constraint.
+slot_cache = TTLCache(maxsize=20000, ttl=settings.SLOT_CACHE_TTL_SECONDS)
+
+def _aware(value: datetime, tz: Optional[tzinfo]) -> datetime:
+    """Attach the caller's timezone, treating naive values as server-local like the rest of the app"""
+    if value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=tz) if tz is not None else value.astimezone()
+
+def _tz_key(tz: Optional[tzinfo]) -> str:
+    return "local" if tz is None else str(tz)
+
+async def load_busy_times_for_ranges(
+    db: AsyncSession,
+    ranges: Dict[int, tuple]
+) -> Dict[int, List[float]]:
+    """Like load_busy_times, but each doctor only over its own (start, end) range; still one query"""
+    busy: Dict[int, List[float]] = {doctor_id: [] for doctor_id in ranges}
+    if not ranges:
+        return busy
+    # One row per doctor from three array parameters, so the statement and its plan stay the same
+    # size however many doctors are asked about
+    windows = func.unnest(
+        cast(list(ranges), ARRAY(Integer)),
+        cast([start - APPOINTMENT_DURATION for start, _ in ranges.values()], ARRAY(DateTime(timezone=True))),
+        cast([end + APPOINTMENT_DURATION for _, end in ranges.values()], ARRAY(DateTime(timezone=True)))
+    ).table_valued("doctor_id", "low", "high").render_derived(name="windows")
+    result = await db.execute(
+        select(Appointment.doctor_id, Appointment.appointment_datetime).join(
+            windows,
+            and_(
+                Appointment.doctor_id == windows.c.doctor_id,
+                Appointment.appointment_datetime > windows.c.low,
+                Appointment.appointment_datetime < windows.c.high
+            )
+        ).where(
+            Appointment.status.in_([AppointmentStatus.pending, AppointmentStatus.confirmed])
+        ).order_by(Appointment.doctor_id, Appointment.appointment_datetime)
+    )
+    for doctor_id, appointment_datetime in result:
+        busy[doctor_id].append(_aware(appointment_datetime, None).timestamp())
+    return busy
+
+async def load_busy_times(
+    db: AsyncSession,
+    doctor_ids: List[int],
+    start: datetime,
+    end: datetime
+) -> Dict[int, List[float]]:
+    """Sorted start timestamps of active appointments per doctor, in one query"""
+    busy: Dict[int, List[float]] = {doctor_id: [] for doctor_id in doctor_ids}
+    if not doctor_ids:
+        return busy
+    result = await db.execute(
+        select(Appointment.doctor_id, Appointment.appointment_datetime).where(
+            Appointment.doctor_id.in_(doctor_ids),
+            Appointment.appointment_datetime > start - APPOINTMENT_DURATION,
+            Appointment.appointment_datetime < end + APPOINTMENT_DURATION,
+            Appointment.status.in_([AppointmentStatus.pending, AppointmentStatus.confirmed])
+        ).order_by(Appointment.doctor_id, Appointment.appointment_datetime)
+    )
+    for doctor_id, appointment_datetime in result:
+        busy[doctor_id].append(_aware(appointment_datetime, None).timestamp())
+    return busy
+
+# Availability is computed on per-day bitmaps with one bit per minute of the day, so
+# intersecting a schedule with bookings is a handful of big-int operations.
+MINUTES_PER_DAY = 24 * 60
+
+def _span(lo: int, hi: int) -> int:
+    """Bitmap with minutes lo..hi (inclusive) set, clamped to the day"""
+    lo = max(lo, 0)
+    hi = min(hi, MINUTES_PER_DAY - 1)
+    if hi < lo:
+        return 0
+    return (1 << (hi + 1)) - (1 << lo)
+
+def start_mask(schedule: CompiledSchedule, day: date, slot_minutes: int) -> int:
+    """Candidate slot starts: every slot_minutes from each interval start, in business hours, not closed"""
+    mask = 0
+    for start, end in schedule.intervals_for(day):
+        for minute in range(max(start, BUSINESS_START_MINUTE), min(end, BUSINESS_END_MINUTE) + 1, slot_minutes):
+            mask |= 1 << minute
+    for closure in schedule.closures.get(day, ()):
+        if closure is None:
+            return 0
+        # Closures are end-exclusive
+        mask &= ~_span(closure[0], closure[1] - 1)
+    return mask
+
+def busy_mask(busy: List[float], midnight: float) -> int:
+    """Minutes whose slot would overlap an active booking (strictly within one duration)"""
+    mask = 0
+    lo_index = bisect_right(busy, midnight - DURATION_SECONDS)
+    hi_index = bisect_right(busy, midnight + MINUTES_PER_DAY * 60 + DURATION_SECONDS)
+    for timestamp in busy[lo_index:hi_index]:
+        lo = math.floor((timestamp - DURATION_SECONDS - midnight) / 60) + 1
+        hi = math.ceil((timestamp + DURATION_SECONDS - midnight) / 60) - 1
+        mask |= _span(lo, hi)
+    return mask
+
+def is_slot_free(busy: List[float], timestamp: float) -> bool:
+    """True when no busy start lies strictly within one appointment duration of timestamp"""
+    index = bisect_right(busy, timestamp - DURATION_SECONDS)
+    return index >= len(busy) or busy[index] >= timestamp + DURATION_SECONDS
+
+def mask_minutes(mask: int, limit: Optional[int] = None) -> List[int]:
+    """Set bit positions in ascending order, optionally only the first ``limit``"""
+    minutes: List[int] = []
+    while mask and (limit is None or len(minutes) < limit):
+        low = mask & -mask
+        minutes.append(low.bit_length() - 1)
+        mask ^= low
+    return minutes
+
+def free_minutes_for_day(
+    schedule: CompiledSchedule,
+    day: date,
+    slot_minutes: int,
+    busy: List[float],
+    tz: Optional[tzinfo]
+) -> List[int]:
+    """Bookable start minutes on a day: inside the schedule and business hours, not closed, not taken"""
+    midnight = _aware(datetime(day.year, day.month, day.day), tz).timestamp()
+    return mask_minutes(start_mask(schedule, day, slot_minutes) & ~busy_mask(busy, midnight))
+
+async def get_free_slots(
+    db: AsyncSession,
+    doctor_id: int,
+    start: datetime,
+    end: datetime,
+    slot_minutes: int = 60
+) -> Optional[List[datetime]]:
+    """Every bookable slot for a doctor in [start, end]; None if the doctor does not exist"""
+    schedule = (await load_compiled_schedules(db, [doctor_id])).get(doctor_id)
+    if schedule is None:
+        return None
+    if not schedule.is_active:
+        return []
+    tz = start.tzinfo
+    variant = (slot_minutes, _tz_key(tz))
+    days = [start.date() + timedelta(days=i) for i in range((end.date() - start.date()).days + 1)]
+    per_day: Dict[date, List[int]] = {}
+    missing: List[date] = []
+    for day in days:
+        cached = slot_cache.get((doctor_id, day))
+        # A rebuilt schedule is a new object, so grids computed from the old one are ignored
+        if cached is not None and cached.get("schedule") is schedule and variant in cached:
+            per_day[day] = cached[variant]
+        else:
+            missing.append(day)
+    if missing:
+        range_start = _aware(datetime.combine(missing[0], datetime.min.time()), tz)
+        range_end = _aware(datetime.combine(missing[-1], datetime.max.time()), tz)
+        busy = (await load_busy_times(db, [doctor_id], range_start, range_end))[doctor_id]
+        for day in missing:
+            minutes = free_minutes_for_day(schedule, day, slot_minutes, busy, tz)
+            per_day[day] = minutes
+            entry = slot_cache.get((doctor_id, day))
+            if entry is None or entry.get("schedule") is not schedule:
+                entry = {"schedule": schedule}
+            entry[variant] = minutes
+            slot_cache.set((doctor_id, day), entry)
+    now = datetime.now(tz) if tz is not None else datetime.now()
+    slots: List[datetime] = []
+    for day in days:
+        midnight = datetime(day.year, day.month, day.day, tzinfo=tz)
+        for minute in per_day[day]:
+            slot = midnight + timedelta(minutes=minute)
+            if start <= slot <= end and slot >= now:
+                slots.append(slot)
+    return slots
+
+def invalidate_slots(doctor_id: int, appointment_datetime: datetime):
+    """Drop cached grids around an appointment's day; neighbours cover callers in other timezones"""
+    day = appointment_datetime.date()
+    for offset in (-1, 0, 1):
+        slot_cache.invalidate((doctor_id, day + timedelta(days=offset)))
+
+async def find_earliest_slots(
+    db: AsyncSession,
+    start: datetime,
+    end: datetime,
+    specialization: Optional[str] = None,
+    division_id: Optional[int] = None,
+    district_id: Optional[int] = None,
+    thana_id: Optional[int] = None,
+    slot_minutes: int = 60,
+    limit: int = 10
+) -> List[Dict]:
+    """
+    First ``limit`` free (doctor, slot) pairs across all matching doctors. Doctors are read in
+    pages; once ``limit`` slots are known, later pages are only searched up to the latest of them.
+    """
+    query = select(User.id, User.full_name, User.specialization).where(
+        User.role == UserRole.doctor, User.is_active == True
+    )
+    if specialization:
+        query = query.where(User.specialization == specialization.lower())
+    if division_id:
+        query = query.where(User.division_id == division_id)
+    if district_id:
+        query = query.where(User.district_id == district_id)
+    if thana_id:
+        query = query.where(User.thana_id == thana_id)
+    tz = start.tzinfo
+    start = _aware(start, tz)
+    end = _aware(end, tz)
+    start_ts = max(start.timestamp(), time.time())
+    end_ts = end.timestamp()
+    # (timestamp, doctor_id, slot) for the best ``limit`` slots so far, in order
+    found: List[tuple] = []
+    names: Dict[int, tuple] = {}
+    last_id = 0
+    while start_ts <= end_ts:
+        doctors = (await db.execute(query.where(User.id > last_id).order_by(User.id).limit(SEARCH_DOCTOR_BATCH))).all()
+        if not doctors:
+            break
+        last_id = doctors[-1].id
+        search_end_ts = found[-1][0] if len(found) >= limit else end_ts
+        batch_found = await _earliest_in_batch(db, [d.id for d in doctors], start_ts, search_end_ts, tz, slot_minutes, limit)
+        found = sorted(found + batch_found)[:limit]
+        names.update((d.id, d) for d in doctors if any(doctor_id == d.id for _, doctor_id, _ in found))
+        if len(doctors) < SEARCH_DOCTOR_BATCH:
+            break
+    return [
+        {
+            "doctor_id": doctor_id,
+            "doctor_name": names[doctor_id].full_name,
+            "specialization": names[doctor_id].specialization,
+            "slot": slot.isoformat()
+        }
+        for _, doctor_id, slot in found
+    ]
+
+async def _earliest_in_batch(
+    db: AsyncSession,
+    doctor_ids: List[int],
+    start_ts: float,
+    end_ts: float,
+    tz: Optional[tzinfo],
+    slot_minutes: int,
+    limit: int
+) -> List[tuple]:
+    """First ``limit`` free slots between two timestamps among one page of doctors, as (timestamp, doctor_id, slot)"""
+    schedules = await load_compiled_schedules(db, doctor_ids)
+    busy = await load_busy_times(
+        db, doctor_ids, datetime.fromtimestamp(start_ts).astimezone(), datetime.fromtimestamp(end_ts).astimezone()
+    )
+    found: List[tuple] = []
+    day = datetime.fromtimestamp(start_ts, tz).date()
+    last_day = datetime.fromtimestamp(end_ts, tz).date()
+    while day <= last_day and len(found) < limit:
+        midnight = _aware(datetime(day.year, day.month, day.day), tz).timestamp()
+        # Minutes of this day inside the requested window and not in the past
+        window = _span(math.ceil((start_ts - midnight) / 60), math.floor((end_ts - midnight) / 60))
+        if window:
+            day_found = []
+            for doctor_id in doctor_ids:
+                schedule = schedules.get(doctor_id)
+                if schedule is None:
+                    continue
+                free = start_mask(schedule, day, slot_minutes) & window & ~busy_mask(busy[doctor_id], midnight)
+                for minute in mask_minutes(free, limit):
+                    day_found.append((minute, doctor_id))
+            day_found.sort()
+            for minute, doctor_id in day_found[:limit - len(found)]:
+                slot = datetime(day.year, day.month, day.day, tzinfo=tz) + timedelta(minutes=minute)
+                found.append((midnight + minute * 60, doctor_id, slot))
+        day += timedelta(days=1)
+    return found
+
+async def check_availability_batch(db: AsyncSession, items: List[tuple]) -> List[bool]:
+    """Resolve many (doctor_id, datetime) pairs with a constant number of queries"""
+    ranges: Dict[int, tuple] = {}
+    for doctor_id, appointment_datetime in items:
+        value = _aware(appointment_datetime, None)
+        if doctor_id in ranges:
+            low, high = ranges[doctor_id]
+            ranges[doctor_id] = (min(low, value), max(high, value))
+        else:
+            ranges[doctor_id] = (value, value)
+    schedules = await load_compiled_schedules(db, list(ranges))
+    bookable = {doctor_id: r for doctor_id, r in ranges.items() if doctor_id in schedules and schedules[doctor_id].is_active}
+    busy = await load_busy_times_for_ranges(db, bookable)
+    results = []
+    for doctor_id, appointment_datetime in items:
+        schedule = schedules.get(doctor_id)
+        if doctor_id not in bookable or not schedule.is_open(appointment_datetime):
+            results.append(False)
+            continue
+        results.append(is_slot_free(busy[doctor_id], _aware(appointment_datetime, None).timestamp()))
+    return results
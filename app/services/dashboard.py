@@ -0,0 +1,78 @@
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from sqlalchemy.future import select  # type: ignore
+from sqlalchemy import func  # type: ignore
+from app.models.user import User, UserRole
+from app.models.appointment import Appointment, AppointmentStatus
+from app.core.cache import ResponseCache
+from app.core.config import settings
+from datetime import datetime
+from typing import Optional, Dict, Any, Awaitable, Callable
+
+# Polled dashboards keyed by (endpoint, user_id, start_date, end_date), invalidated per user
+# and all admin dashboards together
+dashboard_cache = ResponseCache(
+    maxsize=settings.DASHBOARD_CACHE_SIZE,
+    ttl=settings.DASHBOARD_CACHE_TTL_SECONDS,
+    group=lambda key: "admin" if key[0] == "admin" else key[1]
+)
+
+async def cached_dashboard(
+    endpoint: str,
+    user_id: int,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    compute: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """Serve a dashboard from the short-TTL cache; concurrent identical misses share one computation"""
+    return await dashboard_cache.get_or_compute((endpoint, user_id, start_date, end_date), compute)
+
+def invalidate_dashboards(*user_ids: int):
+    """Drop dashboards of the given users and every admin dashboard after an appointment write"""
+    dashboard_cache.invalidate_groups("admin", *user_ids)
+
+async def count_users(db: AsyncSession):
+    return (await db.execute(
+        select(
+            func.count().label("total_users"),
+            func.count().filter(User.role == UserRole.doctor, User.is_active == True).label("total_doctors"),
+            func.count().filter(User.role == UserRole.patient).label("total_patients")
+        ).select_from(User)
+    )).one()
+
+async def count_appointments(db: AsyncSession, start_date: Optional[datetime], end_date: Optional[datetime]):
+    appointments_query = select(
+        func.count().label("total_appointments"),
+        func.count().filter(Appointment.status == AppointmentStatus.completed).label("completed_appointments"),
+        func.count().filter(Appointment.status == AppointmentStatus.pending).label("pending_appointments"),
+        func.count().filter(Appointment.status == AppointmentStatus.cancelled).label("cancelled_appointments"),
+        func.count().filter(Appointment.status == AppointmentStatus.expired).label("expired_appointments"),
+        func.coalesce(
+            func.sum(Appointment.consultation_fee).filter(Appointment.status == AppointmentStatus.completed), 0
+        ).label("total_earnings")
+    ).select_from(Appointment)
+    if start_date:
+        appointments_query = appointments_query.where(Appointment.appointment_datetime >= start_date)
+    if end_date:
+        appointments_query = appointments_query.where(Appointment.appointment_datetime <= end_date)
+    return (await db.execute(appointments_query)).one()
+
+async def get_admin_dashboard_stats(
+    db: AsyncSession,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Admin dashboard totals in two aggregate queries, independent of table size"""
+    users = await count_users(db)
+    appointments = await count_appointments(db, start_date, end_date)
+
+    return {
+        "total_users": users.total_users,
+        "total_doctors": users.total_doctors,
+        "total_patients": users.total_patients,
+        "total_appointments": appointments.total_appointments,
+        "completed_appointments": appointments.completed_appointments,
+        "pending_appointments": appointments.pending_appointments,
+        "cancelled_appointments": appointments.cancelled_appointments,
+        "expired_appointments": appointments.expired_appointments,
+        "total_earnings": appointments.total_earnings
+    }
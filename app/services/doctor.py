@@ -2,7 +2,10 @@ from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
 from sqlalchemy.future import select  # type: ignore
 from sqlalchemy import and_  # type: ignore
 from app.models.user import User, UserRole
-from app.models.appointment import Appointment, AppointmentStatus
+from app.models.appointment import Appointment, AppointmentStatus, APPOINTMENT_DURATION
+from app.services.user import invalidate_principal
+from app.services.stats import get_status_totals, count_unique_patients, shift_doctor_groups
+from app.services.schedule import get_compiled_schedule, replace_weekly_intervals, invalidate_schedule, list_schedule_exceptions
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any
 import json
@@ -13,15 +16,27 @@ async def get_doctor_schedule(db: AsyncSession, doctor_id: int) -> Optional[Dict
     doctor = result.scalar_one_or_none()
     if doctor is None:
         return None
-    # Parse available timeslots
     timeslots = []
     if doctor.available_timeslots is not None:
         timeslots = [ts.strip() for ts in doctor.available_timeslots.split(',') if ts.strip()]
+    schedule = await get_compiled_schedule(db, doctor_id)
+    exceptions = await list_schedule_exceptions(db, doctor_id)
     return {
         "doctor_id": doctor.id,
         "doctor_name": doctor.full_name,
         "specialization": doctor.specialization,
         "available_timeslots": timeslots,
+        "weekly_schedule": schedule.weekly() if schedule and not schedule.unrestricted else None,
+        "exceptions": [
+            {
+                "id": e.id,
+                "date": e.date.isoformat(),
+                "start_minute": e.start_minute,
+                "end_minute": e.end_minute,
+                "reason": e.reason
+            }
+            for e in exceptions
+        ],
         "consultation_fee": doctor.consultation_fee,
         "experience_years": doctor.experience_years
     }
@@ -31,7 +46,8 @@ async def update_doctor_schedule(
     doctor_id: int, 
     available_timeslots: str,
     consultation_fee: Optional[float] = None,
-    specialization: Optional[str] = None
+    specialization: Optional[str] = None,
+    weekly_timeslots: Optional[Dict[int, str]] = None
 ) -> Optional[User]:
     """Update doctor's schedule and professional details"""
     result = await db.execute(select(User).where(User.id == doctor_id, User.role == UserRole.doctor))
@@ -42,11 +58,18 @@ async def update_doctor_schedule(
     doctor.available_timeslots = available_timeslots
     if consultation_fee is not None:
         doctor.consultation_fee = consultation_fee
-    if specialization is not None:
+    if specialization is not None and specialization != doctor.specialization:
+        # Move the doctor's history to the new specialization's analytics rows
+        await shift_doctor_groups(db, doctor.id, -1)
         doctor.specialization = specialization
+        await db.flush()
+        await shift_doctor_groups(db, doctor.id, 1)
     db.add(doctor)
+    await replace_weekly_intervals(db, doctor.id, available_timeslots, weekly_timeslots)
     await db.commit()
     await db.refresh(doctor)
+    invalidate_principal(doctor)
+    invalidate_schedule(doctor.id)
     return doctor
 
 async def is_doctor_available_at_time(
@@ -55,47 +78,32 @@ async def is_doctor_available_at_time(
     appointment_datetime: datetime
 ) -> bool:
     """Check if doctor is available at specific time considering their schedule"""
-    doctor_result = await db.execute(select(User).where(User.id == doctor_id, User.role == UserRole.doctor))
-    doctor = doctor_result.scalar_one_or_none()
-    if doctor is None or not getattr(doctor, 'is_active', True):
+    schedule = await get_compiled_schedule(db, doctor_id)
+    if schedule is None or not schedule.is_active or not schedule.is_open(appointment_datetime):
         return False
-    # Check if doctor has defined timeslots
-    if doctor.available_timeslots is None:
-        return True  # If no schedule defined, assume available
-    # Parse timeslots
-    timeslots = [ts.strip() for ts in doctor.available_timeslots.split(',') if ts.strip()]
-    appointment_time = appointment_datetime.time()
-    for timeslot in timeslots:
-        if '-' in timeslot:
-            try:
-                start_str, end_str = timeslot.split('-')
-                start_time = datetime.strptime(start_str.strip(), '%H:%M').time()
-                end_time = datetime.strptime(end_str.strip(), '%H:%M').time()
-                if start_time <= appointment_time <= end_time:
-                    # Check for conflicting appointments
-                    return await is_doctor_available_for_appointment(db, doctor_id, appointment_datetime)
-            except Exception:
-                continue
-    return False
+    # Check for conflicting appointments
+    return await is_doctor_available_for_appointment(db, doctor_id, appointment_datetime)
 
 async def is_doctor_available_for_appointment(
     db: AsyncSession, 
     doctor_id: int, 
     appointment_datetime: datetime
 ) -> bool:
-    window_start = appointment_datetime - timedelta(minutes=59)
-    window_end = appointment_datetime + timedelta(minutes=59)
     result = await db.execute(
-        select(Appointment).where(
-            and_(
-                Appointment.doctor_id == doctor_id,
-                Appointment.appointment_datetime >= window_start,
-                Appointment.appointment_datetime <= window_end,
-                Appointment.status.in_([AppointmentStatus.pending, AppointmentStatus.confirmed])
-            )
+        select(conflicting_appointments(doctor_id, appointment_datetime).exists())
+    )
+    return not result.scalar()
+
+def conflicting_appointments(doctor_id, appointment_datetime, appointment=Appointment):
+    """Active appointments whose slot overlaps one starting at appointment_datetime"""
+    return select(appointment.id).where(
+        and_(
+            appointment.doctor_id == doctor_id,
+            appointment.appointment_datetime > appointment_datetime - APPOINTMENT_DURATION,
+            appointment.appointment_datetime < appointment_datetime + APPOINTMENT_DURATION,
+            appointment.status.in_([AppointmentStatus.pending, AppointmentStatus.confirmed])
         )
     )
-    return result.scalar_one_or_none() is None
 
 async def get_doctor_appointments(
     db: AsyncSession, 
@@ -118,23 +126,25 @@ async def get_doctor_statistics(
     db: AsyncSession, 
     doctor_id: int, 
     start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None,
+    approximate: bool = False
 ) -> Dict[str, Any]:
-    appointments = await get_doctor_appointments(db, doctor_id, start_date, end_date)
-    total_appointments = len(appointments)
-    completed_appointments = len([a for a in appointments if a.status == AppointmentStatus.completed])
-    pending_appointments = len([a for a in appointments if a.status == AppointmentStatus.pending])
-    cancelled_appointments = len([a for a in appointments if a.status == AppointmentStatus.cancelled])
-    doctor_result = await db.execute(select(User).where(User.id == doctor_id))
-    doctor = doctor_result.scalar_one_or_none()
-    consultation_fee = doctor.consultation_fee if doctor else 0
-    total_earnings = completed_appointments * consultation_fee
-    unique_patients = len(set([a.patient_id for a in appointments]))
+    totals = await get_status_totals(db, doctor_id, start_date, end_date)
+    total_appointments = sum(entry["count"] for entry in totals.values())
+    completed_appointments = totals[AppointmentStatus.completed]["count"]
+    pending_appointments = totals[AppointmentStatus.pending]["count"]
+    cancelled_appointments = totals[AppointmentStatus.cancelled]["count"]
+    expired_appointments = totals[AppointmentStatus.expired]["count"]
+    doctor_result = await db.execute(select(User.consultation_fee).where(User.id == doctor_id))
+    consultation_fee = doctor_result.scalar_one_or_none() or 0
+    total_earnings = totals[AppointmentStatus.completed]["revenue"]
+    unique_patients = await count_unique_patients(db, doctor_id, start_date, end_date, approximate)
     return {
         "total_appointments": total_appointments,
         "completed_appointments": completed_appointments,
         "pending_appointments": pending_appointments,
         "cancelled_appointments": cancelled_appointments,
+        "expired_appointments": expired_appointments,
         "total_earnings": total_earnings,
         "unique_patients": unique_patients,
         "consultation_fee": consultation_fee
@@ -0,0 +1,210 @@
+"""
+Scheduler leadership, job instrumentation and run history.
+
+Every process competes for a lease row; the holder renews it well before it expires and
+is the only process that runs scheduled jobs. If the leader dies, its lease lapses after
+SCHEDULER_LEASE_SECONDS and the next renewal elsewhere takes over. The new leader runs the
+firings it missed (app.core.scheduler).
+
+A process refreshes the heartbeat of each run it is executing, leader or not. A "running" row
+whose heartbeat is older than SCHEDULER_LEASE_SECONDS, or that started more than
+JOB_RUN_TIMEOUT_SECONDS ago, is taken to have died with its process and is failed.
+
+Instrumented jobs record wall time, rows processed (the job's integer return value),
+errors and the number of SQL statements executed while they run. Queries are counted by
+an engine event against a per-run context variable, so concurrent requests are not counted.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from sqlalchemy.future import select  # type: ignore
+from sqlalchemy import case, delete, event, func, or_, update  # type: ignore
+from sqlalchemy.dialects.postgresql import insert  # type: ignore
+from app.models.job import SchedulerLease, JobRun
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, engine
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+
+LEASE_NAME = "scheduler"
+HOLDER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_lease = {"leader": False, "valid_until": 0.0}
+
+_query_counter: ContextVar[Optional[Dict[str, int]]] = ContextVar("job_query_counter", default=None)
+
+# Per-process totals by job name, reported by the admin metrics endpoint
+job_stats: Dict[str, Dict[str, Any]] = {}
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter["queries"] += 1
+
+async def run_instrumented(name: str, job: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+    """Run a job and return its metrics; errors are logged and reported, not raised"""
+    counter = {"queries": 0}
+    token = _query_counter.set(counter)
+    started = time.perf_counter()
+    rows = None
+    error = None
+    try:
+        result = await job()
+        if isinstance(result, int):
+            rows = result
+    except Exception as exc:
+        error = f"{exc.__class__.__name__}: {exc}"
+        logging.exception(f"Job {name} failed")
+    finally:
+        _query_counter.reset(token)
+    metrics = {
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        "query_count": counter["queries"],
+        "rows_processed": rows,
+        "error": error
+    }
+    stats = job_stats.setdefault(name, {"runs": 0, "failures": 0, "total_duration_ms": 0.0, "last": None})
+    stats["runs"] += 1
+    stats["failures"] += 1 if error else 0
+    stats["total_duration_ms"] = round(stats["total_duration_ms"] + metrics["duration_ms"], 2)
+    stats["last"] = metrics
+    return metrics
+
+async def renew_lease(db: AsyncSession, name: str = LEASE_NAME) -> bool:
+    """Take or extend the lease if it is ours or has expired; True while this process leads"""
+    ttl = settings.SCHEDULER_LEASE_SECONDS
+    # Measured before the round-trip so the local view never outlives the stored expiry
+    requested_at = time.monotonic()
+    stmt = insert(SchedulerLease).values(name=name, holder=HOLDER_ID, expires_at=func.now() + timedelta(seconds=ttl))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SchedulerLease.name],
+        set_={"holder": stmt.excluded.holder, "expires_at": stmt.excluded.expires_at},
+        where=or_(SchedulerLease.holder == HOLDER_ID, SchedulerLease.expires_at < func.now())
+    ).returning(SchedulerLease.holder)
+    holder = (await db.execute(stmt)).scalar_one_or_none()
+    await db.commit()
+    leader = holder == HOLDER_ID
+    _lease["leader"] = leader
+    _lease["valid_until"] = requested_at + ttl if leader else 0.0
+    return leader
+
+def is_leader() -> bool:
+    return _lease["leader"] and time.monotonic() < _lease["valid_until"]
+
+async def release_lease(db: AsyncSession, name: str = LEASE_NAME):
+    """Give up leadership on shutdown so another process can take over without waiting for expiry"""
+    _lease["leader"] = False
+    await db.execute(delete(SchedulerLease).where(SchedulerLease.name == name, SchedulerLease.holder == HOLDER_ID))
+    await db.commit()
+
+async def start_job_run(db: AsyncSession, job_name: str, run_key: str) -> Optional[int]:
+    """
+    Record a job run; None if this run_key was already started by some process or another
+    run of the job is still in progress
+    """
+    # Runs whose process died would otherwise block the job for good
+    await fail_orphaned_job_runs(db, job_name)
+    # Conflicts on run_key or on uq_job_runs_running_job_name
+    run_id = (await db.execute(
+        insert(JobRun)
+        .values(job_name=job_name, run_key=run_key, holder=HOLDER_ID)
+        .on_conflict_do_nothing()
+        .returning(JobRun.id)
+    )).scalar_one_or_none()
+    await db.commit()
+    return run_id
+
+async def record_skipped_run(db: AsyncSession, job_name: str, run_key: str) -> bool:
+    """
+    Record a firing that could not start because another run of the job was in progress;
+    False if run_key was already recorded, i.e. some process took the firing
+    """
+    run_id = (await db.execute(
+        insert(JobRun)
+        .values(
+            job_name=job_name,
+            run_key=run_key,
+            holder=HOLDER_ID,
+            status="skipped",
+            error="Another run of the job was still in progress",
+            finished_at=func.now()
+        )
+        .on_conflict_do_nothing(index_elements=[JobRun.run_key])
+        .returning(JobRun.id)
+    )).scalar_one_or_none()
+    await db.commit()
+    return run_id is not None
+
+async def finish_job_run(db: AsyncSession, run_id: int, metrics: Dict[str, Any]):
+    await db.execute(
+        update(JobRun).where(JobRun.id == run_id).values(
+            status="failed" if metrics["error"] else "succeeded",
+            error=metrics["error"],
+            duration_ms=metrics["duration_ms"],
+            query_count=metrics["query_count"],
+            rows_processed=metrics["rows_processed"],
+            finished_at=func.now()
+        )
+    )
+    await db.commit()
+
+async def keep_job_run_alive(run_id: int):
+    """Refresh a run's heartbeat every SCHEDULER_LEASE_RENEW_SECONDS until cancelled"""
+    while True:
+        await asyncio.sleep(settings.SCHEDULER_LEASE_RENEW_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(update(JobRun).where(JobRun.id == run_id).values(heartbeat_at=func.now()))
+                await db.commit()
+        except Exception:
+            # A few missed beats are fine; the run is only failed once SCHEDULER_LEASE_SECONDS pass
+            logging.exception(f"Heartbeat of job run {run_id} failed")
+
+async def fail_orphaned_job_runs(db: AsyncSession, job_name: Optional[str] = None) -> int:
+    """
+    Mark "running" runs whose process stopped heartbeating, or that outlived
+    JOB_RUN_TIMEOUT_SECONDS, as failed; for one job or all. Runs still heartbeating, such as a
+    manual run in a process that is not the leader, are left alone. If a failed run was in
+    fact still going, its finish_job_run overwrites this with the real outcome.
+    """
+    timed_out = JobRun.started_at < func.now() - timedelta(seconds=settings.JOB_RUN_TIMEOUT_SECONDS)
+    query = update(JobRun).where(
+        JobRun.status == "running",
+        or_(timed_out, JobRun.heartbeat_at < func.now() - timedelta(seconds=settings.SCHEDULER_LEASE_SECONDS))
+    )
+    if job_name is not None:
+        query = query.where(JobRun.job_name == job_name)
+    result = await db.execute(query.values(
+        status="failed",
+        error=case(
+            (timed_out, "Run did not finish within JOB_RUN_TIMEOUT_SECONDS"),
+            else_="Holder stopped heartbeating before the run finished"
+        ),
+        finished_at=func.now()
+    ))
+    await db.commit()
+    return result.rowcount
+
+async def recent_job_runs(db: AsyncSession, limit: int = 20) -> List[Dict[str, Any]]:
+    result = await db.execute(select(JobRun).order_by(JobRun.started_at.desc(), JobRun.id.desc()).limit(limit))
+    return [
+        {
+            "job_name": run.job_name,
+            "run_key": run.run_key,
+            "holder": run.holder,
+            "status": run.status,
+            "error": run.error,
+            "duration_ms": run.duration_ms,
+            "query_count": run.query_count,
+            "rows_processed": run.rows_processed,
+            "started_at": run.started_at.isoformat() if run.started_at else None,
+            "finished_at": run.finished_at.isoformat() if run.finished_at else None
+        }
+        for run in result.scalars().all()
+    ]
@@ -0,0 +1,189 @@
+"""
+Transactional notification outbox.
+
+Appointment writes enqueue an event row in their own transaction. drain_outbox() claims
+due rows with FOR UPDATE SKIP LOCKED, so any number of workers can drain in parallel.
+A row is marked "sending" and committed before delivery is attempted: a crash after the
+claim loses that message rather than sending it twice (at-most-once). Failed deliveries
+go back to "pending" with exponential backoff until OUTBOX_MAX_ATTEMPTS. Claims older than
+OUTBOX_SENDING_TIMEOUT_SECONDS are from a worker that died mid-batch; each drain marks them
+"failed" so they show up in the backlog counts instead of sitting in "sending" forever.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from sqlalchemy.future import select  # type: ignore
+from sqlalchemy import bindparam, case, func, update  # type: ignore
+from sqlalchemy.dialects.postgresql import insert  # type: ignore
+from sqlalchemy.orm import aliased  # type: ignore
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.outbox import OutboxMessage
+from app.models.user import User
+from app.core.config import settings
+from app.core.notifications import NotificationSender
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+EVENT_TEMPLATES = {
+    "appointment_booked": ("Appointment requested", "your appointment request with {doctor} on {when} has been received."),
+    "appointment_pending": ("Appointment pending", "your appointment with {doctor} on {when} is awaiting confirmation."),
+    "appointment_confirmed": ("Appointment confirmed", "your appointment with {doctor} on {when} is confirmed."),
+    "appointment_cancelled": ("Appointment cancelled", "your appointment with {doctor} on {when} has been cancelled."),
+    "appointment_completed": ("Appointment completed", "thank you for visiting {doctor} on {when}."),
+    "appointment_expired": ("Appointment expired", "your appointment request with {doctor} on {when} expired before it was confirmed."),
+    "appointment_reminder": ("Appointment reminder", "this is a reminder of your appointment with {doctor} on {when}."),
+}
+
+def status_event(status: AppointmentStatus) -> str:
+    return f"appointment_{status.value}"
+
+async def enqueue_appointment_event(db: AsyncSession, appointment_id: int, event: str):
+    """Add an outbox row for an appointment event, once per (event, appointment); the caller commits"""
+    await db.execute(
+        insert(OutboxMessage)
+        .values(idempotency_key=f"{event}:{appointment_id}", event=event, appointment_id=appointment_id)
+        .on_conflict_do_nothing(index_elements=[OutboxMessage.idempotency_key])
+    )
+
+async def claim_batch(db: AsyncSession, limit: int) -> list:
+    """Mark up to ``limit`` due messages as sending and commit, skipping rows other workers hold"""
+    due = select(OutboxMessage.id).where(
+        OutboxMessage.status == "pending",
+        OutboxMessage.next_attempt_at <= func.now()
+    ).order_by(OutboxMessage.next_attempt_at).limit(limit).with_for_update(skip_locked=True)
+    result = await db.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(due))
+        .values(status="sending", claimed_at=func.now(), attempts=OutboxMessage.attempts + 1)
+        .returning(OutboxMessage.id, OutboxMessage.event, OutboxMessage.appointment_id)
+        .execution_options(synchronize_session=False)
+    )
+    claimed = result.all()
+    await db.commit()
+    return claimed
+
+async def fail_stale_claims(db: AsyncSession) -> int:
+    """Mark messages claimed longer ago than OUTBOX_SENDING_TIMEOUT_SECONDS as failed, and commit"""
+    result = await db.execute(
+        update(OutboxMessage)
+        .where(
+            OutboxMessage.status == "sending",
+            OutboxMessage.claimed_at < func.now() - func.make_interval(
+                0, 0, 0, 0, 0, 0, settings.OUTBOX_SENDING_TIMEOUT_SECONDS
+            )
+        )
+        .values(status="failed", last_error="Delivery outcome unknown: the claiming worker stopped before recording it")
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if result.rowcount:
+        logging.warning(f"Outbox: marked {result.rowcount} stale sending messages as failed")
+    return result.rowcount
+
+async def load_contacts(db: AsyncSession, appointment_ids: List[int]) -> Dict[int, Any]:
+    """Appointment time with patient and doctor contact details for a batch, in one query"""
+    if not appointment_ids:
+        return {}
+    patient = aliased(User)
+    doctor = aliased(User)
+    rows = (await db.execute(
+        select(
+            Appointment.id,
+            Appointment.appointment_datetime,
+            patient.full_name.label("patient_name"),
+            patient.email.label("patient_email"),
+            patient.mobile.label("patient_mobile"),
+            doctor.full_name.label("doctor_name")
+        ).join(patient, patient.id == Appointment.patient_id)
+        .join(doctor, doctor.id == Appointment.doctor_id)
+        .where(Appointment.id.in_(appointment_ids))
+    )).all()
+    return {row.id: row for row in rows}
+
+def render_message(event: str, contact) -> Dict[str, Any]:
+    subject, body = EVENT_TEMPLATES[event]
+    when = contact.appointment_datetime.strftime("%Y-%m-%d %H:%M")
+    doctor = contact.doctor_name or "your doctor"
+    return {
+        "kind": event,
+        "appointment_id": contact.id,
+        "to_email": contact.patient_email,
+        "to_mobile": contact.patient_mobile,
+        "subject": f"{subject}: {doctor}, {when}",
+        "body": f"Dear {contact.patient_name or 'patient'}, " + body.format(doctor=doctor, when=when)
+    }
+
+async def record_results(db: AsyncSession, sent: List[int], failures: List[Dict[str, Any]]):
+    """Mark deliveries sent, and reschedule failures with backoff or give up after the last attempt"""
+    if sent:
+        await db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(sent))
+            .values(status="sent", sent_at=func.now(), last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+    if failures:
+        table = OutboxMessage.__table__
+        backoff = func.least(
+            settings.OUTBOX_BACKOFF_SECONDS * func.power(2, table.c.attempts - 1),
+            settings.OUTBOX_BACKOFF_MAX_SECONDS
+        )
+        await db.execute(
+            update(table).where(table.c.id == bindparam("message_id")).values(
+                status=case((table.c.attempts >= settings.OUTBOX_MAX_ATTEMPTS, "failed"), else_="pending"),
+                next_attempt_at=func.now() + func.make_interval(0, 0, 0, 0, 0, 0, backoff),
+                last_error=bindparam("error")
+            ),
+            failures
+        )
+    await db.commit()
+
+async def drain_outbox(
+    db: AsyncSession,
+    sender: NotificationSender,
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    max_batches: Optional[int] = None
+) -> Dict[str, Any]:
+    """Deliver due messages batch by batch under a concurrency limit; returns run totals"""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    semaphore = asyncio.Semaphore(concurrency or settings.OUTBOX_CONCURRENCY)
+    totals = {"batches": 0, "sent": 0, "failed": 0, "stale": 0, "seconds": 0.0}
+    started = time.perf_counter()
+    totals["stale"] = await fail_stale_claims(db)
+    while max_batches is None or totals["batches"] < max_batches:
+        claimed = await claim_batch(db, batch_size)
+        if not claimed:
+            break
+        batch_started = time.perf_counter()
+        contacts = await load_contacts(db, [m.appointment_id for m in claimed if m.appointment_id is not None])
+
+        async def deliver(message):
+            contact = contacts.get(message.appointment_id)
+            if contact is None or message.event not in EVENT_TEMPLATES:
+                return message.id, "Appointment or event template not found"
+            async with semaphore:
+                try:
+                    await sender.send(render_message(message.event, contact))
+                    return message.id, None
+                except Exception as exc:
+                    return message.id, str(exc) or exc.__class__.__name__
+
+        results = await asyncio.gather(*(deliver(message) for message in claimed))
+        sent = [message_id for message_id, error in results if error is None]
+        failures = [{"message_id": message_id, "error": error} for message_id, error in results if error is not None]
+        await record_results(db, sent, failures)
+        elapsed = time.perf_counter() - batch_started
+        totals["batches"] += 1
+        totals["sent"] += len(sent)
+        totals["failed"] += len(failures)
+        logging.info(
+            f"Outbox batch {totals['batches']}: sent={len(sent)} failed={len(failures)} "
+            f"seconds={elapsed:.2f} rate={len(claimed) / elapsed if elapsed else 0:.0f}/s"
+        )
+    totals["seconds"] = round(time.perf_counter() - started, 3)
+    return totals
+
+async def outbox_counts(db: AsyncSession) -> Dict[str, int]:
+    rows = (await db.execute(select(OutboxMessage.status, func.count()).group_by(OutboxMessage.status))).all()
+    return {status: count for status, count in rows}
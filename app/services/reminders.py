@@ -0,0 +1,31 @@
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from sqlalchemy.future import select  # type: ignore
+from sqlalchemy import String, cast, literal  # type: ignore
+from sqlalchemy.dialects.postgresql import insert  # type: ignore
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.outbox import OutboxMessage
+from datetime import datetime
+
+REMINDER_EVENT = "appointment_reminder"
+
+async def enqueue_reminders(db: AsyncSession, start: datetime, end: datetime) -> int:
+    """
+    Queue a reminder for every confirmed appointment in [start, end] with one INSERT ... SELECT,
+    so the job's memory does not depend on the day's volume. Re-running it queues nothing twice.
+    Delivery happens in the outbox drain. Returns the number of reminders queued.
+    """
+    source = select(
+        literal(f"{REMINDER_EVENT}:", String) + cast(Appointment.id, String),
+        literal(REMINDER_EVENT, String),
+        Appointment.id
+    ).where(
+        Appointment.appointment_datetime.between(start, end),
+        Appointment.status == AppointmentStatus.confirmed
+    )
+    result = await db.execute(
+        insert(OutboxMessage)
+        .from_select(["idempotency_key", "event", "appointment_id"], source)
+        .on_conflict_do_nothing(index_elements=[OutboxMessage.idempotency_key])
+    )
+    await db.commit()
+    return result.rowcount or 0
@@ -0,0 +1,93 @@
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from sqlalchemy.future import select  # type: ignore
+from sqlalchemy import and_, func, tuple_  # type: ignore
+from sqlalchemy.dialects.postgresql import insert  # type: ignore
+from app.models.user import User, UserRole
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.report import MonthlyReport
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+def month_range(year: int, month: int) -> Tuple[datetime, datetime]:
+    """Half-open [start, end) bounds of a calendar month"""
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+async def build_monthly_report(db: AsyncSession, year: int, month: int) -> Dict[str, Any]:
+    """Per-doctor completed appointments, earnings and patients plus totals, in one grouped query"""
+    start, end = month_range(year, month)
+    doctor_key = tuple_(User.id, User.full_name, User.specialization, User.consultation_fee)
+    completed = and_(
+        Appointment.doctor_id == User.id,
+        Appointment.status == AppointmentStatus.completed,
+        Appointment.appointment_datetime >= start,
+        Appointment.appointment_datetime < end
+    )
+    # ROLLUP over the whole doctor tuple yields one row per doctor and a grand total row
+    query = select(
+        func.grouping(User.id).label("is_total"),
+        User.id,
+        User.full_name,
+        User.specialization,
+        User.consultation_fee,
+        func.count(func.distinct(User.id)).label("doctors"),
+        func.count(Appointment.id).label("appointments"),
+        func.coalesce(func.sum(Appointment.consultation_fee), 0).label("earnings"),
+        func.count(func.distinct(Appointment.patient_id)).label("patients")
+    ).select_from(User).outerjoin(Appointment, completed).where(
+        User.role == UserRole.doctor
+    ).group_by(func.rollup(doctor_key)).order_by(func.grouping(User.id), User.id)
+    rows = (await db.execute(query)).all()
+
+    report: Dict[str, Any] = {
+        "period": f"{year}-{month:02d}",
+        "total_doctors": 0,
+        "total_appointments": 0,
+        "total_earnings": 0,
+        "total_unique_patients": 0,
+        "doctor_reports": []
+    }
+    for row in rows:
+        if row.is_total:
+            report["total_doctors"] = row.doctors
+            report["total_appointments"] = row.appointments
+            report["total_earnings"] = row.earnings
+            report["total_unique_patients"] = row.patients
+            continue
+        report["doctor_reports"].append({
+            "doctor_id": row.id,
+            "doctor_name": row.full_name,
+            "specialization": row.specialization,
+            "total_appointments": row.appointments,
+            "total_earnings": row.earnings,
+            "total_patients": row.patients,
+            "consultation_fee": row.consultation_fee
+        })
+    return report
+
+async def save_monthly_report(db: AsyncSession, year: int, month: int, report: Dict[str, Any]):
+    stmt = insert(MonthlyReport).values(year=year, month=month, report=report)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MonthlyReport.year, MonthlyReport.month],
+        set_={"report": stmt.excluded.report, "generated_at": func.now()}
+    )
+    await db.execute(stmt)
+    await db.commit()
+
+async def generate_and_store_monthly_report(db: AsyncSession, year: int, month: int) -> Dict[str, Any]:
+    report = await build_monthly_report(db, year, month)
+    await save_monthly_report(db, year, month, report)
+    return report
+
+async def get_monthly_report(db: AsyncSession, year: int, month: int) -> Dict[str, Any]:
+    """Stored snapshot for finished months (generated on first request if missing); live otherwise"""
+    _, end = month_range(year, month)
+    if end > datetime.now():
+        return await build_monthly_report(db, year, month)
+    stored = (await db.execute(
+        select(MonthlyReport.report).where(MonthlyReport.year == year, MonthlyReport.month == month)
+    )).scalar_one_or_none()
+    if stored is not None:
+        return stored
+    return await generate_and_store_monthly_report(db, year, month)
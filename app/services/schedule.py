@@ -0,0 +1,260 @@
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from sqlalchemy.future import select  # type: ignore
+from sqlalchemy import delete, update  # type: ignore
+from app.models.user import User, UserRole
+from app.models.schedule import DoctorScheduleInterval, DoctorScheduleException
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.validators import parse_timeslots, WEEKDAYS
+from bisect import bisect_right
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+# Per-process and invalidated only locally, so other workers can serve a stale entry until it
+# expires. Read paths accept that; bookings pass verify=True to check the entry's version first.
+schedule_cache = TTLCache(maxsize=5000, ttl=settings.SCHEDULE_CACHE_TTL_SECONDS)
+
+def _merge(intervals: List[Tuple[int, int]]) -> Tuple[List[int], List[int]]:
+    """Sort and merge overlapping intervals into parallel start/end arrays"""
+    starts: List[int] = []
+    ends: List[int] = []
+    for start, end in sorted(intervals):
+        if ends and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+def _minute_of_day(value: datetime) -> float:
+    return value.hour * 60 + value.minute + value.second / 60 + value.microsecond / 60000000
+
+class CompiledSchedule:
+    """Per-weekday sorted interval arrays and per-date closures for one doctor"""
+    __slots__ = ("doctor_id", "is_active", "version", "unrestricted", "starts", "ends", "closures")
+
+    def __init__(
+        self,
+        doctor_id: int,
+        is_active: bool,
+        weekly: Optional[Dict[int, List[Tuple[int, int]]]],
+        closures: Dict[date, List[Optional[Tuple[int, int]]]],
+        version: int = 0
+    ):
+        self.doctor_id = doctor_id
+        self.is_active = is_active
+        self.version = version
+        # No schedule at all keeps the historical "always available" behaviour
+        self.unrestricted = weekly is None
+        self.starts: List[List[int]] = []
+        self.ends: List[List[int]] = []
+        for weekday in range(7):
+            starts, ends = _merge((weekly or {}).get(weekday, []))
+            self.starts.append(starts)
+            self.ends.append(ends)
+        self.closures = closures
+
+    def is_closed(self, day: date, minute: float) -> bool:
+        for closure in self.closures.get(day, ()):
+            if closure is None or closure[0] <= minute < closure[1]:
+                return True
+        return False
+
+    def is_open(self, value: datetime) -> bool:
+        """Binary search for the interval containing ``value`` (ends inclusive)"""
+        minute = _minute_of_day(value)
+        if self.is_closed(value.date(), minute):
+            return False
+        if self.unrestricted:
+            return True
+        weekday = value.weekday()
+        index = bisect_right(self.starts[weekday], minute) - 1
+        return index >= 0 and minute <= self.ends[weekday][index]
+
+    def intervals_for(self, day: date) -> List[Tuple[int, int]]:
+        """Open intervals on a date, before closures are applied"""
+        if self.unrestricted:
+            return [(0, 24 * 60)]
+        weekday = day.weekday()
+        return list(zip(self.starts[weekday], self.ends[weekday]))
+
+    def weekly(self) -> Dict[str, List[str]]:
+        return {
+            WEEKDAYS[weekday]: [
+                f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}"
+                for start, end in zip(self.starts[weekday], self.ends[weekday])
+            ]
+            for weekday in range(7)
+        }
+
+def compile_schedule(
+    doctor_id: int,
+    is_active: bool,
+    available_timeslots: Optional[str],
+    intervals: List[Tuple[int, int, int]],
+    exceptions: List[Tuple[date, Optional[int], Optional[int]]],
+    has_weekly_schedule: bool = False,
+    version: int = 0
+) -> CompiledSchedule:
+    weekly: Optional[Dict[int, List[Tuple[int, int]]]] = None
+    if has_weekly_schedule or intervals:
+        # Interval rows are authoritative: a weekday without any is closed
+        weekly = {}
+        for weekday, start, end in intervals:
+            weekly.setdefault(weekday, []).append((start, end))
+    elif available_timeslots:
+        # Doctor not migrated to the interval table yet: same slots every day
+        try:
+            slots = parse_timeslots(available_timeslots)
+        except ValueError:
+            slots = []
+        weekly = {weekday: slots for weekday in range(7)}
+    closures: Dict[date, List[Optional[Tuple[int, int]]]] = {}
+    for day, start, end in exceptions:
+        closures.setdefault(day, []).append(None if start is None or end is None else (start, end))
+    return CompiledSchedule(doctor_id, is_active, weekly, closures, version)
+
+async def load_compiled_schedules(
+    db: AsyncSession,
+    doctor_ids: List[int],
+    verify: bool = False
+) -> Dict[int, CompiledSchedule]:
+    """
+    Compiled schedules for many doctors, with cache misses loaded in three bulk queries.
+    verify=True also checks cached entries against the doctors' current schedule_version and
+    active flag in one query, reloading any that another worker has changed.
+    """
+    schedules: Dict[int, CompiledSchedule] = {}
+    missing = []
+    for doctor_id in doctor_ids:
+        cached = schedule_cache.get(doctor_id)
+        if cached is None:
+            missing.append(doctor_id)
+        else:
+            schedules[doctor_id] = cached
+    if verify and schedules:
+        current = (await db.execute(
+            select(User.id, User.schedule_version, User.is_active).where(User.id.in_(list(schedules)))
+        )).all()
+        current_state = {row.id: (row.schedule_version, bool(row.is_active)) for row in current}
+        for doctor_id, cached in list(schedules.items()):
+            if current_state.get(doctor_id) != (cached.version, cached.is_active):
+                del schedules[doctor_id]
+                missing.append(doctor_id)
+    if not missing:
+        return schedules
+    doctors = (await db.execute(
+        select(
+            User.id,
+            User.is_active,
+            User.available_timeslots,
+            User.has_weekly_schedule,
+            User.schedule_version
+        ).where(User.id.in_(missing), User.role == UserRole.doctor)
+    )).all()
+    if not doctors:
+        return schedules
+    found = [d.id for d in doctors]
+    interval_rows = (await db.execute(
+        select(
+            DoctorScheduleInterval.doctor_id,
+            DoctorScheduleInterval.weekday,
+            DoctorScheduleInterval.start_minute,
+            DoctorScheduleInterval.end_minute
+        ).where(DoctorScheduleInterval.doctor_id.in_(found))
+    )).all()
+    exception_rows = (await db.execute(
+        select(
+            DoctorScheduleException.doctor_id,
+            DoctorScheduleException.date,
+            DoctorScheduleException.start_minute,
+            DoctorScheduleException.end_minute
+        ).where(DoctorScheduleException.doctor_id.in_(found), DoctorScheduleException.date >= date.today())
+    )).all()
+    intervals_by_doctor: Dict[int, list] = {}
+    for row in interval_rows:
+        intervals_by_doctor.setdefault(row.doctor_id, []).append((row.weekday, row.start_minute, row.end_minute))
+    exceptions_by_doctor: Dict[int, list] = {}
+    for row in exception_rows:
+        exceptions_by_doctor.setdefault(row.doctor_id, []).append((row.date, row.start_minute, row.end_minute))
+    for doctor in doctors:
+        compiled = compile_schedule(
+            doctor.id,
+            bool(doctor.is_active),
+            doctor.available_timeslots,
+            intervals_by_doctor.get(doctor.id, []),
+            exceptions_by_doctor.get(doctor.id, []),
+            bool(doctor.has_weekly_schedule),
+            doctor.schedule_version or 0
+        )
+        schedule_cache.set(doctor.id, compiled)
+        schedules[doctor.id] = compiled
+    return schedules
+
+async def get_compiled_schedule(db: AsyncSession, doctor_id: int, verify: bool = False) -> Optional[CompiledSchedule]:
+    """Compiled schedule for a doctor, or None if the id is not a doctor"""
+    return (await load_compiled_schedules(db, [doctor_id], verify)).get(doctor_id)
+
+def invalidate_schedule(doctor_id: int):
+    schedule_cache.invalidate(doctor_id)
+
+async def bump_schedule_version(db: AsyncSession, doctor_id: int, **values):
+    """Mark the doctor's schedule changed for every worker; the caller commits"""
+    await db.execute(
+        update(User).where(User.id == doctor_id).values(schedule_version=User.schedule_version + 1, **values)
+    )
+
+async def replace_weekly_intervals(
+    db: AsyncSession,
+    doctor_id: int,
+    available_timeslots: Optional[str],
+    weekly_timeslots: Optional[Dict[int, str]] = None
+):
+    """Rewrite a doctor's interval rows; the caller commits. weekly_timeslots overrides single weekdays"""
+    await db.execute(delete(DoctorScheduleInterval).where(DoctorScheduleInterval.doctor_id == doctor_id))
+    default_slots = parse_timeslots(available_timeslots) if available_timeslots else []
+    for weekday in range(7):
+        slots = default_slots
+        if weekly_timeslots and weekday in weekly_timeslots:
+            slots = parse_timeslots(weekly_timeslots[weekday]) if weekly_timeslots[weekday] else []
+        for start, end in slots:
+            db.add(DoctorScheduleInterval(doctor_id=doctor_id, weekday=weekday, start_minute=start, end_minute=end))
+    await bump_schedule_version(db, doctor_id, has_weekly_schedule=True)
+    invalidate_schedule(doctor_id)
+
+async def add_schedule_exception(
+    db: AsyncSession,
+    doctor_id: int,
+    day: date,
+    start_minute: Optional[int] = None,
+    end_minute: Optional[int] = None,
+    reason: Optional[str] = None
+) -> DoctorScheduleException:
+    exception = DoctorScheduleException(
+        doctor_id=doctor_id, date=day, start_minute=start_minute, end_minute=end_minute, reason=reason
+    )
+    db.add(exception)
+    await bump_schedule_version(db, doctor_id)
+    await db.commit()
+    await db.refresh(exception)
+    invalidate_schedule(doctor_id)
+    return exception
+
+async def delete_schedule_exception(db: AsyncSession, doctor_id: int, exception_id: int) -> bool:
+    result = await db.execute(
+        delete(DoctorScheduleException).where(
+            DoctorScheduleException.id == exception_id, DoctorScheduleException.doctor_id == doctor_id
+        )
+    )
+    await bump_schedule_version(db, doctor_id)
+    await db.commit()
+    invalidate_schedule(doctor_id)
+    return (result.rowcount or 0) > 0
+
+async def list_schedule_exceptions(db: AsyncSession, doctor_id: int) -> List[DoctorScheduleException]:
+    result = await db.execute(
+        select(DoctorScheduleException)
+        .where(DoctorScheduleException.doctor_id == doctor_id, DoctorScheduleException.date >= date.today())
+        .order_by(DoctorScheduleException.date)
+    )
+    return list(result.scalars().all())
@@ -0,0 +1,356 @@
+"""
+Per-doctor daily appointment rollup.
+
+Every appointment write applies a +1/-1 delta to its (doctor, day, status) row in the
+same transaction, so dashboards read one row per day instead of every appointment. The
+same deltas keep coarser (day, status, specialization) and (day, status, division) rows for
+analytics that never need a single doctor. Days are UTC calendar days whatever the session
+timezone, and range bounds are converted to UTC before they are split into days.
+
+New appointments also add their patient to a per-(doctor, day) HyperLogLog sketch,
+which answers approximate distinct-patient counts over any range of days.
+
+Rebuild all of them from the appointments table with: python -m app.services.stats rebuild
+"""
+import asyncio
+import sys
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from sqlalchemy.future import select  # type: ignore
+from sqlalchemy import Integer, LargeBinary, case, cast, delete, func, insert, literal, literal_column, text  # type: ignore
+from sqlalchemy.dialects.postgresql import insert as pg_insert  # type: ignore
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.statistics import DoctorDailyStat, DoctorDailyPatientSketch, DailySpecializationStat, DailyDivisionStat
+from app.models.user import User
+from app.core.hll import HyperLogLog, REGISTERS, register_update
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+# Per-doctor rows first; the specialization and division rows are coarser sums of the same deltas
+ROLLUP_TABLES = (DoctorDailyStat.__table__, DailySpecializationStat.__table__, DailyDivisionStat.__table__)
+
+def rollup_day(column):
+    """UTC calendar day of a timestamptz column, the day every rollup row is keyed by"""
+    # The zone is inlined: a bound parameter would differ between SELECT and GROUP BY
+    return func.date(func.timezone(literal_column("'UTC'"), column))
+
+def _utc(value: datetime) -> datetime:
+    """Bound in UTC; naive bounds are already UTC, which is how asyncpg binds them"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def _revenue(status_column, amount):
+    """Only completed appointments earn their consultation fee"""
+    return case((status_column == AppointmentStatus.completed, func.coalesce(amount, 0)), else_=0)
+
+def _group_keys(table, doctor_id) -> Dict[str, Any]:
+    """Key columns of a rollup table besides day and status, as expressions over the doctor's user row"""
+    if table is DailySpecializationStat.__table__:
+        return {"specialization": func.coalesce(User.specialization, "")}
+    if table is DailyDivisionStat.__table__:
+        return {"division_id": func.coalesce(User.division_id, 0)}
+    return {"doctor_id": doctor_id}
+
+async def _add_to_rollup(db: AsyncSession, table, keys: Dict[str, Any], source):
+    """Add the (day, status, *keys, count, revenue) rows of ``source`` onto ``table``"""
+    stmt = pg_insert(table).from_select(["day", "status", *keys, "appointment_count", "revenue"], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.day, table.c.status, *(table.c[name] for name in keys)],
+        set_={
+            "appointment_count": table.c.appointment_count + stmt.excluded.appointment_count,
+            "revenue": table.c.revenue + stmt.excluded.revenue,
+        }
+    )
+    await db.execute(stmt)
+
+async def apply_status_delta(db: AsyncSession, appointment_ids: List[int], status: AppointmentStatus, delta: int):
+    """
+    Add ``delta`` per appointment of ``status`` to each affected (doctor, day) row and to the
+    matching specialization and division rows; the caller commits
+    """
+    status_type = DoctorDailyStat.__table__.c.status.type
+    status_value = cast(literal(status, status_type), status_type)
+    # The day comes from the stored row, so it matches what a rebuild would compute
+    day = rollup_day(Appointment.appointment_datetime)
+    for table in ROLLUP_TABLES:
+        keys = _group_keys(table, Appointment.doctor_id)
+        source = select(
+            day,
+            status_value,
+            *keys.values(),
+            cast(func.count() * delta, Integer),
+            _revenue(status_value, func.sum(Appointment.consultation_fee) * delta)
+        ).select_from(Appointment).join(User, User.id == Appointment.doctor_id).where(
+            Appointment.id.in_(appointment_ids)
+        ).group_by(day, *keys.values())
+        await _add_to_rollup(db, table, keys, source)
+
+async def shift_doctor_groups(db: AsyncSession, doctor_id: int, delta: int):
+    """
+    Add ``delta`` times a doctor's rollup to the specialization and division rows of their
+    current profile. Call with -1 before changing either field and with +1 once the change is
+    flushed, which moves the doctor's history to the new group; the caller commits
+    """
+    for table in ROLLUP_TABLES[1:]:
+        keys = _group_keys(table, DoctorDailyStat.doctor_id)
+        source = select(
+            DoctorDailyStat.day,
+            DoctorDailyStat.status,
+            *keys.values(),
+            cast(func.sum(DoctorDailyStat.appointment_count) * delta, Integer),
+            func.sum(DoctorDailyStat.revenue) * delta
+        ).join(User, User.id == DoctorDailyStat.doctor_id).where(
+            DoctorDailyStat.doctor_id == doctor_id
+        ).group_by(DoctorDailyStat.day, DoctorDailyStat.status, *keys.values())
+        await _add_to_rollup(db, table, keys, source)
+
+async def apply_appointment_delta(db: AsyncSession, appointment_id: int, status: AppointmentStatus, delta: int):
+    await apply_status_delta(db, [appointment_id], status, delta)
+
+async def record_status_change(
+    db: AsyncSession,
+    appointment_id: int,
+    old_status: Optional[AppointmentStatus],
+    new_status: AppointmentStatus
+):
+    """Move one appointment between status rows; ``old_status`` None means a new appointment"""
+    if old_status == new_status:
+        return
+    if old_status is not None:
+        await apply_appointment_delta(db, appointment_id, old_status, -1)
+    await apply_appointment_delta(db, appointment_id, new_status, 1)
+
+async def record_bulk_status_change(
+    db: AsyncSession,
+    appointment_ids: List[int],
+    old_status: AppointmentStatus,
+    new_status: AppointmentStatus
+):
+    """Move many appointments from one status to another with two grouped upserts"""
+    if not appointment_ids or old_status == new_status:
+        return
+    await apply_status_delta(db, appointment_ids, old_status, -1)
+    await apply_status_delta(db, appointment_ids, new_status, 1)
+
+async def add_patient_to_sketch(db: AsyncSession, appointment_id: int, patient_id: int):
+    """Add a new appointment's patient to its (doctor, day) sketch with a single upsert; the caller commits"""
+    table = DoctorDailyPatientSketch.__table__
+    index, rank = register_update(patient_id)
+    initial = bytearray(REGISTERS)
+    initial[index] = rank
+    source = select(
+        Appointment.doctor_id,
+        rollup_day(Appointment.appointment_datetime),
+        cast(literal(bytes(initial), LargeBinary), LargeBinary)
+    ).where(Appointment.id == appointment_id)
+    stmt = pg_insert(table).from_select(["doctor_id", "day", "sketch"], source)
+    # Registers only ever grow, so the row update is a max on one byte
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.doctor_id, table.c.day],
+        set_={"sketch": func.set_byte(table.c.sketch, index, func.greatest(func.get_byte(table.c.sketch, index), rank))}
+    )
+    await db.execute(stmt)
+
+def split_range(
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> Tuple[Optional[Tuple[Optional[date], Optional[date]]], List[Tuple[datetime, datetime, bool]]]:
+    """
+    Split an inclusive [start, end] range into whole UTC days served by the rollup and
+    partial edges counted from raw appointments. Edges are (low, high, high_inclusive) and
+    span at most a day each.
+    """
+    start = _utc(start) if start is not None else None
+    end = _utc(end) if end is not None else None
+    first_day = None
+    last_day = None
+    edges: List[Tuple[datetime, datetime, bool]] = []
+    if start is not None:
+        first_day = start.date() if start.time() == time.min else start.date() + timedelta(days=1)
+    if end is not None:
+        last_day = end.date() - timedelta(days=1)
+    if first_day is not None and last_day is not None and first_day > last_day:
+        return None, [(start, end, True)]
+    if start is not None and start.time() != time.min:
+        edges.append((start, datetime.combine(first_day, time.min, start.tzinfo), False))
+    if end is not None:
+        edges.append((datetime.combine(end.date(), time.min, end.tzinfo), end, True))
+    return (first_day, last_day), edges
+
+def _empty_totals() -> Dict[AppointmentStatus, Dict[str, float]]:
+    return {status: {"count": 0, "revenue": 0} for status in AppointmentStatus}
+
+async def get_status_totals(
+    db: AsyncSession,
+    doctor_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Dict[AppointmentStatus, Dict[str, float]]:
+    """Appointment count and revenue per status, for one doctor or all; cost grows with days, not rows"""
+    totals = _empty_totals()
+    days, edges = split_range(start, end)
+    if days is not None:
+        query = select(
+            DoctorDailyStat.status,
+            func.sum(DoctorDailyStat.appointment_count),
+            func.sum(DoctorDailyStat.revenue)
+        ).group_by(DoctorDailyStat.status)
+        if doctor_id is not None:
+            query = query.where(DoctorDailyStat.doctor_id == doctor_id)
+        if days[0] is not None:
+            query = query.where(DoctorDailyStat.day >= days[0])
+        if days[1] is not None:
+            query = query.where(DoctorDailyStat.day <= days[1])
+        for status, count, revenue in (await db.execute(query)).all():
+            totals[status]["count"] += count or 0
+            totals[status]["revenue"] += revenue or 0
+    for low, high, inclusive in edges:
+        query = select(
+            Appointment.status,
+            func.count(),
+            func.sum(_revenue(Appointment.status, Appointment.consultation_fee))
+        ).where(
+            Appointment.appointment_datetime >= low,
+            Appointment.appointment_datetime <= high if inclusive else Appointment.appointment_datetime < high
+        ).group_by(Appointment.status)
+        if doctor_id is not None:
+            query = query.where(Appointment.doctor_id == doctor_id)
+        for status, count, revenue in (await db.execute(query)).all():
+            totals[status]["count"] += count or 0
+            totals[status]["revenue"] += revenue or 0
+    return totals
+
+async def get_patient_status_counts(
+    db: AsyncSession,
+    patient_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Dict[str, int]:
+    """Per-status appointment counts and distinct doctors for a patient, grouped in SQL"""
+    query = select(Appointment.status, func.count()).where(Appointment.patient_id == patient_id)
+    doctors = select(func.count(func.distinct(Appointment.doctor_id))).where(Appointment.patient_id == patient_id)
+    if start:
+        query = query.where(Appointment.appointment_datetime >= start)
+        doctors = doctors.where(Appointment.appointment_datetime >= start)
+    if end:
+        query = query.where(Appointment.appointment_datetime <= end)
+        doctors = doctors.where(Appointment.appointment_datetime <= end)
+    counts = {status.value: 0 for status in AppointmentStatus}
+    for status, count in (await db.execute(query.group_by(Appointment.status))).all():
+        counts[status.value] = count
+    counts["unique_doctors"] = (await db.execute(doctors)).scalar() or 0
+    return counts
+
+async def estimate_unique_patients(
+    db: AsyncSession,
+    doctor_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> int:
+    """
+    Distinct patients from merged daily sketches, within about 1.6% (one standard error).
+    Partial edge days count whole, so patients seen outside the exact bounds may be included.
+    """
+    query = select(DoctorDailyPatientSketch.sketch).where(DoctorDailyPatientSketch.doctor_id == doctor_id)
+    if start:
+        query = query.where(DoctorDailyPatientSketch.day >= _utc(start).date())
+    if end:
+        query = query.where(DoctorDailyPatientSketch.day <= _utc(end).date())
+    return HyperLogLog.union((await db.execute(query)).scalars().all()).count()
+
+async def count_unique_patients(
+    db: AsyncSession,
+    doctor_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    approximate: bool = False
+) -> int:
+    if approximate:
+        return await estimate_unique_patients(db, doctor_id, start, end)
+    query = select(func.count(func.distinct(Appointment.patient_id))).where(Appointment.doctor_id == doctor_id)
+    if start:
+        query = query.where(Appointment.appointment_datetime >= start)
+    if end:
+        query = query.where(Appointment.appointment_datetime <= end)
+    return (await db.execute(query)).scalar() or 0
+
+async def rebuild_doctor_daily_stats(db: AsyncSession) -> int:
+    """Recompute the whole rollup from appointments in one transaction; returns the per-doctor row count"""
+    # Block appointment writes until commit so no delta lands between the delete and the insert
+    await db.execute(text("LOCK TABLE appointments IN SHARE MODE"))
+    await db.execute(delete(DoctorDailyStat))
+    source = select(
+        Appointment.doctor_id,
+        rollup_day(Appointment.appointment_datetime),
+        Appointment.status,
+        func.count(),
+        _revenue(Appointment.status, func.sum(Appointment.consultation_fee))
+    ).group_by(
+        Appointment.doctor_id, rollup_day(Appointment.appointment_datetime), Appointment.status
+    )
+    result = await db.execute(
+        insert(DoctorDailyStat.__table__).from_select(
+            ["doctor_id", "day", "status", "appointment_count", "revenue"], source
+        )
+    )
+    for table in ROLLUP_TABLES[1:]:
+        await db.execute(delete(table))
+        keys = _group_keys(table, DoctorDailyStat.doctor_id)
+        await db.execute(insert(table).from_select(
+            ["day", "status", *keys, "appointment_count", "revenue"],
+            select(
+                DoctorDailyStat.day,
+                DoctorDailyStat.status,
+                *keys.values(),
+                func.sum(DoctorDailyStat.appointment_count),
+                func.sum(DoctorDailyStat.revenue)
+            ).join(User, User.id == DoctorDailyStat.doctor_id).group_by(
+                DoctorDailyStat.day, DoctorDailyStat.status, *keys.values()
+            )
+        ))
+    await db.commit()
+    return result.rowcount or 0
+
+async def rebuild_patient_sketches(db: AsyncSession, batch_size: int = 500) -> int:
+    """Recompute every daily patient sketch from appointments in one transaction; returns the row count"""
+    await db.execute(text("LOCK TABLE appointments IN SHARE MODE"))
+    await db.execute(delete(DoctorDailyPatientSketch))
+    day = rollup_day(Appointment.appointment_datetime)
+    result = await db.stream(
+        select(Appointment.doctor_id, day, Appointment.patient_id).order_by(Appointment.doctor_id, day)
+    )
+    rows: List[Dict] = []
+    written = 0
+    key = None
+    sketch = None
+    async for doctor_id, appointment_day, patient_id in result:
+        if (doctor_id, appointment_day) != key:
+            if sketch is not None:
+                rows.append({"doctor_id": key[0], "day": key[1], "sketch": sketch.to_bytes()})
+            key = (doctor_id, appointment_day)
+            sketch = HyperLogLog()
+            if len(rows) >= batch_size:
+                await db.execute(insert(DoctorDailyPatientSketch.__table__), rows)
+                written += len(rows)
+                rows = []
+        sketch.add(patient_id)
+    if sketch is not None:
+        rows.append({"doctor_id": key[0], "day": key[1], "sketch": sketch.to_bytes()})
+    if rows:
+        await db.execute(insert(DoctorDailyPatientSketch.__table__), rows)
+        written += len(rows)
+    await db.commit()
+    return written
+
+async def _main(argv: List[str]) -> int:
+    from app.db.session import AsyncSessionLocal
+    if argv[:1] != ["rebuild"]:
+        print("usage: python -m app.services.stats rebuild")
+        return 2
+    async with AsyncSessionLocal() as db:
+        rows = await rebuild_doctor_daily_stats(db)
+        sketches = await rebuild_patient_sketches(db)
+    print(f"doctor_daily_stats rebuilt: {rows} rows")
+    print(f"doctor_daily_patient_sketches rebuilt: {sketches} rows")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,61 @@
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
+from sqlalchemy.future import select  # type: ignore
+from sqlalchemy import delete  # type: ignore
+from sqlalchemy.dialects.postgresql import insert  # type: ignore
+from app.models.token import RevokedToken
+from app.core.revocation import RevocationSet
+from app.core.config import settings
+from datetime import datetime, timedelta, timezone
+import time
+
+revocation_set = RevocationSet()
+
+_sync_state = {"watermark": None, "last_sync": 0.0, "syncing": False}
+
+async def revoke_token(db: AsyncSession, payload: dict) -> bool:
+    """Persist a token's jti and add it to this worker's revocation set"""
+    jti = payload.get("jti")
+    exp = payload.get("exp")
+    if not jti or exp is None:
+        return False
+    await db.execute(
+        insert(RevokedToken)
+        .values(jti=jti, user_id=payload.get("uid"), expires_at=datetime.fromtimestamp(exp, tz=timezone.utc))
+        .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+    )
+    await db.commit()
+    revocation_set.add(jti, exp)
+    return True
+
+async def sync_revocations(db: AsyncSession, force: bool = False):
+    """Pull revocations written by other workers, at most once per REVOCATION_SYNC_SECONDS"""
+    now = time.monotonic()
+    if _sync_state["syncing"] or (not force and now - _sync_state["last_sync"] < settings.REVOCATION_SYNC_SECONDS):
+        return
+    _sync_state["syncing"] = True
+    try:
+        query = select(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at).where(
+            RevokedToken.expires_at > datetime.now(timezone.utc)
+        )
+        if _sync_state["watermark"] is not None:
+            # Overlap a little so rows committed out of timestamp order are not missed
+            query = query.where(RevokedToken.revoked_at >= _sync_state["watermark"] - timedelta(seconds=5))
+        result = await db.execute(query)
+        for row in result:
+            revocation_set.add(row.jti, row.expires_at.timestamp())
+            if _sync_state["watermark"] is None or row.revoked_at > _sync_state["watermark"]:
+                _sync_state["watermark"] = row.revoked_at
+        if _sync_state["watermark"] is None:
+            _sync_state["watermark"] = datetime.now(timezone.utc)
+        _sync_state["last_sync"] = now
+    finally:
+        _sync_state["syncing"] = False
+
+async def is_token_revoked(db: AsyncSession, payload: dict) -> bool:
+    await sync_revocations(db)
+    return revocation_set.is_revoked(payload.get("jti"))
+
+async def purge_expired_revocations(db: AsyncSession) -> int:
+    result = await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now(timezone.utc)))
+    await db.commit()
+    return result.rowcount or 0
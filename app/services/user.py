@@ -1,27 +1,83 @@
 from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore
 from sqlalchemy.future import select  # type: ignore
+from sqlalchemy.orm import make_transient_to_detached  # type: ignore
 from app.models.user import User, UserRole
 from app.schemas.user import UserCreate
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import password_pool
+from app.services.schedule import replace_weekly_intervals
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Authenticated principals keyed by token subject (email). Entries hold plain
+# column values so every request gets its own detached User instance.
+principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+# (is_active, token_version) keyed by user id, used to validate self-contained tokens
+token_state_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+async def get_password_hash_async(password: str) -> str:
+    return await password_pool.run(get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
 async def get_user_by_email(db: AsyncSession, email: str):
     result = await db.execute(select(User).where(User.email == email))
     return result.scalars().first()
 
+async def get_principal_by_email(db: AsyncSession, email: str):
+    """Return the user for a token subject, served from the principal cache when possible"""
+    values = principal_cache.get(email)
+    if values is None:
+        user = await get_user_by_email(db, email)
+        if user is None:
+            return None
+        values = {column.key: getattr(user, column.key) for column in User.__table__.columns}
+        principal_cache.set(email, values)
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+async def get_token_state(db: AsyncSession, user_id: int):
+    """Return (is_active, token_version) for a user id, or None if the user is gone"""
+    state = token_state_cache.get(user_id)
+    if state is None:
+        result = await db.execute(select(User.is_active, User.token_version).where(User.id == user_id))
+        row = result.first()
+        if row is None:
+            return None
+        state = (bool(row.is_active), row.token_version or 0)
+        token_state_cache.set(user_id, state)
+    return state
+
+def build_token_claims(user: User) -> dict:
+    role = user.role.value if isinstance(user.role, UserRole) else user.role
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "role": role,
+        "active": bool(user.is_active),
+        "ver": user.token_version or 0
+    }
+
+def invalidate_principal(user: User):
+    principal_cache.invalidate(user.email)
+    token_state_cache.invalidate(user.id)
+
 async def get_user_by_mobile(db: AsyncSession, mobile: str):
     result = await db.execute(select(User).where(User.mobile == mobile))
     return result.scalars().first()
 
 async def create_user(db: AsyncSession, user_in: UserCreate):
-    hashed_password = get_password_hash(user_in.password)
+    hashed_password = await get_password_hash_async(user_in.password)
     specialization = getattr(user_in, 'specialization', None)
     if specialization is not None:
         specialization = specialization.lower()
@@ -46,6 +102,9 @@ async def create_user(db: AsyncSession, user_in: UserCreate):
         is_superuser=False
     )
     db.add(db_user)
+    if db_user.role == UserRole.doctor and available_timeslots:
+        await db.flush()
+        await replace_weekly_intervals(db, db_user.id, available_timeslots)
     await db.commit()
     await db.refresh(db_user)
     return db_user
@@ -54,6 +113,6 @@ async def authenticate_user(db: AsyncSession, email: str, password: str):
     user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     return user 
\ No newline at end of file
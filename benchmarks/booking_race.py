@@ -0,0 +1,106 @@
+"""
+Booking race: simultaneous create_appointment calls for one doctor, spread over start times
+30 minutes apart so neighbouring slots overlap. Runs against throwaway users in the database
+from DATABASE_URL, checks that no overlapping active bookings were stored, then cleans up.
+
+Run with: python -m benchmarks.booking_race [bookings] [slots] [connections]
+"""
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, event, func, or_, select  # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # type: ignore
+from sqlalchemy.orm import aliased, sessionmaker  # type: ignore
+
+from app.core.config import settings
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.user import User, UserRole
+from app.schemas.appointment import AppointmentCreate
+from app.services.appointment import create_appointment
+
+async def main(bookings: int = 500, slots: int = 20, connections: int = 50):
+    bench_engine = create_async_engine(settings.DATABASE_URL, pool_size=connections, max_overflow=0)
+    Session = sessionmaker(bind=bench_engine, class_=AsyncSession, expire_on_commit=False)
+    rejected_by_constraint = {"count": 0}
+
+    @event.listens_for(bench_engine.sync_engine, "handle_error")
+    def count_exclusion_violations(context):
+        if getattr(context.original_exception, "sqlstate", None) == "23P01":
+            rejected_by_constraint["count"] += 1
+
+    tag = uuid.uuid4().hex[:8]
+    async with Session() as db:
+        users = [
+            User(
+                email=f"bench-{tag}-{i}@example.com",
+                mobile=f"bench-{tag}-{i}",
+                hashed_password="!",
+                role=UserRole.doctor if i == 0 else UserRole.patient,
+                consultation_fee=500.0 if i == 0 else None
+            )
+            for i in range(bookings + 1)
+        ]
+        db.add_all(users)
+        await db.commit()
+    doctor_id, patient_ids = users[0].id, [user.id for user in users[1:]]
+    start = (datetime.now().astimezone() + timedelta(days=30)).replace(hour=9, minute=0, second=0, microsecond=0)
+    latencies = []
+    booked = []
+
+    async def book(i: int):
+        appointment_in = AppointmentCreate(
+            doctor_id=doctor_id,
+            appointment_datetime=start + timedelta(minutes=30 * (i % slots))
+        )
+        started = time.perf_counter()
+        async with Session() as db:
+            appointment = await create_appointment(db, patient_ids[i], appointment_in)
+        latencies.append(time.perf_counter() - started)
+        if appointment is not None:
+            booked.append(appointment.id)
+
+    try:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(book(i) for i in range(bookings)), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        elapsed = time.perf_counter() - started
+        async with Session() as db:
+            other = aliased(Appointment)
+            double_booked = (await db.execute(
+                select(func.count()).select_from(Appointment).join(
+                    other,
+                    and_(
+                        other.doctor_id == Appointment.doctor_id,
+                        other.id > Appointment.id,
+                        other.appointment_datetime > Appointment.appointment_datetime - timedelta(minutes=60),
+                        other.appointment_datetime < Appointment.appointment_datetime + timedelta(minutes=60),
+                        other.status.in_([AppointmentStatus.pending, AppointmentStatus.confirmed])
+                    )
+                ).where(
+                    Appointment.doctor_id == doctor_id,
+                    Appointment.status.in_([AppointmentStatus.pending, AppointmentStatus.confirmed])
+                )
+            )).scalar_one()
+    finally:
+        async with Session() as db:
+            await db.execute(delete(Appointment).where(Appointment.doctor_id == doctor_id))
+            await db.execute(delete(User).where(or_(User.id == doctor_id, User.id.in_(patient_ids))))
+            await db.commit()
+        await bench_engine.dispose()
+
+    latencies.sort()
+    print(
+        f"bookings={bookings} slots={slots} connections={connections}: booked={len(booked)} "
+        f"rejected={bookings - len(booked) - len(errors)} (by constraint={rejected_by_constraint['count']}) "
+        f"errors={len(errors)} "
+        f"double_booked={double_booked} seconds={elapsed:.2f} rate={bookings / elapsed:.0f}/s "
+        f"p50={latencies[len(latencies) // 2] * 1000:.0f}ms p95={latencies[int(len(latencies) * 0.95)] * 1000:.0f}ms"
+    )
+    if errors:
+        print(f"first error: {errors[0]!r}")
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:4])))
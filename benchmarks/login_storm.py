@@ -0,0 +1,102 @@
+"""
+Login storm: concurrent POST /api/v1/auth/login requests against the ASGI app while a few
+clients keep calling an unrelated endpoint (GET /api/address/divisions). Reports the
+unrelated endpoint's latency before and during the storm, and how logins fared. Uses a
+throwaway user in the database from DATABASE_URL and deletes it afterwards.
+
+Run with: python -m benchmarks.login_storm [logins] [probes]
+"""
+import asyncio
+import sys
+import time
+import uuid
+
+import httpx
+from sqlalchemy import delete  # type: ignore
+
+from app.core.config import settings
+from app.core.security import password_pool
+from app.db.session import AsyncSessionLocal, engine
+from app.main import app
+from app.models.user import User, UserRole
+from app.services.user import get_password_hash
+
+PASSWORD = "Benchmark-password-1"
+
+def percentile(latencies, p):
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000 if ordered else 0.0
+
+def summary(latencies):
+    return (
+        f"n={len(latencies)} p50={percentile(latencies, 0.5):.0f}ms "
+        f"p95={percentile(latencies, 0.95):.0f}ms p99={percentile(latencies, 0.99):.0f}ms"
+    )
+
+async def probe_until(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/api/address/divisions")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+async def probe_for(client: httpx.AsyncClient, seconds: float, probes: int) -> list:
+    latencies: list = []
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(probe_until(client, stop, latencies)) for _ in range(probes)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return latencies
+
+async def main(logins: int = 500, probes: int = 4):
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        user = User(
+            email=f"bench-{tag}@example.com", mobile=f"bench-{tag}", hashed_password=get_password_hash(PASSWORD),
+            role=UserRole.patient
+        )
+        db.add(user)
+        await db.commit()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+            await client.get("/api/address/divisions")  # warm the pool
+            idle = await probe_for(client, 2.0, probes)
+
+            statuses: dict = {}
+            login_latencies: list = []
+
+            async def login():
+                started = time.perf_counter()
+                response = await client.post(
+                    "/api/v1/auth/login", data={"username": user.email, "password": PASSWORD}
+                )
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code == 200:
+                    login_latencies.append(time.perf_counter() - started)
+
+            during: list = []
+            stop = asyncio.Event()
+            probers = [asyncio.create_task(probe_until(client, stop, during)) for _ in range(probes)]
+            started = time.perf_counter()
+            await asyncio.gather(*(login() for _ in range(logins)))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await asyncio.gather(*probers)
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.id == user.id))
+            await db.commit()
+        await engine.dispose()
+
+    print(
+        f"workers={settings.PASSWORD_HASH_WORKERS} queue_limit={settings.PASSWORD_HASH_QUEUE_LIMIT} "
+        f"logins={logins} seconds={elapsed:.2f} statuses={dict(sorted(statuses.items()))} "
+        f"rejected_by_pool={password_pool.rejected}"
+    )
+    print(f"accepted logins: {summary(login_latencies)}")
+    print(f"GET /api/address/divisions idle: {summary(idle)}")
+    print(f"GET /api/address/divisions during storm: {summary(during)}")
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:3])))
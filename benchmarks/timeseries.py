@@ -0,0 +1,61 @@
+"""
+Analytics timeseries: time get_appointment_timeseries over ``days`` of specialization and
+division rollup rows, three statuses per group and day. The rows are seeded from 2090 on,
+past any real appointment, and deleted afterwards.
+
+Run with: python -m benchmarks.timeseries [groups] [days] [rounds]
+"""
+import asyncio
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import delete, text  # type: ignore
+
+from app.db.session import AsyncSessionLocal
+from app.models.statistics import DailySpecializationStat, DailyDivisionStat
+from app.services.analytics import get_appointment_timeseries
+
+START = date(2090, 1, 1)
+# Far above any real division id, so the seeded rows never pick up a real label
+DIVISION_BASE = 1_000_000
+
+async def main(groups: int = 20, days: int = 365, rounds: int = 20):
+    end = START + timedelta(days=days - 1)
+    params = {"groups": groups, "start": START, "end": end, "base": DIVISION_BASE}
+    async with AsyncSessionLocal() as db:
+        for table, key in (("daily_specialization_stats", "'bench-' || g"), ("daily_division_stats", ":base + g")):
+            await db.execute(text(f"""
+                INSERT INTO {table} SELECT day::date, CAST(status AS appointmentstatus), {key},
+                       1 + (g + day::date - DATE '2000-01-01') % 7, 500
+                FROM generate_series(1, CAST(:groups AS integer)) AS g,
+                     generate_series(CAST(:start AS date), CAST(:end AS date), interval '1 day') AS day,
+                     unnest(ARRAY['completed', 'cancelled', 'pending']) AS status
+            """), params)
+        await db.commit()
+        await db.execute(text("ANALYZE daily_specialization_stats"))
+        await db.execute(text("ANALYZE daily_division_stats"))
+
+    try:
+        for granularity, group_by in (("day", None), ("week", "specialization"), ("month", "division")):
+            latencies = []
+            async with AsyncSessionLocal() as db:
+                await get_appointment_timeseries(db, START, end, granularity, group_by)  # warm up
+                for _ in range(rounds):
+                    started = time.perf_counter()
+                    await get_appointment_timeseries(db, START, end, granularity, group_by)
+                    latencies.append(time.perf_counter() - started)
+            latencies.sort()
+            print(
+                f"{days} days x {groups} groups, {granularity} by {group_by}: "
+                f"p50={latencies[len(latencies) // 2] * 1000:.1f}ms "
+                f"p95={latencies[int(len(latencies) * 0.95)] * 1000:.1f}ms"
+            )
+    finally:
+        async with AsyncSessionLocal() as db:
+            for model in (DailySpecializationStat, DailyDivisionStat):
+                await db.execute(delete(model).where(model.day >= START, model.day <= end))
+            await db.commit()
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:4])))
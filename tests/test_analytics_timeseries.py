@@ -0,0 +1,87 @@
+"""
+The timeseries reads the specialization and division rollups, so it must agree with the
+appointments written through the status hooks, follow a doctor who changes specialization, and
+return every bucket of the range. Needs the database from DATABASE_URL, migrated to head;
+skipped when it is not reachable.
+"""
+import uuid
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import delete  # type: ignore
+
+from app.db.session import AsyncSessionLocal
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.statistics import DailySpecializationStat
+from app.models.user import User, UserRole
+from app.services.analytics import get_appointment_timeseries
+from app.services.doctor import update_doctor_schedule
+from app.services.stats import apply_status_delta, record_status_change
+
+from tests.test_dashboard_queries import run, _database_available
+
+pytestmark = pytest.mark.skipif(not run(_database_available()), reason="database not reachable")
+
+# Two weeks with bookings and one empty week in between
+APPOINTMENTS = [
+    (datetime(2031, 3, 3, 9, 0, tzinfo=timezone.utc), AppointmentStatus.completed),
+    (datetime(2031, 3, 4, 9, 0, tzinfo=timezone.utc), AppointmentStatus.cancelled),
+    (datetime(2031, 3, 18, 9, 0, tzinfo=timezone.utc), AppointmentStatus.completed),
+]
+START = date(2031, 3, 3)
+END = date(2031, 3, 23)
+
+def _series(result, key):
+    return next((entry for entry in result["series"] if entry["key"] == key), None)
+
+async def _timeseries_before_and_after_specialization_change():
+    tag = uuid.uuid4().hex[:8]
+    before = f"ts-{tag}-before"
+    after = f"ts-{tag}-after"
+    async with AsyncSessionLocal() as db:
+        doctor = User(
+            email=f"ts-{tag}-doctor@example.com", mobile=f"ts-{tag}-d", hashed_password="!",
+            role=UserRole.doctor, specialization=before, available_timeslots=""
+        )
+        patient = User(email=f"ts-{tag}-patient@example.com", mobile=f"ts-{tag}-p", hashed_password="!", role=UserRole.patient)
+        db.add_all([doctor, patient])
+        await db.flush()
+        appointments = [
+            Appointment(
+                patient_id=patient.id, doctor_id=doctor.id, appointment_datetime=when,
+                status=status, consultation_fee=100.0
+            )
+            for when, status in APPOINTMENTS
+        ]
+        db.add_all(appointments)
+        await db.flush()
+        for appointment in appointments:
+            await record_status_change(db, appointment.id, None, appointment.status)
+        await db.commit()
+        try:
+            first = await get_appointment_timeseries(db, START, END, "week", "specialization", limit=100)
+            await update_doctor_schedule(db, doctor.id, "", specialization=after)
+            second = await get_appointment_timeseries(db, START, END, "week", "specialization", limit=100)
+            return _series(first, before), _series(second, before), _series(second, after)
+        finally:
+            for appointment in appointments:
+                await apply_status_delta(db, [appointment.id], appointment.status, -1)
+            await db.execute(delete(DailySpecializationStat).where(DailySpecializationStat.specialization.in_([before, after])))
+            await db.execute(delete(Appointment).where(Appointment.doctor_id == doctor.id))
+            await db.execute(delete(User).where(User.id.in_([doctor.id, patient.id])))
+            await db.commit()
+
+def test_timeseries_counts_and_zero_fills_weeks():
+    series, _, _ = run(_timeseries_before_and_after_specialization_change())
+    assert series["total_bookings"] == 3
+    assert [(point["bucket"], point["bookings"], point["completed"], point["cancelled"]) for point in series["points"]] == [
+        ("2031-03-03", 2, 1, 1),
+        ("2031-03-10", 0, 0, 0),
+        ("2031-03-17", 1, 1, 0),
+    ]
+    assert [point["revenue"] for point in series["points"]] == [100.0, 0, 100.0]
+
+def test_specialization_change_moves_history():
+    old, stale, moved = run(_timeseries_before_and_after_specialization_change())
+    assert stale is None or stale["total_bookings"] == 0
+    assert moved["total_bookings"] == old["total_bookings"] == 3
@@ -0,0 +1,54 @@
+"""
+load_busy_times_for_ranges must give each doctor the active appointments overlapping that
+doctor's own range only. Needs the database from DATABASE_URL, migrated to head; skipped when it
+is not reachable.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete  # type: ignore
+
+from app.db.session import AsyncSessionLocal
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.user import User, UserRole
+from app.services.availability import load_busy_times_for_ranges
+
+from tests.test_dashboard_queries import run, _database_available
+
+pytestmark = pytest.mark.skipif(not run(_database_available()), reason="database not reachable")
+
+BASE = datetime(2032, 5, 3, 9, 0, tzinfo=timezone.utc)
+
+async def _busy_per_doctor():
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        users = [
+            User(email=f"busy-{tag}-{i}@example.com", mobile=f"busy-{tag}-{i}", hashed_password="!", role=role)
+            for i, role in enumerate((UserRole.doctor, UserRole.doctor, UserRole.patient))
+        ]
+        db.add_all(users)
+        await db.flush()
+        first, second, patient = users
+        db.add_all([
+            Appointment(patient_id=patient.id, doctor_id=doctor.id, appointment_datetime=BASE + timedelta(hours=hours), status=status)
+            for doctor in (first, second)
+            for hours, status in ((0, AppointmentStatus.pending), (3, AppointmentStatus.confirmed), (6, AppointmentStatus.cancelled))
+        ])
+        await db.commit()
+        try:
+            busy = await load_busy_times_for_ranges(db, {
+                first.id: (BASE, BASE),
+                second.id: (BASE + timedelta(hours=2), BASE + timedelta(hours=7)),
+            })
+            return busy[first.id], busy[second.id]
+        finally:
+            await db.execute(delete(Appointment).where(Appointment.patient_id == patient.id))
+            await db.execute(delete(User).where(User.id.in_([user.id for user in users])))
+            await db.commit()
+
+def test_each_doctor_gets_only_its_own_range():
+    first, second = run(_busy_per_doctor())
+    assert first == [BASE.timestamp()]
+    # The cancelled appointment at +6h is inside the range but not active
+    assert second == [(BASE + timedelta(hours=3)).timestamp()]
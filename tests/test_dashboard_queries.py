@@ -0,0 +1,86 @@
+"""
+Query-count regression test for the admin dashboard: the number of statements must not grow
+with the number of users or appointments. Needs the database from DATABASE_URL, migrated to
+head; skipped when it is not reachable.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, event, text  # type: ignore
+
+from app.db.session import AsyncSessionLocal, engine
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.user import User, UserRole
+from app.services.dashboard import get_admin_dashboard_stats
+
+def run(coroutine):
+    """Run on a fresh loop and drop pooled connections, which are bound to the loop"""
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await engine.dispose()
+    return asyncio.run(main())
+
+async def _database_available() -> bool:
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+pytestmark = pytest.mark.skipif(not run(_database_available()), reason="database not reachable")
+
+async def _seed(completed: int):
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        doctor = User(
+            email=f"dash-{tag}-doctor@example.com", mobile=f"dash-{tag}-d", hashed_password="!",
+            role=UserRole.doctor, consultation_fee=100.0
+        )
+        patients = [
+            User(email=f"dash-{tag}-{i}@example.com", mobile=f"dash-{tag}-{i}", hashed_password="!", role=UserRole.patient)
+            for i in range(completed)
+        ]
+        db.add_all([doctor, *patients])
+        await db.flush()
+        start = datetime.now().astimezone() - timedelta(days=completed + 1)
+        db.add_all([
+            Appointment(
+                patient_id=patient.id, doctor_id=doctor.id, appointment_datetime=start + timedelta(days=i),
+                status=AppointmentStatus.completed, consultation_fee=100.0
+            )
+            for i, patient in enumerate(patients)
+        ])
+        await db.commit()
+        return [doctor.id, *(patient.id for patient in patients)]
+
+async def _cleanup(user_ids):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Appointment).where(Appointment.doctor_id.in_(user_ids)))
+        await db.execute(delete(User).where(User.id.in_(user_ids)))
+        await db.commit()
+
+async def _count_dashboard_queries(completed: int) -> int:
+    user_ids = await _seed(completed)
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        async with AsyncSessionLocal() as db:
+            await get_admin_dashboard_stats(db)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+        await _cleanup(user_ids)
+    return len(statements)
+
+def test_admin_dashboard_query_count_is_constant():
+    small = run(_count_dashboard_queries(3))
+    large = run(_count_dashboard_queries(60))
+    assert small == large == 2
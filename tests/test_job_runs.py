@@ -0,0 +1,74 @@
+"""
+A new leader must fail only the runs whose process died: runs with a stale heartbeat or past
+JOB_RUN_TIMEOUT_SECONDS, not a healthy manual run in another process. A late call of a cron job
+must key its run on the scheduled time, and a firing blocked by a running job is recorded.
+Needs the database from DATABASE_URL, migrated to head; skipped when it is not reachable.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import delete, func, select  # type: ignore
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.job import JobRun
+from app.core.scheduler import firing_key, scheduled_firing
+from app.services.jobs import fail_orphaned_job_runs, record_skipped_run
+
+from tests.test_dashboard_queries import run, _database_available
+
+pytestmark = pytest.mark.skipif(not run(_database_available()), reason="database not reachable")
+
+async def _statuses_after_takeover():
+    tag = uuid.uuid4().hex[:8]
+    lease = timedelta(seconds=settings.SCHEDULER_LEASE_SECONDS)
+    timeout = timedelta(seconds=settings.JOB_RUN_TIMEOUT_SECONDS)
+    runs = {
+        "healthy": {},
+        "stale_heartbeat": {"heartbeat_at": func.now() - 2 * lease},
+        "timed_out": {"started_at": func.now() - 2 * timeout},
+    }
+    async with AsyncSessionLocal() as db:
+        for name, columns in runs.items():
+            db.add(JobRun(job_name=f"test-{tag}-{name}", run_key=f"test-{tag}-{name}", holder="other-process", **columns))
+        await db.commit()
+        try:
+            await fail_orphaned_job_runs(db)
+            rows = (await db.execute(
+                select(JobRun.job_name, JobRun.status).where(JobRun.job_name.like(f"test-{tag}-%"))
+            )).all()
+            return {job_name.rsplit("-", 1)[-1]: status for job_name, status in rows}
+        finally:
+            await db.execute(delete(JobRun).where(JobRun.job_name.like(f"test-{tag}-%")))
+            await db.commit()
+
+def test_only_dead_or_timed_out_runs_are_failed():
+    assert run(_statuses_after_takeover()) == {
+        "healthy": "running",
+        "stale_heartbeat": "failed",
+        "timed_out": "failed",
+    }
+
+def test_late_call_keys_on_the_scheduled_firing():
+    trigger = CronTrigger(hour=8, minute=0, timezone=timezone.utc)
+    on_time = datetime(2030, 10, 1, 8, 0, 0, 400000, tzinfo=timezone.utc)
+    late = datetime(2030, 10, 1, 8, 1, 30, tzinfo=timezone.utc)
+    keys = {firing_key("job", scheduled_firing(trigger, now)) for now in (on_time, late)}
+    assert keys == {"job:2030-10-01T08:00"}
+
+async def _record_skip_twice():
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        try:
+            first = await record_skipped_run(db, f"test-{tag}", f"test-{tag}:2030-10-01T08:00")
+            second = await record_skipped_run(db, f"test-{tag}", f"test-{tag}:2030-10-01T08:00")
+            status = (await db.execute(select(JobRun.status).where(JobRun.job_name == f"test-{tag}"))).scalar_one()
+            return first, second, status
+        finally:
+            await db.execute(delete(JobRun).where(JobRun.job_name == f"test-{tag}"))
+            await db.commit()
+
+def test_skipped_firing_is_recorded_once():
+    assert run(_record_skip_twice()) == (True, False, "skipped")
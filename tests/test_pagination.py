@@ -0,0 +1,34 @@
+"""
+Keyset cursors come from clients, so decode_cursor must reject any cursor whose values do not
+fit the sort columns with a 400 before they reach the database.
+"""
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.main import app
+from app.models.appointment import Appointment
+
+COLUMNS = [Appointment.appointment_datetime, Appointment.id]
+
+def test_cursor_round_trips():
+    values = [datetime(2030, 10, 1, 9, 30, tzinfo=timezone.utc), 42]
+    assert decode_cursor(encode_cursor(values), COLUMNS) == values
+
+@pytest.mark.parametrize("values", [
+    ["2030-10-01T09:30:00", 42],
+    [datetime(2030, 10, 1), "42"],
+    [datetime(2030, 10, 1), True],
+    [datetime(2030, 10, 1), 2 ** 40],
+    [datetime(2030, 10, 1)],
+])
+def test_cursor_values_must_fit_the_sort_columns(values):
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(encode_cursor(values), COLUMNS)
+    assert raised.value.status_code == 400
+
+def test_list_doctors_documents_the_cursor_page():
+    schemas = app.openapi()["paths"]["/api/v1/doctors/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert {"$ref": "#/components/schemas/UserPage"} in schemas["anyOf"]
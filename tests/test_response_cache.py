@@ -0,0 +1,52 @@
+"""
+Invalidating a group of ResponseCache keys must keep that group's in-flight results out of the
+cache without touching other keys, cached or in flight.
+"""
+import asyncio
+
+from app.core.cache import ResponseCache
+
+def _cache():
+    return ResponseCache(maxsize=16, ttl=60, group=lambda key: key[0])
+
+async def _compute_while(cache, key, during):
+    """Compute ``key`` and run ``during`` while the computation is still in flight"""
+    release = asyncio.Event()
+
+    async def compute():
+        await release.wait()
+        return f"value-{key}"
+
+    task = asyncio.create_task(cache.get_or_compute(key, compute))
+    await asyncio.sleep(0)
+    during()
+    release.set()
+    return await task
+
+def test_invalidating_another_group_still_stores_result():
+    async def scenario():
+        cache = _cache()
+        cache.set(("b", 1), "cached")
+        await _compute_while(cache, ("a", 1), lambda: cache.invalidate_groups("b"))
+        return cache.get(("a", 1)), cache.get(("b", 1))
+
+    assert asyncio.run(scenario()) == ("value-('a', 1)", None)
+
+def test_invalidated_inflight_result_is_not_stored():
+    async def scenario():
+        cache = _cache()
+        cache.set(("a", 2), "cached")
+        value = await _compute_while(cache, ("a", 1), lambda: cache.invalidate_groups("a"))
+        return value, cache.get(("a", 1)), cache.get(("a", 2)), cache._groups
+
+    value, stored, sibling, groups = asyncio.run(scenario())
+    assert value == "value-('a', 1)"
+    assert stored is None and sibling is None
+    assert groups == {}
+
+def test_evicted_keys_leave_the_group_index():
+    cache = ResponseCache(maxsize=2, ttl=60, group=lambda key: key[0])
+    for i in range(5):
+        cache.set(("a", i), i)
+    cache.invalidate(("a", 4))
+    assert cache._groups == {"a": {("a", 3)}}
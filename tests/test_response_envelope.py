@@ -0,0 +1,29 @@
+"""
+envelope_endpoint must keep the status code of an HTTPException an endpoint raises, and answer
+500 only for unexpected errors, with the same envelope either way.
+"""
+import asyncio
+import json
+
+from fastapi import HTTPException
+
+from app.api._response import envelope_endpoint
+
+@envelope_endpoint
+async def _raises(exc: Exception):
+    raise exc
+
+def _call(exc: Exception):
+    response = asyncio.run(_raises(exc))
+    return response.status_code, json.loads(response.body)
+
+def test_http_exception_keeps_its_status():
+    for code in (400, 403, 404, 409):
+        status_code, body = _call(HTTPException(status_code=code, detail="Nope"))
+        assert status_code == code
+        assert body == {"success": False, "data": None, "error": f"{code}: Nope"}
+
+def test_unexpected_error_is_500():
+    status_code, body = _call(ValueError("boom"))
+    assert status_code == 500
+    assert body == {"success": False, "data": None, "error": "boom"}
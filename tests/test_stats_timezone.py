@@ -0,0 +1,95 @@
+"""
+The daily rollup must agree with counting raw appointments, and the patient sketches must not
+drop patients seen in the range, for ranges whose bounds carry a non-UTC offset. Needs the database from DATABASE_URL, migrated to head; skipped when it is
+not reachable.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, func, select  # type: ignore
+
+from app.db.session import AsyncSessionLocal
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.user import User, UserRole
+from app.services.stats import (
+    add_patient_to_sketch, apply_status_delta, estimate_unique_patients, get_status_totals, record_status_change
+)
+
+from tests.test_dashboard_queries import run, _database_available
+
+pytestmark = pytest.mark.skipif(not run(_database_available()), reason="database not reachable")
+
+DHAKA = timezone(timedelta(hours=6))
+
+# UTC times either side of midnight in UTC and in UTC+6
+APPOINTMENT_TIMES = [
+    datetime(2030, 10, 1, 17, 30, tzinfo=timezone.utc),
+    datetime(2030, 10, 1, 23, 30, tzinfo=timezone.utc),
+    datetime(2030, 10, 2, 0, 30, tzinfo=timezone.utc),
+    datetime(2030, 10, 3, 19, 0, tzinfo=timezone.utc),
+    datetime(2030, 10, 4, 12, 0, tzinfo=timezone.utc),
+    datetime(2030, 10, 4, 18, 30, tzinfo=timezone.utc),
+]
+
+RANGES = [
+    (datetime(2030, 10, 1, tzinfo=DHAKA), datetime(2030, 10, 4, tzinfo=DHAKA)),
+    (datetime(2030, 10, 2, tzinfo=DHAKA), datetime(2030, 10, 5, tzinfo=DHAKA)),
+    (datetime(2030, 10, 2, 3, 15, tzinfo=DHAKA), datetime(2030, 10, 4, 23, 59, tzinfo=DHAKA)),
+    (datetime(2030, 10, 1, 12, 0), datetime(2030, 10, 4, 18, 0)),
+    # Local Oct 5, but its only appointment is on UTC Oct 4
+    (datetime(2030, 10, 5, tzinfo=DHAKA), datetime(2030, 10, 5, 1, 0, tzinfo=DHAKA)),
+]
+
+async def _compare_counts():
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        doctor = User(email=f"tz-{tag}-doctor@example.com", mobile=f"tz-{tag}-d", hashed_password="!", role=UserRole.doctor)
+        patients = [
+            User(email=f"tz-{tag}-{i}@example.com", mobile=f"tz-{tag}-{i}", hashed_password="!", role=UserRole.patient)
+            for i in range(len(APPOINTMENT_TIMES))
+        ]
+        db.add_all([doctor, *patients])
+        await db.flush()
+        appointments = [
+            Appointment(
+                patient_id=patient.id, doctor_id=doctor.id, appointment_datetime=when,
+                status=AppointmentStatus.completed, consultation_fee=100.0
+            )
+            for patient, when in zip(patients, APPOINTMENT_TIMES)
+        ]
+        db.add_all(appointments)
+        await db.flush()
+        for appointment in appointments:
+            await record_status_change(db, appointment.id, None, AppointmentStatus.completed)
+            await add_patient_to_sketch(db, appointment.id, appointment.patient_id)
+        await db.commit()
+        try:
+            results = []
+            for start, end in RANGES:
+                totals = await get_status_totals(db, doctor.id, start, end)
+                exact = (await db.execute(
+                    select(func.count()).select_from(Appointment).where(
+                        Appointment.doctor_id == doctor.id,
+                        Appointment.appointment_datetime >= start,
+                        Appointment.appointment_datetime <= end
+                    )
+                )).scalar_one()
+                estimate = await estimate_unique_patients(db, doctor.id, start, end)
+                results.append((totals[AppointmentStatus.completed]["count"], exact, estimate))
+            return results
+        finally:
+            # Take the appointments back out of the specialization and division rollups, which do not cascade
+            await apply_status_delta(db, [appointment.id for appointment in appointments], AppointmentStatus.completed, -1)
+            await db.execute(delete(Appointment).where(Appointment.doctor_id == doctor.id))
+            await db.execute(delete(User).where(User.id.in_([doctor.id, *(patient.id for patient in patients)])))
+            await db.commit()
+
+def test_rollup_matches_exact_counts_for_offset_ranges():
+    for rollup, exact, _ in run(_compare_counts()):
+        assert rollup == exact
+
+def test_patient_sketches_cover_offset_ranges():
+    # One patient per appointment; edge days count whole, so the estimate may only exceed
+    for _, exact, estimate in run(_compare_counts()):
+        assert estimate >= exact